@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+This script measures how the time taken to decode a payload scales with the
+size of the payload.
+
+Payloads from 1 KB up to 100 MB are built by repeating encoded MetricFamily
+frames and then decoded. Decoding is linear when the throughput (MB/s) stays
+roughly constant as the payload size grows.
+"""
+
+import argparse
+import time
+
+import prometheus_metrics_proto as pmp
+
+
+KB = 1024
+MB = 1024 * KB
+SIZES = (KB, 10 * KB, 100 * KB, MB, 10 * MB, 100 * MB)
+
+
+def make_frame(series: int = 10) -> bytes:
+    """ Return a single encoded MetricFamily frame containing some gauges """
+    mf = pmp.create_gauge(
+        "bench_queue_depth",
+        "Queue depth per shard.",
+        [({"shard": str(i), "host": "examplehost"}, i * 1.5) for i in range(series)],
+    )
+    return pmp.encode(mf)
+
+
+def make_payload(frame: bytes, size: int) -> bytes:
+    """ Return a payload of at least size bytes built from repeated frames """
+    return frame * max(1, size // len(frame))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=SIZES[-1],
+        help="largest payload size to decode, in bytes",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="number of timing runs per size"
+    )
+    args = parser.parse_args()
+
+    frame = make_frame()
+    print("frame size: {} bytes".format(len(frame)))
+    print("{:>12} {:>10} {:>12} {:>10}".format("bytes", "families", "seconds", "MB/s"))
+
+    for size in SIZES:
+        if size > args.max_size:
+            break
+        payload = make_payload(frame, size)
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            metrics = pmp.decode(payload)
+            best = min(best, time.perf_counter() - t0)
+        print(
+            "{:>12} {:>10} {:>12.6f} {:>10.2f}".format(
+                len(payload), len(metrics), best, len(payload) / MB / best
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+This script measures the throughput of bucketing raw observations into
+histogram values, using NumPy when it is installed and the pure Python
+binary search otherwise.
+"""
+
+import argparse
+import random
+import time
+import unittest.mock
+
+from prometheus_metrics_proto import histograms
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+BOUNDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+def best_of(func, repeat, *args):
+    """ Return the fastest run time of func """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def observe_batches(observations, batch_size):
+    """ Feed observations to an accumulator in batches """
+    accumulator = histograms.HistogramAccumulator(BOUNDS)
+    for i in range(0, len(observations), batch_size):
+        accumulator.observe_many(observations[i : i + batch_size])
+    return accumulator.values()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--observations",
+        type=int,
+        default=10000000,
+        help="number of observations to bucket with NumPy",
+    )
+    parser.add_argument(
+        "--python-observations",
+        type=int,
+        default=200000,
+        help="number of observations to bucket without NumPy",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100000, help="accumulator batch size"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="number of timing runs per case"
+    )
+    args = parser.parse_args()
+
+    print("{:>28} {:>12} {:>16}".format("case", "seconds", "observations/s"))
+
+    def report(case, count, seconds):
+        print("{:>28} {:>12.6f} {:>16.0f}".format(case, seconds, count / seconds))
+
+    if np is not None:
+        observations = np.random.default_rng(1).exponential(0.5, args.observations)
+        t = best_of(histograms.bucket_observations, args.repeat, observations, BOUNDS)
+        report("bucket_observations (numpy)", args.observations, t)
+        t = best_of(observe_batches, args.repeat, observations, args.batch_size)
+        report("observe_many (numpy)", args.observations, t)
+    else:
+        print("NumPy is not installed, skipping NumPy cases")
+
+    rng = random.Random(1)
+    observations = [rng.expovariate(2.0) for _ in range(args.python_observations)]
+    with unittest.mock.patch.object(histograms, "np", None):
+        t = best_of(histograms.bucket_observations, args.repeat, observations, BOUNDS)
+    report("bucket_observations (python)", args.python_observations, t)
+
+    accumulator = histograms.HistogramAccumulator(BOUNDS)
+    t = best_of(lambda: [accumulator.observe(o) for o in observations], args.repeat)
+    report("observe", args.python_observations, t)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+This script compares the time taken to encode registries of increasing size
+serially against encoding them with ``parallel.encode_parallel`` to find the
+number of families at which parallel encoding becomes worthwhile.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import time
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import parallel
+
+
+def make_families(count: int, series: int):
+    """ Return a list of (name, help, type, metrics) tuples describing families """
+    labels = [{"shard": str(i), "host": "examplehost"} for i in range(series)]
+    return [
+        (
+            "bench_requests_{}_total".format(i),
+            "Requests.",
+            pmp.COUNTER,
+            [(l, i) for l in labels],
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(func, repeat, *args, **kwargs):
+    """ Return the fastest run time of func """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 500, 1000, 2000, 5000, 20000],
+        help="numbers of families to encode",
+    )
+    parser.add_argument(
+        "--series", type=int, default=5, help="number of series per family"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="number of workers"
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="use a thread pool instead of a process pool",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of timing runs per size"
+    )
+    args = parser.parse_args()
+
+    if args.threads:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.workers)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=args.workers)
+
+    print(
+        "workers: {}, executor: {}, gil enabled: {}".format(
+            args.workers, type(executor).__name__, parallel.gil_enabled()
+        )
+    )
+    print(
+        "{:>10} {:>12} {:>12} {:>9}".format("families", "serial", "parallel", "speedup")
+    )
+    with executor:
+        # Start the workers before timing
+        parallel.encode_parallel(make_families(10, 1), executor=executor, threshold=0)
+        for size in args.sizes:
+            families = make_families(size, args.series)
+            serial = best_of(
+                parallel.encode_parallel, args.repeat, families, threshold=size + 1
+            )
+            parallel_ = best_of(
+                parallel.encode_parallel,
+                args.repeat,
+                families,
+                executor=executor,
+                max_workers=args.workers,
+                threshold=0,
+            )
+            print(
+                "{:>10} {:>12.6f} {:>12.6f} {:>8.2f}x".format(
+                    size, serial, parallel_, serial / parallel_
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
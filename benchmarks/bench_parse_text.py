@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+This script measures the throughput of parsing the text exposition format
+into MetricFamily objects.
+"""
+
+import argparse
+import time
+
+from google.protobuf.internal import api_implementation
+
+import prometheus_metrics_proto as pmp
+
+from bench_text import make_families
+
+
+def best_of(func, repeat, *args):
+    """ Return the fastest run time of func """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--series", type=int, default=5000, help="number of series per family"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of timing runs per parser"
+    )
+    args = parser.parse_args()
+
+    families = make_families(args.series)
+    data = pmp.encode_text(*families)
+    assert pmp.encode_text(*pmp.parse_text(data)) == data
+    lines = data.count(b"\n")
+    megabytes = len(data) / 1e6
+
+    print("protobuf backend: {}".format(api_implementation.Type()))
+    print("input: {} lines, {:.1f} MB".format(lines, megabytes))
+    t_text = best_of(pmp.parse_text, args.repeat, data)
+    print(
+        "parse_text: {:.6f} s, {:.0f} lines/s, {:.1f} MB/s".format(
+            t_text, lines / t_text, megabytes / t_text
+        )
+    )
+    payload = pmp.encode(*families)
+    t_protobuf = best_of(pmp.decode, args.repeat, payload)
+    print("protobuf decode of the same families: {:.6f} s".format(t_protobuf))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+This script compares the cost of exposing fixed-shape histograms by building
+and encoding MetricFamily objects on every scrape against updating the values
+of a MetricFamilyTemplate in place.
+"""
+
+import argparse
+import time
+
+import prometheus_metrics_proto as pmp
+
+
+POS_INF = float("inf")
+BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, POS_INF)
+
+
+def histogram_values(scrape: int):
+    """ Return histogram values for a scrape """
+    values = {bound: scrape * (i + 1) for i, bound in enumerate(BOUNDS)}
+    values["count"] = scrape * len(BOUNDS)
+    values["sum"] = scrape * 1.5
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--series", type=int, default=5000, help="number of histogram series"
+    )
+    parser.add_argument("--scrapes", type=int, default=3, help="number of scrapes")
+    args = parser.parse_args()
+
+    labels = [{"shard": str(i)} for i in range(args.series)]
+
+    t0 = time.perf_counter()
+    for scrape in range(args.scrapes):
+        values = histogram_values(scrape)
+        mf = pmp.create_histogram(
+            "bench_latency_seconds", "Latency.", [(l, values) for l in labels]
+        )
+        pmp.encode(mf)
+    t_protobuf = (time.perf_counter() - t0) / args.scrapes
+
+    template = pmp.MetricFamilyTemplate(
+        pmp.create_histogram(
+            "bench_latency_seconds",
+            "Latency.",
+            [(l, histogram_values(0)) for l in labels],
+        )
+    )
+    t0 = time.perf_counter()
+    for scrape in range(args.scrapes):
+        values = histogram_values(scrape)
+        counts = [values[bound] for bound in BOUNDS]
+        for index in range(args.series):
+            template.set_histogram(index, counts, values["count"], values["sum"])
+        bytes(template.frame)
+    t_template = (time.perf_counter() - t0) / args.scrapes
+
+    print("{} histogram series, {} buckets each".format(args.series, len(BOUNDS)))
+    print("{:>10} {:>16}".format("method", "seconds/scrape"))
+    print("{:>10} {:>16.6f}".format("protobuf", t_protobuf))
+    print("{:>10} {:>16.6f}".format("template", t_template))
+    print("speedup: {:.1f}x".format(t_protobuf / t_template))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+This script compares the throughput of encoding MetricFamily objects into
+the text exposition format against encoding them into the Protocol Buffer
+format.
+"""
+
+import argparse
+import random
+import time
+
+from google.protobuf.internal import api_implementation
+
+import prometheus_metrics_proto as pmp
+
+
+POS_INF = float("inf")
+
+
+def make_families(series: int):
+    """ Return a list of MetricFamily objects """
+    rng = random.Random(0)
+    labels = [
+        {"shard": str(i), "host": "examplehost", "app": "my_app"} for i in range(series)
+    ]
+    histogram_values = {0.1: 3, 0.5: 20, 1.0: 31, POS_INF: 32, "count": 32, "sum": 9.5}
+    summary_values = {0.5: 0.2, 0.9: 0.7, 0.99: 0.9, "count": 32, "sum": 9.5}
+    return [
+        pmp.create_counter(
+            "bench_requests_total",
+            "Requests.",
+            [(l, rng.randrange(10 ** 6)) for l in labels],
+        ),
+        pmp.create_gauge(
+            "bench_queue_depth", "Queue depth.", [(l, rng.random()) for l in labels]
+        ),
+        pmp.create_summary(
+            "bench_latency_seconds", "Latency.", [(l, summary_values) for l in labels]
+        ),
+        pmp.create_histogram(
+            "bench_duration_seconds",
+            "Duration.",
+            [(l, histogram_values) for l in labels],
+        ),
+    ]
+
+
+def best_of(func, repeat, *args):
+    """ Return the fastest run time of func and the size of its output """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(func(*args))
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--series", type=int, default=1000, help="number of series per family"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of timing runs per encoder"
+    )
+    args = parser.parse_args()
+
+    families = make_families(args.series)
+    series = args.series * len(families)
+    print("protobuf backend: {}".format(api_implementation.Type()))
+    print(
+        "{:>10} {:>12} {:>14} {:>10}".format("encoder", "seconds", "series/s", "bytes")
+    )
+    results = {}
+    for name, func in (("protobuf", pmp.encode), ("text", pmp.encode_text)):
+        seconds, size = best_of(func, args.repeat, *families)
+        results[name] = seconds
+        print(
+            "{:>10} {:>12.6f} {:>14.0f} {:>10}".format(
+                name, seconds, series / seconds, size
+            )
+        )
+    print("text/protobuf time: {:.1f}x".format(results["text"] / results["protobuf"]))
+
+
+if __name__ == "__main__":
+    main()
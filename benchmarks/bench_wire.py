@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+This script compares the throughput of encoding metrics by building
+Protocol Buffer objects and serializing them against encoding the same
+metrics directly into the wire format.
+"""
+
+import argparse
+import time
+
+from google.protobuf.internal import api_implementation
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import wire
+
+
+POS_INF = float("inf")
+
+
+def make_families(series: int):
+    """ Return a list of (name, help, type, data) tuples describing families """
+    labels = [{"shard": str(i), "host": "examplehost"} for i in range(series)]
+    histogram_values = {0.1: 3, 0.5: 20, 1.0: 31, POS_INF: 32, "count": 32, "sum": 9.5}
+    summary_values = {0.5: 0.2, 0.9: 0.7, 0.99: 0.9, "count": 32, "sum": 9.5}
+    return [
+        ("bench_requests_total", "Requests.", pmp.COUNTER, [(l, 100) for l in labels]),
+        ("bench_queue_depth", "Queue depth.", pmp.GAUGE, [(l, 1.5) for l in labels]),
+        (
+            "bench_latency_seconds",
+            "Latency.",
+            pmp.SUMMARY,
+            [(l, summary_values) for l in labels],
+        ),
+        (
+            "bench_duration_seconds",
+            "Duration.",
+            pmp.HISTOGRAM,
+            [(l, histogram_values) for l in labels],
+        ),
+    ]
+
+
+def encode_protobuf(families, const_labels):
+    """ Build MetricFamily objects and encode them """
+    return pmp.encode(
+        *[
+            pmp.utils.create_metric_family(*f, const_labels=const_labels)
+            for f in families
+        ]
+    )
+
+
+def encode_wire(families, const_labels):
+    """ Encode families directly into the wire format """
+    return b"".join(
+        [wire.encode_frame(*f, const_labels=const_labels) for f in families]
+    )
+
+
+def best_of(func, repeat, *args):
+    """ Return the fastest run time of func """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--series", type=int, default=1000, help="number of series per family"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of timing runs per encoder"
+    )
+    args = parser.parse_args()
+
+    families = make_families(args.series)
+    const_labels = {"app": "my_app"}
+    assert encode_protobuf(families, const_labels) == encode_wire(
+        families, const_labels
+    )
+
+    series = args.series * len(families)
+    print("protobuf backend: {}".format(api_implementation.Type()))
+    print("{:>10} {:>12} {:>14}".format("encoder", "seconds", "series/s"))
+    t_protobuf = best_of(encode_protobuf, args.repeat, families, const_labels)
+    print(
+        "{:>10} {:>12.6f} {:>14.0f}".format("protobuf", t_protobuf, series / t_protobuf)
+    )
+    t_wire = best_of(encode_wire, args.repeat, families, const_labels)
+    print("{:>10} {:>12.6f} {:>14.0f}".format("wire", t_wire, series / t_wire))
+    print("speedup: {:.1f}x".format(t_protobuf / t_wire))
+
+
+if __name__ == "__main__":
+    main()
@@ -52,15 +52,21 @@ if __name__ == "__main__":
         url="https://github.com/claws/prometheus_metrics_proto",
         package_dir={"": "src"},
         packages=find_packages("src"),
+        python_requires=">=3.10",
         install_requires=parse_requirements("requirements.txt"),
+        extras_require={
+            "numpy": ["numpy"],
+            "snappy": ["python-snappy"],
+            "zstd": ["zstandard"],
+        },
         pyrobuf_modules="proto",
         classifiers=[
             "Intended Audience :: Developers",
             "License :: OSI Approved :: MIT License",
             "Operating System :: OS Independent",
-            "Programming Language :: Python :: 3.6",
-            "Programming Language :: Python :: 3.7",
-            "Programming Language :: Python :: 3.8",
+            "Programming Language :: Python :: 3.10",
+            "Programming Language :: Python :: 3.11",
+            "Programming Language :: Python :: 3.12",
             "Topic :: System :: Monitoring",
         ],
     )
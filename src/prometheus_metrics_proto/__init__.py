@@ -9,9 +9,12 @@ from prometheus_metrics_proto.prometheus_metrics_pb2 import (
     COUNTER,
     GAUGE,
     SUMMARY,
+    UNTYPED,
     HISTOGRAM,
     Bucket,
+    BucketSpan,
     Counter,
+    Exemplar,
     Gauge,
     Histogram,
     LabelPair,
@@ -19,6 +22,7 @@ from prometheus_metrics_proto.prometheus_metrics_pb2 import (
     MetricFamily,
     Summary,
     Quantile,
+    Untyped,
 )
 from .api import (
     create_counter,
@@ -27,8 +31,41 @@ from .api import (
     create_summary,
     decode,
     encode,
+    encode_buffers,
+    encode_into,
+    encode_to,
+    iter_decode,
+    iter_encode,
 )
+from .cache import EncodeCache
+from .compression import CompressedCache, encode_compressed, iter_encode_compressed
+from .exemplars import ExemplarReservoir, HistogramExemplarSampler
+from .exposition import ExpositionCache, negotiate
+from .lazy import LazyMetricSet
+from .openmetrics import (
+    encode_openmetrics,
+    encode_openmetrics_to,
+    iter_encode_openmetrics,
+)
+from .parallel import encode_parallel
+from .quantiles import TDigest, WindowedSummary
+from .template import MetricFamilyTemplate
+from .text import (
+    encode_text,
+    encode_text_to,
+    iter_encode_text,
+    iter_parse_text,
+    parse_text,
+)
+from . import compression
+from . import exemplars
+from . import exposition
+from . import openmetrics
+from . import parallel
+from . import quantiles
+from . import text
 from . import utils
+from . import wire
 
 
 __version__ = "18.01.02"
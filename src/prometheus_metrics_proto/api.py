@@ -3,10 +3,14 @@ This module provides high level functions to assist generating Prometheus
 metrics.
 """
 
+import fnmatch
+import re
+
 from google.protobuf.internal.decoder import _DecodeVarint as varintDecoder
 from google.protobuf.internal.encoder import _EncodeVarint as varintEncoder
 
 from . import utils
+from . import wire
 from .prometheus_metrics_pb2 import (
     COUNTER,
     GAUGE,
@@ -15,7 +19,24 @@ from .prometheus_metrics_pb2 import (
     Metric,
     MetricFamily,
 )
-from typing import List, Sequence, Union
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+
+# A name pattern is a shell style wildcard string or a compiled regular
+# expression. Filters accept a single pattern or a sequence of patterns.
+PatternsType = Union[str, Pattern, Sequence[Union[str, Pattern]]]
+LabelMatchersType = Dict[str, Union[str, Pattern]]
 
 
 def create_counter(
@@ -248,32 +269,360 @@ def encode(*metrics: MetricFamily) -> bytes:
             )
         )
 
-    buf = bytearray()
-    for m in metrics:
-        encoded_metric = m.SerializeToString()
-        varintEncoder(buf.extend, len(encoded_metric), None)
-        buf.extend(encoded_metric)
-    return bytes(buf)
+    return b"".join(_iter_frame_parts(metrics))
+
+
+def iter_encode(metrics: Iterable[MetricFamily]) -> Iterator[bytes]:
+    """ Encode MetricFamily objects into a sequence of frames, lazily.
+
+    Each yielded frame is a single encoded MetricFamily object prefixed with
+    a varint containing its size, so concatenating the frames produces the
+    same payload as ``encode``. Frames are only produced as the caller
+    consumes them which allows a response to start being sent before the
+    last MetricFamily has been serialized.
+
+    :param metrics: an iterable (e.g. a generator) of MetricsFamily objects.
+    :returns: an iterator of encoded MetricsFamily frames.
+    """
+    for header, encoded_metric in _iter_frames(metrics):
+        yield header + encoded_metric
 
 
-def decode(data: bytes) -> List[MetricFamily]:
+def encode_to(writable, *metrics: MetricFamily) -> int:
+    """ Encode MetricFamily objects directly into a writable stream.
+
+    Each encoded MetricFamily object is written to the stream, along with
+    its varint size header in a single call, as it is produced rather than
+    being accumulated into a single bytes object first.
+
+    :param writable: a binary file object, ``io.BufferedWriter`` or any
+      object with a ``write`` method, or a socket (any object with a
+      ``sendall`` method).
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :returns: the number of bytes written.
+    """
+    write = getattr(writable, "write", None)
+    if write is None:
+        write = writable.sendall
+
+    written = 0
+    for header, encoded_metric in _iter_frames(metrics):
+        frame = header + encoded_metric
+        write(frame)
+        written += len(frame)
+    return written
+
+
+def decode(
+    data: bytes,
+    include: PatternsType = None,
+    exclude: PatternsType = None,
+    match_labels: LabelMatchersType = None,
+) -> List[MetricFamily]:
     """ Decode a bytes object into a list of MetricFamily objects.
 
     Each encoded MetricFamily object is constructed of a two parts. The first
     is a varint containing the size of the following encoded MetricFamily
     object.
 
-    :param data: a bytes object containing encoded MetricsFamily object.
+    The data is accessed through a single memoryview and each frame is parsed
+    in place, so decoding time is linear in the size of the payload.
+
+    Families can be filtered by name. The name of each frame is read without
+    parsing the frame, so frames that are filtered out are skipped cheaply.
+
+    :param data: a bytes-like object containing encoded MetricsFamily object.
+
+    :param include: a name pattern, or a sequence of name patterns, that
+      families must match to be decoded. A pattern is either a shell style
+      wildcard string (e.g. ``"http_*"``) or a compiled regular expression
+      which must match the whole name. By default all families are included.
+
+    :param exclude: a name pattern, or a sequence of name patterns, that
+      families must not match to be decoded.
+
+    :param match_labels: a dict of label names to expected values. Only the
+      metrics whose labels match every entry are kept, and families left
+      without any metrics are dropped. An expected value is either a string,
+      which must equal the label value, or a compiled regular expression,
+      which must match the whole label value. A missing label has an empty
+      value.
+
     :returns: a list of MetricsFamily objects.
     """
-    buffer = bytearray(data)
+    wanted = _name_filter(include, exclude)
+    keep_metric = _label_filter(match_labels)
+    view = memoryview(data)
+    end = len(view)
+    pos = 0
     metrics = []
-    while buffer:
-        mf_size, pos = varintDecoder(buffer, 0)
-        buffer = buffer[pos:]
-        mf_data = bytes(buffer[:mf_size])
-        buffer = buffer[mf_size:]
-        mf = MetricFamily()
-        mf.ParseFromString(mf_data)
-        metrics.append(mf)
+    while pos < end:
+        mf_size, pos = varintDecoder(view, pos)
+        mf_end = pos + mf_size
+        if mf_end > end:
+            raise Exception(
+                "Truncated MetricFamily, expected {} bytes but only {} remain".format(
+                    mf_size, end - pos
+                )
+            )
+        if wanted is None or wanted(wire.decode_family_name(view, pos, mf_end)):
+            mf = MetricFamily()
+            mf.ParseFromString(view[pos:mf_end])
+            if keep_metric is None or _filter_metrics(mf, keep_metric):
+                metrics.append(mf)
+        pos = mf_end
     return metrics
+
+
+def iter_decode(
+    source,
+    chunk_size: int = 65536,
+    include: PatternsType = None,
+    exclude: PatternsType = None,
+    match_labels: LabelMatchersType = None,
+) -> Iterator[MetricFamily]:
+    """ Decode a stream of encoded MetricFamily objects one at a time.
+
+    The source is read in chunks and each varint delimited MetricFamily
+    frame is reassembled across chunk boundaries before being parsed. Only
+    the bytes of the frame currently being assembled are retained, so memory
+    use is bounded by the size of the largest frame rather than the size of
+    the stream.
+
+    :param source: the encoded data. This can be a binary file object (any
+      object with a ``read`` method), a socket (any object with a ``recv``
+      method), a bytes-like object or an iterable of bytes-like chunks.
+
+    :param chunk_size: the number of bytes to request from a file object or
+      socket on each read.
+
+    :param include: name patterns that families must match to be decoded.
+      See ``decode``.
+
+    :param exclude: name patterns that families must not match to be
+      decoded. See ``decode``.
+
+    :param match_labels: a dict of label matchers that metrics must match to
+      be kept. See ``decode``.
+
+    :returns: an iterator of MetricsFamily objects.
+    """
+    wanted = _name_filter(include, exclude)
+    keep_metric = _label_filter(match_labels)
+    buffer = bytearray()
+    for chunk in _iter_chunks(source, chunk_size):
+        buffer.extend(chunk)
+        pos = 0
+        end = len(buffer)
+        while pos < end:
+            try:
+                mf_size, mf_start = varintDecoder(buffer, pos)
+            except IndexError:
+                # The varint header is split across chunks
+                break
+            mf_end = mf_start + mf_size
+            if mf_end > end:
+                break
+            pos = mf_end
+            if wanted is not None and not wanted(
+                wire.decode_family_name(buffer, mf_start, mf_end)
+            ):
+                continue
+            mf = MetricFamily()
+            mf.ParseFromString(bytes(buffer[mf_start:mf_end]))
+            if keep_metric is None or _filter_metrics(mf, keep_metric):
+                yield mf
+        del buffer[:pos]
+
+    if buffer:
+        raise Exception(
+            "Truncated MetricFamily, {} trailing bytes at end of stream".format(
+                len(buffer)
+            )
+        )
+
+
+def encode_buffers(*metrics: MetricFamily, cache=None) -> List[bytes]:
+    """ Encode MetricFamily objects into a list of buffers.
+
+    The buffers are not joined together, so concatenating them produces the
+    same payload as ``encode`` without the copy required to create it. The
+    list is suitable for scatter-gather output such as ``socket.sendmsg``,
+    ``os.writev`` or an asyncio transport's ``writelines``. The functions in
+    the ``transport`` module send such lists.
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :param cache: an optional ``EncodeCache``. When provided each buffer is
+      a complete frame obtained from the cache, so families that have not
+      changed are not serialized again. Otherwise the list alternates
+      between varint size headers and encoded MetricFamily objects.
+
+    :returns: a list of buffers.
+    """
+    if cache is not None:
+        return [cache.frame(m) for m in metrics]
+    return list(_iter_frame_parts(metrics))
+
+
+def encode_into(buffer: Union[bytearray, memoryview], *metrics: MetricFamily) -> int:
+    """ Encode MetricFamily objects into a caller provided buffer.
+
+    The encoded MetricFamily objects are written from the start of the
+    buffer so that a long lived buffer can be reused across calls. A
+    bytearray is only grown when it is too small to hold the output and is
+    never shrunk, so any bytes beyond the returned size are left over from
+    earlier calls.
+
+    The protobuf runtime can only serialize a message into a new bytes
+    object, so each MetricFamily is still serialized into its own bytes
+    object and then copied into the buffer. Reusing the buffer avoids
+    allocating the combined output, not the per family encodings.
+
+    :param buffer: a writable bytearray or memoryview. A memoryview can not
+      be grown so it must be large enough to hold the output.
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :returns: the number of bytes written to the buffer.
+    """
+    frames = list(_iter_frames(metrics))
+    size = sum([len(h) + len(m) for h, m in frames])
+    if len(buffer) < size:
+        if not isinstance(buffer, bytearray):
+            raise Exception(
+                "Buffer too small, {} bytes required but only {} available".format(
+                    size, len(buffer)
+                )
+            )
+        buffer.extend(bytes(size - len(buffer)))
+
+    pos = 0
+    for header, encoded_metric in frames:
+        end = pos + len(header)
+        buffer[pos:end] = header
+        pos = end + len(encoded_metric)
+        buffer[end:pos] = encoded_metric
+    return size
+
+
+def _iter_frames(metrics: Iterable[MetricFamily]) -> Iterator[Tuple[bytes, bytes]]:
+    """ Return an iterator of (varint size header, encoded MetricFamily) pairs.
+
+    :param metrics: an iterable of MetricsFamily objects.
+    """
+    for m in metrics:
+        if not isinstance(m, MetricFamily):
+            raise Exception(
+                "Expected metrics to be instances of MetricFamily, got {}".format(
+                    type(m)
+                )
+            )
+        encoded_metric = m.SerializeToString()
+        header = bytearray()
+        varintEncoder(header.extend, len(encoded_metric), None)
+        yield bytes(header), encoded_metric
+
+
+def _iter_frame_parts(metrics: Iterable[MetricFamily]) -> Iterator[bytes]:
+    """ Return an iterator of alternating varint size headers and encoded
+    MetricFamily objects.
+
+    :param metrics: an iterable of MetricsFamily objects.
+    """
+    for header, encoded_metric in _iter_frames(metrics):
+        yield header
+        yield encoded_metric
+
+
+def _iter_chunks(source, chunk_size: int) -> Iterator[bytes]:
+    """ Return an iterator of byte chunks read from a source.
+
+    :param source: a bytes-like object, a socket, a binary file object or an
+      iterable of bytes-like chunks.
+
+    :param chunk_size: the number of bytes to request on each read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+        return
+
+    recv = getattr(source, "recv", None)
+    read = getattr(source, "read", None)
+    reader = recv if recv is not None else read
+    if reader is not None:
+        while True:
+            chunk = reader(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def _compile_patterns(patterns: PatternsType) -> List[Callable[[str], bool]]:
+    """ Return a list of match functions for name patterns """
+    if isinstance(patterns, str) or hasattr(patterns, "fullmatch"):
+        patterns = [patterns]
+    matchers = []
+    for pattern in patterns:
+        if isinstance(pattern, str):
+            pattern = re.compile(fnmatch.translate(pattern))
+        matchers.append(pattern.fullmatch)
+    return matchers
+
+
+def _name_filter(
+    include: PatternsType, exclude: PatternsType
+) -> Optional[Callable[[str], bool]]:
+    """ Return a function that reports if a family name is wanted.
+
+    None is returned when there are no patterns so that callers can avoid
+    reading family names.
+    """
+    if include is None and exclude is None:
+        return None
+    included = None if include is None else _compile_patterns(include)
+    excluded = [] if exclude is None else _compile_patterns(exclude)
+
+    def wanted(name: str) -> bool:
+        if included is not None and not any(m(name) for m in included):
+            return False
+        return not any(m(name) for m in excluded)
+
+    return wanted
+
+
+def _label_filter(
+    match_labels: LabelMatchersType,
+) -> Optional[Callable[[Metric], bool]]:
+    """ Return a function that reports if a Metric matches label matchers """
+    if not match_labels:
+        return None
+    matchers = []
+    for name, expected in match_labels.items():
+        if isinstance(expected, str):
+            matchers.append((name, expected.__eq__))
+        else:
+            matchers.append((name, expected.fullmatch))
+
+    def keep(metric: Metric) -> bool:
+        labels = {label.name: label.value for label in metric.label}
+        return all(match(labels.get(name, "")) for name, match in matchers)
+
+    return keep
+
+
+def _filter_metrics(mf: MetricFamily, keep: Callable[[Metric], bool]) -> bool:
+    """ Remove the metrics of a family that are not wanted.
+
+    :returns: True if the family still has metrics.
+    """
+    kept = [metric for metric in mf.metric if keep(metric)]
+    if len(kept) != len(mf.metric):
+        del mf.metric[:]
+        mf.metric.extend(kept)
+    return bool(kept)
@@ -0,0 +1,148 @@
+"""
+This module provides a cache of encoded MetricFamily objects that allows
+families that have not changed since the previous scrape to be sent without
+being serialized again.
+"""
+
+from .api import encode
+from .prometheus_metrics_pb2 import MetricFamily
+from typing import Dict, Hashable, Iterable, List, Mapping
+
+
+class EncodeCache(object):
+    """ A cache of encoded MetricFamily frames.
+
+    Each frame is a MetricFamily object encoded with a varint size header,
+    exactly as produced by ``api.encode``. Frames are cached by the
+    MetricFamily name (which must be unique within an exposition) and are
+    reused until the family changes.
+
+    A cached frame is considered stale, and the family is serialized again,
+    when:
+
+    - the family name has been passed to ``mark_dirty``, or
+    - a content version is supplied for the family and it differs from the
+      version the frame was cached with, or
+    - no content version is supplied and the MetricFamily object is not the
+      same object the frame was cached from.
+
+    MetricFamily objects are mutable. When a cached MetricFamily object is
+    modified in place it must be marked dirty for the change to be encoded.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def mark_dirty(self, *names: str) -> None:
+        """ Mark families as changed so they are serialized on next use.
+
+        :param names: the names of the families that have changed.
+        """
+        self._dirty.update(names)
+
+    def discard(self, name: str) -> None:
+        """ Remove the frame cached for a family, if present.
+
+        :param name: the name of the family to remove.
+        """
+        self._entries.pop(name, None)
+        self._dirty.discard(name)
+
+    def clear(self) -> None:
+        """ Remove all cached frames and reset the statistics. """
+        self._entries.clear()
+        self._dirty.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Return a dict of cache statistics.
+
+        The dict contains the number of cache hits and misses, the number of
+        cached frames and the number of families currently marked dirty.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._entries),
+            dirty=len(self._dirty),
+        )
+
+    def frame(self, family: MetricFamily, version: Hashable = None) -> bytes:
+        """ Return the encoded frame for a MetricFamily.
+
+        :param family: the MetricFamily object to encode.
+
+        :param version: an optional hashable content version for the family.
+          When supplied, the cached frame is reused for any MetricFamily
+          object with the same name and version.
+
+        :returns: the MetricFamily encoded with a varint size header.
+        """
+        if not isinstance(family, MetricFamily):
+            raise Exception(
+                "Expected metrics to be instances of MetricFamily, got {}".format(
+                    type(family)
+                )
+            )
+        name = family.name
+        entry = self._entries.get(name)
+        if entry is not None and name not in self._dirty:
+            cached_family, cached_version, frame = entry
+            if version is None:
+                if cached_version is None and cached_family is family:
+                    self.hits += 1
+                    return frame
+            elif version == cached_version:
+                self.hits += 1
+                return frame
+
+        self.misses += 1
+        frame = encode(family)
+        self._entries[name] = (family, version, frame)
+        self._dirty.discard(name)
+        return frame
+
+    def frames(
+        self,
+        families: Iterable[MetricFamily],
+        versions: Mapping[str, Hashable] = None,
+    ) -> List[bytes]:
+        """ Return a list of encoded frames for MetricFamily objects.
+
+        :param families: an iterable of MetricFamily objects.
+
+        :param versions: an optional mapping of family name to content
+          version. See ``frame`` for details.
+
+        :returns: a list of encoded MetricFamily frames.
+        """
+        if versions is None:
+            return [self.frame(family) for family in families]
+        return [self.frame(family, versions.get(family.name)) for family in families]
+
+    def encode(
+        self, *families: MetricFamily, versions: Mapping[str, Hashable] = None
+    ) -> bytes:
+        """ Encode MetricFamily objects into a bytes object.
+
+        The result is identical to ``api.encode`` but only families that have
+        changed since they were last encoded are serialized.
+
+        :param families: MetricFamily objects to encode.
+
+        :param versions: an optional mapping of family name to content
+          version. See ``frame`` for details.
+
+        :returns: encoded MetricsFamily objects.
+        """
+        return b"".join(self.frames(families, versions))
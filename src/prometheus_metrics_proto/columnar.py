@@ -0,0 +1,680 @@
+"""
+This module provides a columnar representation of encoded MetricFamily
+objects for analytics workloads.
+
+Encoded frames are read directly from the Protocol Buffer wire format into
+NumPy arrays, one array per field, without creating Metric or LabelPair
+objects. This module requires NumPy, which is an optional dependency that
+can be installed using ``pip install prometheus_metrics_proto[numpy]``.
+
+The package does not import this module, so NumPy is only loaded by
+applications that use it with ``from prometheus_metrics_proto import
+columnar``.
+"""
+
+import collections
+import struct
+
+from . import api
+from . import utils
+from . import wire
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    UNTYPED,
+    HISTOGRAM,
+    MetricFamily,
+)
+from .wire import decode_varint, encode_varint, skip_field
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+LabelSetType = Tuple[Tuple[str, str], ...]
+
+# The tag of the Metric field that holds the value for each metric type
+_VALUE_TAGS = {
+    COUNTER: 0x1A,
+    GAUGE: 0x12,
+    SUMMARY: 0x22,
+    UNTYPED: 0x2A,
+    HISTOGRAM: 0x3A,
+}
+
+_unpack_double = struct.Struct("<d").unpack_from
+
+_INT64_SIGN = 1 << 63
+_UINT64_RANGE = 1 << 64
+
+
+class ColumnarFamily(object):
+    """ The metrics of a MetricFamily held as columns of NumPy arrays.
+
+    Row ``i`` of every array describes the ``i``-th Metric of the family.
+
+    :ivar name: the MetricFamily name.
+    :ivar help: the MetricFamily help.
+    :ivar type: the MetricFamily type, e.g. COUNTER.
+
+    :ivar values: a float64 array holding the value of counter, gauge and
+      untyped metrics, or the sample sum of summary and histogram metrics.
+
+    :ivar counts: a uint64 array holding the sample count of summary and
+      histogram metrics. None for other metric types.
+
+    :ivar timestamps: an int64 array of timestamps, in milliseconds. Metrics
+      without a timestamp have a timestamp of 0.
+
+    :ivar label_ids: an int64 array of label set ids, indexing
+      ``label_sets``.
+
+    :ivar label_sets: a list of interned label sets, each a tuple of
+      ``(name, value)`` pairs in encoded order. The list is shared by all the
+      families decoded from one payload, so equal ids mean equal labels
+      across families.
+
+    :ivar quantiles: a float64 array of the quantiles shared by every
+      summary metric. None for other metric types.
+
+    :ivar quantile_values: a 2-D float64 array of quantile values with one
+      row per metric and one column per quantile. None for other metric
+      types.
+
+    :ivar upper_bounds: a float64 array of the bucket upper bounds shared by
+      every histogram metric. None for other metric types.
+
+    :ivar buckets: a 2-D uint64 array of cumulative bucket counts with one
+      row per metric and one column per bucket. None for other metric types.
+    """
+
+    def __init__(self, name: str, help: str, type: int) -> None:
+        self.name = name
+        self.help = help
+        self.type = type
+        self.values = None
+        self.counts = None
+        self.timestamps = None
+        self.label_ids = None
+        self.label_sets = None
+        self.quantiles = None
+        self.quantile_values = None
+        self.upper_bounds = None
+        self.buckets = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def labels(self, index: int) -> Dict[str, str]:
+        """ Return the labels of a metric as a dict.
+
+        :param index: the index of the metric within the family.
+        """
+        return dict(self.label_sets[self.label_ids[index]])
+
+
+def decode_columnar(
+    data: bytes, include: api.PatternsType = None, exclude: api.PatternsType = None
+) -> List[ColumnarFamily]:
+    """ Decode a bytes object into a list of ColumnarFamily objects.
+
+    Summary metrics within a family must share the same quantiles and
+    histogram metrics within a family must share the same buckets, as they
+    do when generated by Prometheus client libraries.
+
+    :param data: a bytes-like object containing encoded MetricsFamily
+      objects, as produced by ``api.encode``.
+
+    :param include: name patterns that families must match to be decoded.
+      See ``api.decode``.
+
+    :param exclude: name patterns that families must not match to be
+      decoded. See ``api.decode``.
+
+    :returns: a list of ColumnarFamily objects.
+    """
+    _require_numpy()
+    wanted = api._name_filter(include, exclude)
+    view = memoryview(data).cast("B")
+    end = len(view)
+    label_ids = {}
+    label_sets = []
+    families = []
+    pos = 0
+    while pos < end:
+        mf_size, pos = decode_varint(view, pos)
+        mf_end = pos + mf_size
+        if mf_end > end:
+            raise Exception(
+                "Truncated MetricFamily, expected {} bytes but only {} remain".format(
+                    mf_size, end - pos
+                )
+            )
+        family = _decode_family(view, pos, mf_end, wanted, label_ids, label_sets)
+        if family is not None:
+            families.append(family)
+        pos = mf_end
+    return families
+
+
+def create_family_from_columns(
+    metric_name: str,
+    metric_help: str,
+    metric_type: utils.MetricType,
+    label_names: Sequence[str],
+    label_values: Sequence[Sequence[Any]],
+    values: Any,
+    quantiles: Sequence[float] = None,
+    upper_bounds: Sequence[float] = None,
+    counts: Any = None,
+    sums: Any = None,
+    timestamps: Union[bool, Any] = None,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+    encoded: bool = False,
+) -> Union[MetricFamily, bytes]:
+    """ Create a MetricFamily, or its encoded frame, from columns of values.
+
+    This is a bulk alternative to ``utils.create_metric_family`` for metrics
+    that are already held in arrays. Labels are unified, ordered and encoded
+    once for the whole family and values are converted in a single NumPy
+    operation, so the per metric cost is a few bytes operations. The
+    encoding is identical to the one produced by ``utils.create_metric_family``
+    for the equivalent metrics.
+
+    :param metric_name: the name of the metric family.
+    :param metric_help: the help text of the metric family.
+    :param metric_type: the type of the metric family, e.g. COUNTER.
+
+    :param label_names: the names of the labels held in each row of
+      label_values.
+
+    :param label_values: a 2-D array, or sequence of tuples, with one row of
+      label values per metric. Values are converted with ``str``.
+
+    :param values: for counter, gauge and untyped families a 1-D array of
+      values. For summary families a 2-D array of quantile values with one
+      column per quantile. For histogram families a 2-D array of cumulative
+      bucket counts with one column per bucket.
+
+    :param quantiles: the quantiles of the columns of a summary family.
+    :param upper_bounds: the bucket upper bounds of the columns of a
+      histogram family.
+
+    :param counts: a 1-D array of sample counts of a summary or histogram
+      family.
+    :param sums: a 1-D array of sample sums of a summary or histogram family.
+
+    :param timestamps: a 1-D array of timestamps, in milliseconds, or True to
+      timestamp every metric with the current time. By default metrics do
+      not have a timestamp.
+
+    :param const_labels: a dict of constant labels added to every metric.
+      Labels in label_names take precedence.
+
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+
+    :param encoded: a boolean that determines if the MetricFamily is returned
+      as an encoded frame, prefixed with a varint size header, rather than
+      as a MetricFamily object.
+
+    :returns: a MetricFamily object or an encoded frame.
+    """
+    _require_numpy()
+    if metric_type not in _VALUE_TAGS:
+        raise Exception("Invalid metric_type: {}".format(metric_type))
+
+    rows = len(label_values)
+    aggregate = metric_type == SUMMARY or metric_type == HISTOGRAM
+    if aggregate:
+        keys = quantiles if metric_type == SUMMARY else upper_bounds
+        if keys is None or counts is None or sums is None:
+            raise Exception(
+                "{} are required along with counts and sums for metric_type: "
+                "{}".format(
+                    "quantiles" if metric_type == SUMMARY else "upper_bounds",
+                    metric_type,
+                )
+            )
+        if metric_type == SUMMARY:
+            values = np.asarray(values, dtype=np.float64)
+        else:
+            values = _as_uint64(values)
+        values = values.reshape(rows, len(keys))
+        counts = _as_uint64(counts).tolist()
+        sums = _pack_doubles(sums)
+    else:
+        values = _pack_doubles(values)
+    for column in (values, counts, sums) if aggregate else (values,):
+        if len(column) != rows:
+            raise Exception(
+                "Expected {} rows of values to match the label values, got "
+                "{}".format(rows, len(column))
+            )
+
+    label_blocks = _encode_label_columns(
+        label_names, label_values, const_labels, ordered
+    )
+
+    if timestamps is True:
+        timestamp_fields = [wire._timestamp_field(True)] * rows
+    elif timestamps is not None:
+        timestamp_fields = [
+            wire._METRIC_TIMESTAMP_MS + encode_varint(t & wire._UINT64_MASK)
+            for t in np.asarray(timestamps, dtype=np.int64).tolist()
+        ]
+        if len(timestamp_fields) != rows:
+            raise Exception(
+                "Expected {} timestamps to match the label values".format(rows)
+            )
+    else:
+        timestamp_fields = [b""] * rows
+
+    tag = bytes((_VALUE_TAGS[metric_type],))
+    if metric_type == SUMMARY:
+        metrics = _encode_summary_columns(
+            label_blocks, timestamp_fields, quantiles, values, counts, sums
+        )
+    elif metric_type == HISTOGRAM:
+        metrics = _encode_histogram_columns(
+            label_blocks, timestamp_fields, upper_bounds, values, counts, sums
+        )
+    else:
+        prefix = tag + b"\x09" + wire._VALUE
+        metrics = [
+            label_block + prefix + value + timestamp_field
+            for label_block, value, timestamp_field in zip(
+                label_blocks, values, timestamp_fields
+            )
+        ]
+
+    name = metric_name.encode("utf-8")
+    help_ = metric_help.encode("utf-8")
+    parts = [
+        wire._FAMILY_NAME,
+        encode_varint(len(name)),
+        name,
+        wire._FAMILY_HELP,
+        encode_varint(len(help_)),
+        help_,
+        wire._FAMILY_TYPE,
+        encode_varint(metric_type),
+    ]
+    for metric in metrics:
+        parts.append(wire._FAMILY_METRIC)
+        parts.append(encode_varint(len(metric)))
+        parts.append(metric)
+    payload = b"".join(parts)
+    if encoded:
+        return encode_varint(len(payload)) + payload
+    return MetricFamily.FromString(payload)
+
+
+def _require_numpy() -> None:
+    """ Raise an exception if NumPy is not installed """
+    if np is None:
+        raise ImportError(
+            "NumPy is required for columnar metrics, install it using "
+            "'pip install prometheus_metrics_proto[numpy]'"
+        )
+
+
+def _decode_family(view, pos, end, wanted, label_ids, label_sets) -> ColumnarFamily:
+    """ Decode an encoded MetricFamily into a ColumnarFamily.
+
+    :returns: a ColumnarFamily, or None if the family is not wanted.
+    """
+    name = ""
+    help_ = ""
+    type_ = COUNTER
+    spans = []
+    while pos < end:
+        tag, pos = decode_varint(view, pos)
+        if tag == 0x0A or tag == 0x12 or tag == 0x22:
+            size, pos = decode_varint(view, pos)
+            if tag == 0x0A:
+                name = str(view[pos : pos + size], "utf-8")
+            elif tag == 0x12:
+                help_ = str(view[pos : pos + size], "utf-8")
+            else:
+                spans.append((pos, pos + size))
+            pos += size
+        elif tag == 0x18:
+            type_, pos = decode_varint(view, pos)
+        else:
+            pos = skip_field(view, pos, tag & 0x07)
+
+    if wanted is not None and not wanted(name):
+        return None
+    if type_ not in _VALUE_TAGS:
+        raise Exception("Invalid metric_type: {}".format(type_))
+
+    value_tag = _VALUE_TAGS[type_]
+    aggregate = type_ == SUMMARY or type_ == HISTOGRAM
+    values = []
+    counts = []
+    timestamps = []
+    ids = []
+    keys = None
+    rows = []
+    for start, stop in spans:
+        labels, timestamp, value = _decode_metric(view, start, stop, value_tag)
+        label_id = label_ids.get(labels)
+        if label_id is None:
+            label_id = len(label_sets)
+            label_ids[labels] = label_id
+            label_sets.append(_decode_labels(labels))
+        ids.append(label_id)
+        timestamps.append(timestamp)
+        if value is None:
+            # The metric does not hold a value of the family type
+            value = (0, 0.0, [], []) if aggregate else 0.0
+        if aggregate:
+            count, sum_, row_keys, row = value
+            if keys is None:
+                keys = row_keys
+            elif row_keys != keys:
+                raise Exception(
+                    "Metrics of {} do not share the same {}".format(
+                        name, "quantiles" if type_ == SUMMARY else "buckets"
+                    )
+                )
+            counts.append(count)
+            values.append(sum_)
+            rows.append(row)
+        else:
+            values.append(value)
+
+    family = ColumnarFamily(name, help_, type_)
+    family.values = np.array(values, dtype=np.float64)
+    family.timestamps = np.array(timestamps, dtype=np.int64)
+    family.label_ids = np.array(ids, dtype=np.int64)
+    family.label_sets = label_sets
+    if aggregate:
+        keys = np.array(keys or [], dtype=np.float64)
+        family.counts = np.array(counts, dtype=np.uint64)
+        if type_ == SUMMARY:
+            family.quantiles = keys
+            family.quantile_values = np.array(rows, dtype=np.float64).reshape(
+                len(rows), len(keys)
+            )
+        else:
+            family.upper_bounds = keys
+            family.buckets = np.array(rows, dtype=np.uint64).reshape(
+                len(rows), len(keys)
+            )
+    return family
+
+
+def _decode_metric(view, pos, end, value_tag) -> tuple:
+    """ Decode an encoded Metric.
+
+    :returns: a tuple of the encoded labels, the timestamp and the decoded
+      value of the field with value_tag, or None if that field is absent.
+    """
+    labels = []
+    timestamp = 0
+    value = None
+    while pos < end:
+        tag, pos = decode_varint(view, pos)
+        if tag == 0x0A:
+            size, start = decode_varint(view, pos)
+            pos = start + size
+            labels.append(bytes(view[start:pos]))
+        elif tag == value_tag:
+            size, pos = decode_varint(view, pos)
+            if tag == 0x22 or tag == 0x3A:
+                value = _decode_aggregate(view, pos, pos + size, tag == 0x22)
+            else:
+                value = _decode_value(view, pos, pos + size)
+            pos += size
+        elif tag == 0x30:
+            timestamp, pos = decode_varint(view, pos)
+            if timestamp >= _INT64_SIGN:
+                timestamp -= _UINT64_RANGE
+        else:
+            pos = skip_field(view, pos, tag & 0x07)
+    return tuple(labels), timestamp, value
+
+
+def _decode_value(view, pos, end) -> float:
+    """ Decode the value of an encoded Counter, Gauge or Untyped """
+    value = 0.0
+    while pos < end:
+        tag, pos = decode_varint(view, pos)
+        if tag == 0x09:
+            value = _unpack_double(view, pos)[0]
+            pos += 8
+        else:
+            pos = skip_field(view, pos, tag & 0x07)
+    return value
+
+
+def _decode_aggregate(view, pos, end, summary: bool) -> tuple:
+    """ Decode an encoded Summary or Histogram.
+
+    :returns: a tuple of the sample count, the sample sum, a list of the
+      quantiles or bucket upper bounds and a list of the quantile values or
+      bucket cumulative counts.
+    """
+    # Quantile holds (quantile = 1, value = 2) and Bucket holds
+    # (cumulative_count = 1, upper_bound = 2). The key tag identifies the
+    # field used as the column key and the other field holds the row value.
+    key_tag = 0x09 if summary else 0x11
+    count = 0
+    sum_ = 0.0
+    keys = []
+    row = []
+    while pos < end:
+        tag, pos = decode_varint(view, pos)
+        if tag == 0x08:
+            count, pos = decode_varint(view, pos)
+        elif tag == 0x11:
+            sum_ = _unpack_double(view, pos)[0]
+            pos += 8
+        elif tag == 0x1A:
+            size, pos = decode_varint(view, pos)
+            item_end = pos + size
+            key = 0.0
+            value = 0.0 if summary else 0
+            while pos < item_end:
+                tag, pos = decode_varint(view, pos)
+                if tag == key_tag:
+                    key = _unpack_double(view, pos)[0]
+                    pos += 8
+                elif tag == 0x11:
+                    value = _unpack_double(view, pos)[0]
+                    pos += 8
+                elif tag == 0x08:
+                    value, pos = decode_varint(view, pos)
+                else:
+                    pos = skip_field(view, pos, tag & 0x07)
+            keys.append(key)
+            row.append(value)
+        else:
+            pos = skip_field(view, pos, tag & 0x07)
+    return count, sum_, keys, row
+
+
+def _decode_labels(labels: Tuple[bytes, ...]) -> LabelSetType:
+    """ Decode encoded LabelPair messages into a tuple of (name, value) pairs """
+    pairs = []
+    for encoded in labels:
+        name = value = ""
+        pos = 0
+        end = len(encoded)
+        while pos < end:
+            tag, pos = decode_varint(encoded, pos)
+            if tag == 0x0A or tag == 0x12:
+                size, pos = decode_varint(encoded, pos)
+                text = encoded[pos : pos + size].decode("utf-8")
+                pos += size
+                if tag == 0x0A:
+                    name = text
+                else:
+                    value = text
+            else:
+                pos = skip_field(encoded, pos, tag & 0x07)
+        pairs.append((name, value))
+    return tuple(pairs)
+
+
+def _as_uint64(values: Any) -> "np.ndarray":
+    """ Return an array of counts as uint64 values.
+
+    Casting a negative value to uint64 wraps it, so negative values are
+    rejected like they are when a Metric is created.
+    """
+    array = np.asarray(values)
+    if array.dtype.kind != "u":
+        negative = array < 0
+        if negative.any():
+            raise ValueError("Value out of range: {}".format(array[negative][0]))
+    return array.astype(np.uint64)
+
+
+def _pack_doubles(values: Any) -> List[bytes]:
+    """ Return the little endian encoding of each value in an array """
+    packed = np.ascontiguousarray(values, dtype="<f8").reshape(-1).tobytes()
+    return [packed[i : i + 8] for i in range(0, len(packed), 8)]
+
+
+def _encode_label_columns(
+    label_names: Sequence[str],
+    label_values: Sequence[Sequence[Any]],
+    const_labels: utils.LabelsType,
+    ordered: bool,
+) -> List[bytes]:
+    """ Return the encoded label fields of each row of label values.
+
+    Labels are combined with const labels and ordered once for all rows in
+    the same way as ``utils._unify_labels``, so each row only requires its
+    values to be encoded.
+    """
+    # Each column is either the index of a label_values column or a constant
+    # value, keyed by label name in the unified order.
+    columns = collections.OrderedDict()
+    if const_labels:
+        for name, value in const_labels.items():
+            columns[name] = str(value)
+    for index, name in enumerate(label_names):
+        columns[name] = index
+    items = list(columns.items())
+    if ordered:
+        items.sort(key=lambda t: t[0])
+
+    prefixes = []
+    for name, column in items:
+        name = name.encode("utf-8")
+        prefix = wire._LABEL_NAME + encode_varint(len(name)) + name + wire._LABEL_VALUE
+        if isinstance(column, str):
+            value = column.encode("utf-8")
+            pair = prefix + encode_varint(len(value)) + value
+            prefixes.append(wire._METRIC_LABEL + encode_varint(len(pair)) + pair)
+        else:
+            prefixes.append((prefix, column))
+
+    if hasattr(label_values, "tolist"):
+        label_values = label_values.tolist()
+    blocks = []
+    for row in label_values:
+        if len(row) != len(label_names):
+            raise Exception(
+                "Expected {} label values, got {}".format(len(label_names), len(row))
+            )
+        parts = []
+        for prefix in prefixes:
+            if type(prefix) is bytes:
+                parts.append(prefix)
+                continue
+            prefix, column = prefix
+            value = row[column]
+            value = (value if type(value) is str else str(value)).encode("utf-8")
+            pair_size = len(prefix) + len(value) + len(encode_varint(len(value)))
+            parts.append(wire._METRIC_LABEL)
+            parts.append(encode_varint(pair_size))
+            parts.append(prefix)
+            parts.append(encode_varint(len(value)))
+            parts.append(value)
+        blocks.append(b"".join(parts))
+    return blocks
+
+
+def _encode_summary_columns(
+    label_blocks, timestamp_fields, quantiles, values, counts, sums
+) -> List[bytes]:
+    """ Return encoded Metrics holding Summaries """
+    prefixes = [
+        wire._QUANTILE_PREFIX + q + wire._QUANTILE_VALUE
+        for q in _pack_doubles(quantiles)
+    ]
+    packed = _pack_doubles(values)
+    width = len(prefixes)
+    metrics = []
+    for row, label_block in enumerate(label_blocks):
+        parts = [
+            wire._SAMPLE_COUNT,
+            encode_varint(counts[row]),
+            wire._SAMPLE_SUM,
+            sums[row],
+        ]
+        offset = row * width
+        for column, prefix in enumerate(prefixes):
+            parts.append(prefix)
+            parts.append(packed[offset + column])
+        summary = b"".join(parts)
+        metrics.append(
+            b"".join(
+                (
+                    label_block,
+                    wire._METRIC_SUMMARY,
+                    encode_varint(len(summary)),
+                    summary,
+                    timestamp_fields[row],
+                )
+            )
+        )
+    return metrics
+
+
+def _encode_histogram_columns(
+    label_blocks, timestamp_fields, upper_bounds, values, counts, sums
+) -> List[bytes]:
+    """ Return encoded Metrics holding Histograms """
+    suffixes = [wire._BUCKET_UPPER_BOUND + b for b in _pack_doubles(upper_bounds)]
+    metrics = []
+    for row, row_values in enumerate(values.tolist()):
+        parts = [
+            wire._SAMPLE_COUNT,
+            encode_varint(counts[row]),
+            wire._SAMPLE_SUM,
+            sums[row],
+        ]
+        for cumulative_count, suffix in zip(row_values, suffixes):
+            cumulative_count = encode_varint(cumulative_count)
+            parts.append(wire._BUCKET)
+            # A Bucket holds a tagged varint and a tagged double
+            parts.append(wire._SMALL_VARINTS[len(cumulative_count) + 10])
+            parts.append(wire._BUCKET_CUMULATIVE_COUNT)
+            parts.append(cumulative_count)
+            parts.append(suffix)
+        histogram = b"".join(parts)
+        # The timestamp_ms field number is lower than the histogram field
+        # number so it is encoded first.
+        metrics.append(
+            b"".join(
+                (
+                    label_blocks[row],
+                    timestamp_fields[row],
+                    wire._METRIC_HISTOGRAM,
+                    encode_varint(len(histogram)),
+                    histogram,
+                )
+            )
+        )
+    return metrics
@@ -0,0 +1,353 @@
+"""
+This module provides compressed exposition of encoded MetricFamily objects.
+
+Frames are compressed incrementally as the encoder produces them, so a
+compressed response can start being sent before the last MetricFamily has
+been serialized and there is no pause to compress the complete payload.
+
+gzip compression uses the standard library ``zlib`` module. zstd
+compression uses the ``compression.zstd`` module of Python 3.14 and later,
+or the optional ``zstandard`` package which can be installed using
+``pip install prometheus_metrics_proto[zstd]``.
+"""
+
+import zlib
+
+from . import api
+from .prometheus_metrics_pb2 import MetricFamily
+from typing import Callable, Dict, Hashable, Iterable, Iterator, Optional
+
+try:
+    from compression import zstd as _zstd
+except ImportError:  # pragma: no cover
+    _zstd = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# The supported content codings, in order of preference.
+ENCODINGS = tuple(
+    encoding
+    for encoding, available in (
+        (ZSTD, _zstd is not None or zstandard is not None),
+        (GZIP, True),
+        (IDENTITY, True),
+    )
+    if available
+)
+
+# The compression level to use for payloads up to a size in bytes. Small
+# payloads are cheap to compress well while large payloads use a faster
+# level to bound the time spent compressing each scrape.
+_LEVELS = {
+    GZIP: ((64 * 1024, 6), (1024 * 1024, 4), (None, 1)),
+    ZSTD: ((64 * 1024, 6), (1024 * 1024, 3), (None, 1)),
+}
+
+# The size of the slices an already encoded payload is compressed in.
+_SLICE_SIZE = 64 * 1024
+
+
+def compression_level(encoding: str, size: Optional[int]) -> int:
+    """ Return the compression level to use for a payload.
+
+    :param encoding: the content coding, ``gzip`` or ``zstd``.
+
+    :param size: the expected size of the uncompressed payload in bytes, or
+      None if it is not known.
+
+    :returns: a compression level suitable for the encoding.
+    """
+    if encoding not in _LEVELS:
+        raise Exception("Invalid encoding: {}".format(encoding))
+    levels = _LEVELS[encoding]
+    if size is None:
+        # Without a size hint, assume a medium sized payload.
+        return levels[1][1]
+    for limit, level in levels[:-1]:
+        if size <= limit:
+            return level
+    return levels[-1][1]
+
+
+def iter_compress(
+    chunks: Iterable[bytes], encoding: str = GZIP, level: int = None
+) -> Iterator[bytes]:
+    """ Compress a sequence of chunks, lazily.
+
+    Each chunk is passed to the compressor as it is consumed and compressed
+    output is yielded as soon as the compressor produces it, so
+    concatenating the yielded chunks produces a complete gzip member or
+    zstd frame.
+
+    :param chunks: an iterable (e.g. a generator) of bytes objects.
+
+    :param encoding: the content coding, ``gzip``, ``zstd`` or ``identity``.
+
+    :param level: the compression level. Defaults to a level suitable for a
+      medium sized payload.
+
+    :returns: an iterator of compressed chunks.
+    """
+    if encoding == IDENTITY:
+        yield from chunks
+        return
+
+    compressor = _compressor(encoding, level)
+    compress = compressor.compress
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    data = compressor.flush()
+    if data:
+        yield data
+
+
+def iter_encode_compressed(
+    metrics: Iterable[MetricFamily], encoding: str = GZIP, level: int = None
+) -> Iterator[bytes]:
+    """ Encode MetricFamily objects and compress the frames as they are
+    produced, lazily.
+
+    :param metrics: an iterable (e.g. a generator) of MetricsFamily objects.
+
+    :param encoding: the content coding, ``gzip``, ``zstd`` or ``identity``.
+
+    :param level: the compression level. See ``iter_compress`` for details.
+
+    :returns: an iterator of compressed chunks.
+    """
+    return iter_compress(api.iter_encode(metrics), encoding, level)
+
+
+def encode_compressed(
+    *metrics: MetricFamily, encoding: str = GZIP, level: int = None
+) -> bytes:
+    """ Encode MetricFamily objects into a compressed bytes object.
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :param encoding: the content coding, ``gzip``, ``zstd`` or ``identity``.
+
+    :param level: the compression level. See ``iter_compress`` for details.
+
+    :returns: the compressed payload.
+    """
+    return b"".join(iter_encode_compressed(metrics, encoding, level))
+
+
+def select_encoding(accept_encoding: Optional[str]) -> str:
+    """ Return the content coding to respond with for an ``Accept-Encoding``
+    header.
+
+    The supported coding with the highest quality is chosen, ties going to
+    the first coding in ``ENCODINGS``. ``identity`` is returned when the
+    client does not accept a compressed coding.
+
+    :param accept_encoding: the value of an ``Accept-Encoding`` header, or
+      None.
+
+    :returns: one of the content codings in ``ENCODINGS``.
+    """
+    if not accept_encoding:
+        return IDENTITY
+
+    qualities = {}
+    wildcard = 0.0
+    for coding in accept_encoding.split(","):
+        coding, _, params = coding.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        key, _, value = params.partition("=")
+        if key.strip().lower() == "q":
+            try:
+                quality = min(max(float(value), 0.0), 1.0)
+            except ValueError:
+                continue
+        if coding == "*":
+            wildcard = quality
+        elif coding in ENCODINGS:
+            qualities[coding] = quality
+
+    best = IDENTITY
+    best_quality = 0.0
+    for encoding in ENCODINGS:
+        if encoding == IDENTITY:
+            break
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedCache(object):
+    """ A cache of compressed exposition bodies keyed on a registry version.
+
+    The uncompressed body and the body compressed with each content coding
+    are cached for the current version, and are discarded when a different
+    version is supplied. The version must change whenever the families
+    change, e.g. a counter incremented by the registry on every update.
+
+    When a body is not cached it is encoded and compressed incrementally
+    while it is being sent, and both the compressed and the uncompressed
+    body are cached once the last chunk has been produced. The compression
+    level is picked from the size of the uncompressed body, or the size of
+    the previous version's body when it has not been encoded yet.
+    """
+
+    def __init__(
+        self, encoder: Callable[[Iterable[MetricFamily]], Iterator[bytes]] = None
+    ) -> None:
+        """ Create a new cache.
+
+        :param encoder: a function that lazily encodes an iterable of
+          MetricFamily objects into chunks. Defaults to ``api.iter_encode``.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._encoder = encoder or api.iter_encode
+        self._version = None
+        self._bodies = {}
+        self._size_hint = None
+
+    def clear(self) -> None:
+        """ Remove all cached bodies and reset the statistics. """
+        self._version = None
+        self._bodies.clear()
+        self._size_hint = None
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Return a dict of cache statistics.
+
+        The dict contains the number of cache hits and misses and the number
+        of bodies currently cached.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._bodies))
+
+    def body(
+        self, families: Iterable[MetricFamily], version: Hashable, encoding: str = GZIP
+    ) -> bytes:
+        """ Return the body of some families with a content coding.
+
+        :param families: an iterable of MetricFamily objects.
+
+        :param version: a hashable version of the families.
+
+        :param encoding: the content coding, ``gzip``, ``zstd`` or
+          ``identity``.
+
+        :returns: the encoded and compressed body.
+        """
+        return b"".join(self.iter_body(families, version, encoding))
+
+    def iter_body(
+        self, families: Iterable[MetricFamily], version: Hashable, encoding: str = GZIP
+    ) -> Iterator[bytes]:
+        """ Return the body of some families with a content coding, lazily.
+
+        A cached body is returned as a single chunk. Otherwise the families
+        are only encoded and compressed as the chunks are consumed and the
+        body is cached once the iterator is exhausted.
+
+        :param families: an iterable of MetricFamily objects.
+
+        :param version: a hashable version of the families.
+
+        :param encoding: the content coding, ``gzip``, ``zstd`` or
+          ``identity``.
+
+        :returns: an iterator of chunks.
+        """
+        if encoding not in ENCODINGS:
+            raise Exception("Invalid encoding: {}".format(encoding))
+        if version != self._version:
+            self._version = version
+            self._bodies.clear()
+
+        body = self._bodies.get(encoding)
+        if body is not None:
+            self.hits += 1
+            return iter((body,))
+
+        self.misses += 1
+        return self._iter_miss(families, version, encoding)
+
+    def _iter_miss(
+        self, families: Iterable[MetricFamily], version: Hashable, encoding: str
+    ) -> Iterator[bytes]:
+        """ Encode and compress a body that is not cached, then cache it """
+        raw = self._bodies.get(IDENTITY)
+        if raw is not None:
+            # The uncompressed body is already known, so only compress it.
+            level = _level(encoding, len(raw))
+            view = memoryview(raw)
+            slices = (
+                view[i : i + _SLICE_SIZE] for i in range(0, len(raw), _SLICE_SIZE)
+            )
+            chunks = []
+            for chunk in iter_compress(slices, encoding, level):
+                chunks.append(chunk)
+                yield chunk
+            self._store(version, encoding, b"".join(chunks))
+            return
+
+        frames = []
+        chunks = []
+
+        def iter_frames():
+            for frame in self._encoder(families):
+                frames.append(frame)
+                yield frame
+
+        level = _level(encoding, self._size_hint)
+        for chunk in iter_compress(iter_frames(), encoding, level):
+            chunks.append(chunk)
+            yield chunk
+
+        raw = b"".join(frames)
+        self._size_hint = len(raw)
+        self._store(version, IDENTITY, raw)
+        if encoding != IDENTITY:
+            self._store(version, encoding, b"".join(chunks))
+
+    def _store(self, version: Hashable, encoding: str, body: bytes) -> None:
+        """ Cache a body unless the version changed while it was produced """
+        if version == self._version:
+            self._bodies[encoding] = body
+
+
+def _level(encoding: str, size: Optional[int]) -> Optional[int]:
+    """ Return the compression level for a payload, or None for identity """
+    if encoding == IDENTITY:
+        return None
+    return compression_level(encoding, size)
+
+
+def _compressor(encoding: str, level: int = None):
+    """ Return an object with ``compress`` and ``flush`` methods that
+    compresses data with a content coding.
+    """
+    if level is None:
+        level = compression_level(encoding, None)
+    if encoding == GZIP:
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == ZSTD:
+        if _zstd is not None:
+            return _zstd.ZstdCompressor(level=level)
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=level).compressobj()
+        raise ImportError(
+            "zstd compression requires Python 3.14 or the zstandard package, "
+            "install it using 'pip install prometheus_metrics_proto[zstd]'"
+        )
+    raise Exception("Invalid encoding: {}".format(encoding))
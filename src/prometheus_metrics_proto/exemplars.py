@@ -0,0 +1,210 @@
+"""
+This module provides bounded sampling of exemplars for counters and
+histograms.
+
+An exemplar is an observation along with labels that link it to data outside
+of the metric, such as the ID of the trace in which the observation was made.
+An ExemplarReservoir retains a fixed number of exemplars chosen uniformly at
+random from the observations offered to it. Slots are allocated up front and
+the reservoir uses Algorithm L, which computes how many observations to skip
+before the next replacement, so offering an observation that is not sampled
+costs a counter increment and a comparison.
+"""
+
+import math
+import random
+import threading
+import time
+
+from . import histograms
+from . import utils
+from .prometheus_metrics_pb2 import Exemplar
+from typing import Callable, Dict, List, Sequence
+
+
+class ExemplarReservoir(object):
+    """ A fixed size reservoir of exemplars.
+
+    Each observation offered since the reservoir was created or last reset
+    has the same probability of being retained. The labels passed to
+    ``offer`` are retained by reference and must not be modified afterwards.
+    The reservoir is safe to use from multiple threads.
+
+    :param size: the number of exemplars to retain. By default this is 1.
+
+    :param clock: a function returning the current time in seconds since the
+      epoch, used to timestamp exemplars. It is only called when an
+      observation is retained. By default this is ``time.time``.
+
+    :param rng: an optional ``random.Random`` instance used to select
+      observations. By default the ``random`` module is used.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        clock: Callable[[], float] = time.time,
+        rng: random.Random = None,
+    ) -> None:
+        if size < 1:
+            raise Exception("Invalid size, expected at least 1, got {}".format(size))
+        self.size = size
+        self._clock = clock
+        self._random = (rng or random).random
+        self._lock = threading.Lock()
+        self._labels = [None] * size
+        self._values = [0.0] * size
+        self._timestamps = [0.0] * size
+        self._seen = 0
+        self._next = 0
+        self._weight = 1.0
+        self._last = -1
+
+    @property
+    def seen(self) -> int:
+        """ Return the number of observations offered since the last reset """
+        return self._seen
+
+    def offer(self, value: float, labels: utils.LabelsType) -> bool:
+        """ Offer an observation to the reservoir.
+
+        :param value: the observed value.
+
+        :param labels: a dict of labels that identify the exemplar. The
+          combined length of the label names and values must not exceed
+          ``utils.EXEMPLAR_MAX_LABEL_LENGTH`` characters.
+
+        :returns: True if the observation was retained.
+        """
+        with self._lock:
+            self._seen += 1
+            if self.size < self._seen < self._next:
+                return False
+            utils._check_exemplar_labels(labels)
+            if self._seen <= self.size:
+                index = self._seen - 1
+            else:
+                index = int(self._random() * self.size)
+            if self._seen >= self.size:
+                self._skip()
+            self._labels[index] = labels
+            self._values[index] = value
+            self._timestamps[index] = self._clock()
+            self._last = index
+        return True
+
+    def exemplar(self) -> Exemplar:
+        """ Return the most recently retained exemplar, or None if the
+        reservoir is empty.
+
+        This suits the single exemplar fields of the Counter and Bucket
+        messages. With a size of 1 the exemplar is a uniform sample of the
+        observations offered since the last reset.
+        """
+        with self._lock:
+            index = self._last
+            if index < 0:
+                return None
+            sample = self._labels[index], self._values[index], self._timestamps[index]
+        return utils.create_exemplar(*sample)
+
+    def exemplars(self) -> List[Exemplar]:
+        """ Return the retained exemplars """
+        with self._lock:
+            count = min(self._seen, self.size)
+            samples = list(zip(self._labels, self._values, self._timestamps))[:count]
+        return [utils.create_exemplar(*sample) for sample in samples]
+
+    def reset(self) -> None:
+        """ Discard all retained exemplars """
+        with self._lock:
+            for index in range(self.size):
+                self._labels[index] = None
+            self._seen = 0
+            self._next = 0
+            self._weight = 1.0
+            self._last = -1
+
+    def _skip(self) -> None:
+        """ Compute the position of the next observation to retain.
+
+        Algorithm L maintains the largest of the random keys of the retained
+        observations and draws the number of observations to skip from the
+        geometric distribution that it implies.
+        """
+        self._weight *= math.exp(math.log(self._uniform()) / self.size)
+        skip = math.floor(math.log(self._uniform()) / math.log1p(-self._weight))
+        self._next = self._seen + skip + 1
+
+    def _uniform(self) -> float:
+        """ Return a random float in the open interval (0, 1) """
+        value = self._random()
+        while value == 0.0:  # pragma: no cover
+            value = self._random()
+        return value
+
+
+class HistogramExemplarSampler(object):
+    """ Samples exemplars for each bucket of a histogram.
+
+    Each bucket has its own ExemplarReservoir, allocated up front, so every
+    bucket that has received an observation has an exemplar regardless of
+    how the observations are distributed.
+
+    :param upper_bounds: the upper bounds of the buckets in increasing order.
+      A +Inf upper bound is added if it is not present.
+
+    :param size: the number of exemplars to retain per bucket. By default
+      this is 1.
+
+    :param clock: a function returning the current time in seconds since the
+      epoch, used to timestamp exemplars. By default this is ``time.time``.
+
+    :param rng: an optional ``random.Random`` instance used to select
+      observations. By default the ``random`` module is used.
+    """
+
+    def __init__(
+        self,
+        upper_bounds: Sequence[float],
+        size: int = 1,
+        clock: Callable[[], float] = time.time,
+        rng: random.Random = None,
+    ) -> None:
+        self.upper_bounds = histograms._check_bounds(upper_bounds)
+        self._reservoirs = [
+            ExemplarReservoir(size=size, clock=clock, rng=rng)
+            for _ in self.upper_bounds
+        ]
+
+    def observe(self, value: float, labels: utils.LabelsType) -> bool:
+        """ Offer an observation to the reservoir of the bucket it belongs to.
+
+        :param value: the observed value.
+
+        :param labels: a dict of labels that identify the exemplar.
+
+        :returns: True if the observation was retained.
+        """
+        index = histograms._bucket_index(self.upper_bounds, value)
+        return self._reservoirs[index].offer(value, labels)
+
+    def exemplars(self) -> Dict[float, Exemplar]:
+        """ Return the most recently retained exemplar of each bucket.
+
+        :returns: a dict mapping bucket upper bounds to Exemplar objects,
+          which can be passed as the exemplars of
+          ``utils.create_histogram_metric``. Buckets without observations
+          are omitted.
+        """
+        exemplars = {}
+        for upper_bound, reservoir in zip(self.upper_bounds, self._reservoirs):
+            exemplar = reservoir.exemplar()
+            if exemplar is not None:
+                exemplars[upper_bound] = exemplar
+        return exemplars
+
+    def reset(self) -> None:
+        """ Discard all retained exemplars """
+        for reservoir in self._reservoirs:
+            reservoir.reset()
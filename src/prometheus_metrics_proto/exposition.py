@@ -0,0 +1,251 @@
+"""
+This module provides HTTP content negotiation between the exposition
+formats supported by this package: the delimited Protocol Buffer format
+produced by ``api.encode``, the text format (0.0.4) and OpenMetrics 1.0.
+
+An ``ExpositionCache`` holds the encoded body of each format for the most
+recent scrape so that scrapers asking for different formats can be served
+from one set of families without encoding them again for every request.
+"""
+
+from . import api
+from . import openmetrics
+from . import text
+from .prometheus_metrics_pb2 import MetricFamily
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+PROTOBUF_CONTENT_TYPE = (
+    "application/vnd.google.protobuf; "
+    "proto=io.prometheus.client.MetricFamily; encoding=delimited"
+)
+TEXT_CONTENT_TYPE = text.CONTENT_TYPE
+OPENMETRICS_CONTENT_TYPE = openmetrics.CONTENT_TYPE
+
+# The supported formats, cheapest to encode first. When a client accepts
+# several formats equally the cheapest one is chosen.
+FORMATS = (PROTOBUF_CONTENT_TYPE, TEXT_CONTENT_TYPE, OPENMETRICS_CONTENT_TYPE)
+
+_ENCODERS = {
+    PROTOBUF_CONTENT_TYPE: api.encode,
+    TEXT_CONTENT_TYPE: text.encode_text,
+    OPENMETRICS_CONTENT_TYPE: openmetrics.encode_openmetrics,
+}
+
+
+class ExpositionCache(object):
+    """ A cache of encoded exposition bodies for the current scrape.
+
+    The cache holds at most one body per format, all encoded from the same
+    families. The cached bodies are discarded when the families change,
+    which is detected as follows:
+
+    - when a version is supplied, the bodies are reused for any families
+      with the same version, or
+    - when no version is supplied, the bodies are reused only if the same
+      MetricFamily objects are passed in the same order.
+
+    MetricFamily objects are mutable. When they are modified in place a new
+    version must be supplied, or ``clear`` called, for the change to be
+    encoded.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._families = ()
+        self._version = None
+        self._bodies = {}
+
+    def clear(self) -> None:
+        """ Remove all cached bodies and reset the statistics. """
+        self._families = ()
+        self._version = None
+        self._bodies.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ Return a dict of cache statistics.
+
+        The dict contains the number of cache hits and misses and the number
+        of formats currently cached.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._bodies))
+
+    def cached(
+        self, families: Sequence[MetricFamily], version: Hashable = None
+    ) -> List[str]:
+        """ Return the content types that are cached for some families.
+
+        :param families: a sequence of MetricFamily objects.
+
+        :param version: an optional hashable content version for the
+          families.
+
+        :returns: a list of content types, cheapest to encode first.
+        """
+        if not self._is_current(families, version):
+            return []
+        return [ct for ct in FORMATS if ct in self._bodies]
+
+    def body(
+        self,
+        content_type: str,
+        families: Sequence[MetricFamily],
+        version: Hashable = None,
+    ) -> bytes:
+        """ Return the body of some families encoded in a format.
+
+        :param content_type: one of the content types in ``FORMATS``.
+
+        :param families: a sequence of MetricFamily objects.
+
+        :param version: an optional hashable content version for the
+          families. When supplied, a cached body is reused for any families
+          with the same version.
+
+        :returns: the encoded body.
+        """
+        if content_type not in _ENCODERS:
+            raise Exception("Invalid content type: {}".format(content_type))
+        if not self._is_current(families, version):
+            self._families = tuple(families)
+            self._version = version
+            self._bodies.clear()
+
+        body = self._bodies.get(content_type)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        self.misses += 1
+        body = _ENCODERS[content_type](*self._families)
+        self._bodies[content_type] = body
+        return body
+
+    def _is_current(self, families: Sequence[MetricFamily], version: Hashable) -> bool:
+        """ Return True if the cached bodies were encoded from families """
+        if version is not None:
+            return version == self._version
+        if self._version is not None or len(families) != len(self._families):
+            return False
+        return all(a is b for a, b in zip(families, self._families))
+
+
+def negotiate(
+    accept: Optional[str],
+    families: Sequence[MetricFamily],
+    cache: ExpositionCache = None,
+    version: Hashable = None,
+) -> Tuple[str, bytes]:
+    """ Encode MetricFamily objects in the best format for an HTTP client.
+
+    The format is chosen by ``select_content_type`` using the formats that
+    are already cached for these families, so a scrape that has been
+    encoded once is served from the cache to every client that accepts it.
+
+    :param accept: the value of the request's ``Accept`` header, or None if
+      the request did not include one.
+
+    :param families: a sequence of MetricFamily objects.
+
+    :param cache: an optional ExpositionCache holding the bodies of the
+      current scrape.
+
+    :param version: an optional hashable content version for the families.
+      See ``ExpositionCache.body`` for details.
+
+    :returns: a tuple of the ``Content-Type`` header value and the body.
+    """
+    families = tuple(families)
+    if cache is None:
+        content_type = select_content_type(accept)
+        return content_type, _ENCODERS[content_type](*families)
+
+    content_type = select_content_type(accept, cache.cached(families, version))
+    return content_type, cache.body(content_type, families, version)
+
+
+def select_content_type(accept: Optional[str], cached: Iterable[str] = ()) -> str:
+    """ Return the content type to respond with for an ``Accept`` header.
+
+    A format is acceptable if the header lists its media type with a quality
+    above zero. The protobuf format must list the ``proto`` and ``encoding``
+    parameters and a listed OpenMetrics or text ``version`` must be one this
+    package produces. Wildcard media ranges only match the text format.
+
+    A cached format the client accepts is preferred, since serving it costs
+    nothing. Otherwise the acceptable format with the highest quality is
+    chosen, ties going to the cheapest to encode. When no format is
+    acceptable, or there is no header, the text format is returned, like
+    the Prometheus client libraries.
+
+    :param accept: the value of an ``Accept`` header, or None.
+
+    :param cached: content types that are already encoded.
+
+    :returns: one of the content types in ``FORMATS``.
+    """
+    if not accept:
+        return TEXT_CONTENT_TYPE
+
+    qualities = _accepted(accept)
+    candidates = [ct for ct in cached if qualities.get(ct, 0) > 0]
+    if not candidates:
+        candidates = [ct for ct in FORMATS if qualities.get(ct, 0) > 0]
+        if not candidates:
+            return TEXT_CONTENT_TYPE
+    # max returns the first of equal items, so order candidates by cost.
+    candidates.sort(key=FORMATS.index)
+    return max(candidates, key=lambda ct: qualities[ct])
+
+
+def _accepted(accept: str) -> Dict[str, float]:
+    """ Return the quality an Accept header gives each supported format.
+
+    The quality of a format is taken from the most specific media range
+    that matches it.
+    """
+    qualities = {}
+    specificity = {}
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.partition(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        parameters = {}
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            parameters[key.strip().lower()] = value.strip().strip('"')
+        try:
+            quality = min(max(float(parameters.pop("q", 1)), 0.0), 1.0)
+        except ValueError:
+            continue
+
+        for content_type, rank in _matches(media_type, parameters):
+            if rank > specificity.get(content_type, -1):
+                specificity[content_type] = rank
+                qualities[content_type] = quality
+    return qualities
+
+
+def _matches(media_type: str, parameters: Dict[str, str]) -> List[Tuple[str, int]]:
+    """ Return the formats a media range matches and how specifically """
+    if media_type == "application/vnd.google.protobuf":
+        if (
+            parameters.get("proto") == "io.prometheus.client.MetricFamily"
+            and parameters.get("encoding") == "delimited"
+        ):
+            return [(PROTOBUF_CONTENT_TYPE, 2)]
+    elif media_type == "application/openmetrics-text":
+        if parameters.get("version", "1.0.0") == "1.0.0":
+            return [(OPENMETRICS_CONTENT_TYPE, 2)]
+    elif media_type == "text/plain":
+        if parameters.get("version", "0.0.4") == "0.0.4":
+            return [(TEXT_CONTENT_TYPE, 2)]
+    elif media_type == "text/*":
+        return [(TEXT_CONTENT_TYPE, 1)]
+    elif media_type == "*/*":
+        return [(TEXT_CONTENT_TYPE, 0)]
+    return []
@@ -0,0 +1,193 @@
+"""
+This module provides helpers that bucket raw observations into the values
+expected by ``utils.create_histogram_metric`` and ``create_histogram``.
+
+Buckets follow the Prometheus convention: each bucket counts the
+observations less than or equal to its upper bound, counts are cumulative
+and the last bucket has an upper bound of +Inf. NumPy is used to bucket
+observations when it is installed, otherwise observations are bucketed one
+at a time using a binary search. NumPy is imported the first time a batch
+of observations is bucketed, so importing this module stays cheap.
+"""
+
+import bisect
+import collections.abc
+import math
+import threading
+
+from . import utils
+from typing import Iterable, List, Sequence
+
+
+POS_INF = float("inf")
+
+# The numpy module, None if it is not installed, or _UNSET until first use.
+_UNSET = object()
+np = _UNSET
+
+
+def bucket_observations(
+    observations: Iterable[float], upper_bounds: Sequence[float]
+) -> utils.HistogramDictType:
+    """ Return the histogram values for a collection of observations.
+
+    :param observations: an iterable or NumPy array of observed values.
+
+    :param upper_bounds: the upper bounds of the buckets in increasing order.
+      A +Inf upper bound is added if it is not present.
+
+    :returns: a dict mapping each upper bound to its cumulative count, along
+      with the ``count`` and ``sum`` of the observations. This can be passed
+      as the values of ``utils.create_histogram_metric`` and as a metric value
+      of ``create_histogram``.
+    """
+    upper_bounds = _check_bounds(upper_bounds)
+    counts, sum_ = _bucket(observations, upper_bounds)
+    return _histogram_values(upper_bounds, counts, sum_)
+
+
+class HistogramAccumulator(object):
+    """ Accumulates observations into histogram buckets.
+
+    Observations can be added one at a time with ``observe`` or in batches
+    with ``observe_many``. Only the bucket counts and the sum are retained,
+    so memory use does not grow with the number of observations. The
+    accumulator is safe to use from multiple threads.
+
+    :param upper_bounds: the upper bounds of the buckets in increasing order.
+      A +Inf upper bound is added if it is not present.
+    """
+
+    def __init__(self, upper_bounds: Sequence[float]) -> None:
+        self.upper_bounds = _check_bounds(upper_bounds)
+        self._counts = [0] * len(self.upper_bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """ Return the number of observations """
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        """ Return the sum of observations """
+        return self._sum
+
+    def observe(self, value: float) -> None:
+        """ Add an observation.
+
+        :param value: the observed value.
+        """
+        index = _bucket_index(self.upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def observe_many(self, values: Iterable[float]) -> None:
+        """ Add a batch of observations.
+
+        :param values: an iterable or NumPy array of observed values.
+        """
+        counts, sum_ = _bucket(values, self.upper_bounds)
+        with self._lock:
+            own = self._counts
+            for index, count in enumerate(counts):
+                own[index] += count
+            self._sum += sum_
+
+    def values(self) -> utils.HistogramDictType:
+        """ Return the current histogram values.
+
+        :returns: a dict mapping each upper bound to its cumulative count,
+          along with the ``count`` and ``sum`` of the observations.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            sum_ = self._sum
+        return _histogram_values(self.upper_bounds, counts, sum_)
+
+    def reset(self) -> None:
+        """ Discard all observations """
+        with self._lock:
+            self._counts = [0] * len(self.upper_bounds)
+            self._sum = 0.0
+
+
+def _check_bounds(upper_bounds: Sequence[float]) -> List[float]:
+    """ Return a validated list of upper bounds ending with +Inf """
+    bounds = [float(b) for b in upper_bounds]
+    if any(math.isnan(b) for b in bounds):
+        raise Exception("Invalid upper bounds, NaN is not a valid bound")
+    if any(a >= b for a, b in zip(bounds, bounds[1:])):
+        raise Exception(
+            "Invalid upper bounds, expected increasing values, got {}".format(bounds)
+        )
+    if not bounds or bounds[-1] != POS_INF:
+        bounds.append(POS_INF)
+    return bounds
+
+
+def _bucket(values: Iterable[float], upper_bounds: List[float]) -> tuple:
+    """ Return the non-cumulative count of values in each bucket and their sum.
+
+    A value belongs to the first bucket whose upper bound is greater than or
+    equal to it, which is the insertion point found by a left sided search.
+    """
+    numpy = _numpy()
+    if numpy is not None:
+        if isinstance(values, (numpy.ndarray, collections.abc.Sequence)):
+            array = numpy.asarray(values, dtype=numpy.float64).reshape(-1)
+        else:
+            # asarray does not consume iterators such as generators.
+            array = numpy.fromiter(values, numpy.float64)
+        indices = numpy.searchsorted(upper_bounds, array, side="left")
+        # NaN sorts past the last bound, count it in the +Inf bucket.
+        numpy.minimum(indices, len(upper_bounds) - 1, out=indices)
+        counts = numpy.bincount(indices, minlength=len(upper_bounds))
+        return counts.tolist(), float(array.sum())
+
+    counts = [0] * len(upper_bounds)
+    sum_ = 0.0
+    for value in values:
+        counts[_bucket_index(upper_bounds, value)] += 1
+        sum_ += value
+    return counts, sum_
+
+
+def _bucket_index(upper_bounds: List[float], value: float) -> int:
+    """ Return the index of the bucket a value belongs to.
+
+    Like the Prometheus client libraries NaN is counted in the +Inf bucket.
+    """
+    if value != value:
+        return len(upper_bounds) - 1
+    return bisect.bisect_left(upper_bounds, value)
+
+
+def _histogram_values(
+    upper_bounds: List[float], counts: List[int], sum_: float
+) -> utils.HistogramDictType:
+    """ Return histogram values from non-cumulative bucket counts """
+    values = {}
+    cumulative_count = 0
+    for upper_bound, count in zip(upper_bounds, counts):
+        cumulative_count += count
+        values[upper_bound] = cumulative_count
+    values["count"] = cumulative_count
+    values["sum"] = sum_
+    return values
+
+
+def _numpy():
+    """ Return the numpy module, importing it on first use, or None if NumPy
+    is not installed.
+    """
+    global np
+    if np is _UNSET:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            numpy = None
+        np = numpy
+    return np
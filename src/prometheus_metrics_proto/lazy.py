@@ -0,0 +1,113 @@
+"""
+This module provides lazy decoding of encoded MetricFamily objects.
+
+A LazyMetricSet indexes the frames in an encoded payload without parsing
+them. Only the varint size header and the ``name`` field of each frame are
+read, and a MetricFamily object is parsed when it is first accessed.
+"""
+
+from .prometheus_metrics_pb2 import MetricFamily
+from .wire import decode_family_name, decode_varint
+from typing import Iterator, List, Union
+
+
+class LazyMetricSet(object):
+    """ An index of the MetricFamily frames in an encoded payload.
+
+    Families can be accessed by name or by their position in the payload.
+    Each family is parsed on first access and the parsed MetricFamily object
+    is retained for subsequent accesses. ``len()``, ``in`` and ``names()``
+    use the index and never parse a frame.
+
+    The payload must not be modified while the set is in use.
+
+    :param data: a bytes-like object containing encoded MetricsFamily
+      objects, as produced by ``api.encode``.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self._view = memoryview(data).cast("B")
+        self._frames = []
+        self._names = []
+        self._positions = {}
+        self._families = []
+
+        view = self._view
+        end = len(view)
+        pos = 0
+        while pos < end:
+            try:
+                mf_size, mf_start = decode_varint(view, pos)
+            except IndexError:
+                raise Exception(
+                    "Truncated MetricFamily, incomplete size header at offset "
+                    "{}".format(pos)
+                )
+            mf_end = mf_start + mf_size
+            if mf_end > end:
+                raise Exception(
+                    "Truncated MetricFamily, expected {} bytes but only {} "
+                    "remain".format(mf_size, end - mf_start)
+                )
+            name = decode_family_name(view, mf_start, mf_end)
+            # Names are unique within a valid exposition. If they are not then
+            # lookups by name return the first family with that name.
+            self._positions.setdefault(name, len(self._frames))
+            self._frames.append((mf_start, mf_end))
+            self._names.append(name)
+            self._families.append(None)
+            pos = mf_end
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def __iter__(self) -> Iterator[MetricFamily]:
+        for index in range(len(self._frames)):
+            yield self._family(index)
+
+    def __getitem__(self, key: Union[int, str]) -> MetricFamily:
+        """ Return a MetricFamily by position or by name.
+
+        :param key: an integer index or a MetricFamily name.
+        :raises IndexError: if an index is out of range.
+        :raises KeyError: if no family has the name.
+        """
+        if isinstance(key, str):
+            return self._family(self._positions[key])
+        return self._family(range(len(self._frames))[key])
+
+    def get(self, name: str, default: MetricFamily = None) -> MetricFamily:
+        """ Return the MetricFamily with a name, or default if it is absent """
+        index = self._positions.get(name)
+        if index is None:
+            return default
+        return self._family(index)
+
+    def names(self) -> List[str]:
+        """ Return the names of the families in the order they were encoded """
+        return list(self._names)
+
+    def frame(self, key: Union[int, str]) -> memoryview:
+        """ Return the encoded bytes of a family without parsing it.
+
+        The view excludes the varint size header.
+
+        :param key: an integer index or a MetricFamily name.
+        """
+        if isinstance(key, str):
+            key = self._positions[key]
+        start, end = self._frames[key]
+        return self._view[start:end]
+
+    def _family(self, index: int) -> MetricFamily:
+        """ Return the MetricFamily at an index, parsing it if necessary """
+        mf = self._families[index]
+        if mf is None:
+            start, end = self._frames[index]
+            mf = MetricFamily()
+            mf.ParseFromString(self._view[start:end])
+            self._families[index] = mf
+        return mf
@@ -0,0 +1,216 @@
+"""
+This module provides functions that encode MetricFamily objects into the
+OpenMetrics 1.0 text format.
+
+The output matches the OpenMetrics text produced by the Prometheus Go client
+library. Compared to the text exposition format, counter samples carry a
+``_total`` suffix, created timestamps are exposed as ``_created`` series,
+exemplars are appended to counter and histogram bucket samples, families
+may declare a unit, untyped families are exposed as ``unknown``,
+timestamps are in seconds and the output ends with ``# EOF``. Families
+without any metrics are omitted.
+"""
+
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    UNTYPED,
+    HISTOGRAM,
+    MetricFamily,
+)
+from .text import POS_INF, _format_float, _label_block
+from typing import Iterable, Iterator
+
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+EOF = b"# EOF\n"
+
+_TYPE_NAMES = {
+    COUNTER: "counter",
+    GAUGE: "gauge",
+    SUMMARY: "summary",
+    UNTYPED: "unknown",
+    HISTOGRAM: "histogram",
+}
+
+_HELP_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", '"': '\\"'})
+
+
+def encode_openmetrics(*metrics: MetricFamily) -> bytes:
+    """ Encode MetricFamily objects into the OpenMetrics text format.
+
+    :param metrics: MetricsFamily objects to encode.
+    :returns: the UTF-8 encoded text, terminated by ``# EOF``.
+    """
+    return b"".join(iter_encode_openmetrics(metrics))
+
+
+def iter_encode_openmetrics(metrics: Iterable[MetricFamily]) -> Iterator[bytes]:
+    """ Encode MetricFamily objects into the OpenMetrics text format, lazily.
+
+    Each yielded chunk holds the complete text of one MetricFamily and the
+    last chunk is the ``# EOF`` terminator, so concatenating the chunks
+    produces the same output as ``encode_openmetrics``. Only one family is
+    held in memory at a time.
+
+    :param metrics: an iterable (e.g. a generator) of MetricsFamily objects.
+    :returns: an iterator of UTF-8 encoded chunks.
+    """
+    for mf in metrics:
+        if not isinstance(mf, MetricFamily):
+            raise Exception(
+                "Expected metrics to be instances of MetricFamily, got {}".format(
+                    type(mf)
+                )
+            )
+        if mf.metric:
+            yield _family_text(mf).encode("utf-8")
+    yield EOF
+
+
+def encode_openmetrics_to(writable, *metrics: MetricFamily) -> int:
+    """ Encode MetricFamily objects into the OpenMetrics text format and write
+    them to a writable stream one family at a time.
+
+    :param writable: a binary file object, ``io.BufferedWriter`` or any
+      object with a ``write`` method, or a socket (any object with a
+      ``sendall`` method).
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :returns: the number of bytes written.
+    """
+    write = getattr(writable, "write", None)
+    if write is None:
+        write = writable.sendall
+
+    written = 0
+    for chunk in iter_encode_openmetrics(metrics):
+        write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _family_text(mf: MetricFamily) -> str:
+    """ Return the OpenMetrics text of a MetricFamily """
+    metric_type = mf.type
+    name = mf.name
+    if metric_type == COUNTER and name.endswith("_total"):
+        # The family name of a counter excludes the sample suffix.
+        name = name[:-6]
+
+    if metric_type not in _TYPE_NAMES:
+        raise Exception("Invalid metric_type: {}".format(metric_type))
+    if mf.unit and not name.endswith("_" + mf.unit):
+        raise Exception(
+            "Invalid unit, metric name {} must end with _{}".format(name, mf.unit)
+        )
+
+    lines = []
+    append = lines.append
+    if mf.HasField("help"):
+        append("# HELP {} {}\n".format(name, mf.help.translate(_HELP_ESCAPES)))
+    append("# TYPE {} {}\n".format(name, _TYPE_NAMES[metric_type]))
+    if mf.unit:
+        append("# UNIT {} {}\n".format(name, mf.unit))
+
+    format_float = _format_om_float
+    for metric in mf.metric:
+        # The label block of a metric is shared by all of its series.
+        labels = _label_block(metric.label)
+        block = "{" + labels + "} " if labels else " "
+        if metric.HasField("timestamp_ms"):
+            timestamp = " " + format_float(metric.timestamp_ms / 1000)
+        else:
+            timestamp = ""
+        end = timestamp + "\n"
+
+        if metric_type == COUNTER:
+            counter = metric.counter
+            append(name + "_total" + block + format_float(counter.value) + timestamp)
+            # An exemplar follows the timestamp of a sample.
+            if counter.HasField("exemplar"):
+                append(_exemplar_text(counter.exemplar))
+            append("\n")
+            aggregate = counter
+        elif metric_type == GAUGE:
+            append(name + block + format_float(metric.gauge.value) + end)
+            continue
+        elif metric_type == UNTYPED:
+            append(name + block + format_float(metric.untyped.value) + end)
+            continue
+        elif metric_type == SUMMARY:
+            aggregate = metric.summary
+            if labels:
+                prefix = name + "{" + labels + ',quantile="'
+            else:
+                prefix = name + '{quantile="'
+            for quantile in aggregate.quantile:
+                append(
+                    prefix
+                    + format_float(quantile.quantile)
+                    + '"} '
+                    + format_float(quantile.value)
+                    + end
+                )
+            append(name + "_sum" + block + format_float(aggregate.sample_sum) + end)
+            append(name + "_count" + block + str(aggregate.sample_count) + end)
+        else:
+            aggregate = metric.histogram
+            if labels:
+                prefix = name + "_bucket{" + labels + ',le="'
+            else:
+                prefix = name + '_bucket{le="'
+            has_inf = False
+            for bucket in aggregate.bucket:
+                upper_bound = bucket.upper_bound
+                if upper_bound == POS_INF:
+                    has_inf = True
+                append(
+                    prefix
+                    + format_float(upper_bound)
+                    + '"} '
+                    + str(bucket.cumulative_count)
+                    + timestamp
+                )
+                if bucket.HasField("exemplar"):
+                    append(_exemplar_text(bucket.exemplar))
+                append("\n")
+            if not has_inf:
+                append(prefix + '+Inf"} ' + str(aggregate.sample_count) + end)
+            append(name + "_sum" + block + format_float(aggregate.sample_sum) + end)
+            append(name + "_count" + block + str(aggregate.sample_count) + end)
+
+        if aggregate.HasField("created_timestamp"):
+            created = aggregate.created_timestamp
+            append(
+                name
+                + "_created"
+                + block
+                + format_float(created.seconds + created.nanos / 1e9)
+                + end
+            )
+    return "".join(lines)
+
+
+def _exemplar_text(exemplar) -> str:
+    """ Return the text of an exemplar, including the leading `` # `` """
+    text = (
+        " # {" + _label_block(exemplar.label) + "} " + _format_om_float(exemplar.value)
+    )
+    if exemplar.HasField("timestamp"):
+        timestamp = exemplar.timestamp
+        text += " " + _format_om_float(timestamp.seconds + timestamp.nanos / 1e9)
+    return text
+
+
+def _format_om_float(value: float) -> str:
+    """ Return a float formatted like the Go client library's OpenMetrics
+    encoder, which always includes a decimal point or an exponent.
+    """
+    text = _format_float(value)
+    if text.lstrip("-").isdigit():
+        return text + ".0"
+    return text
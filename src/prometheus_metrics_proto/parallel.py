@@ -0,0 +1,140 @@
+"""
+This module provides an opt-in parallel encoder for large registries.
+
+Families are partitioned into contiguous chunks which are encoded
+independently by a ``concurrent.futures`` executor and then concatenated in
+their original order, so the output is identical to ``api.encode``.
+
+Families can be supplied as MetricFamily objects or as tuples of the
+arguments accepted by ``wire.encode_frame`` (e.g. ``(name, help, type,
+metrics)``). MetricFamily objects cannot be pickled, so they are serialized
+in the calling process before partitions are sent to a process pool and
+workers only frame them. A process pool therefore only speeds up encoding
+of tuples, which workers encode directly into the wire format. MetricFamily
+objects benefit from a thread pool on free-threaded Python builds.
+"""
+
+import os
+import sys
+
+from . import wire
+from .prometheus_metrics_pb2 import MetricFamily
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple, Union
+
+if TYPE_CHECKING:  # pragma: no cover
+    # concurrent.futures is only needed to encode in parallel, importing it
+    # is slow.
+    import concurrent.futures
+
+
+# The number of families below which encoding is performed in the calling
+# thread. Starting work in an executor has a fixed cost that small
+# registries do not recover. See benchmarks/bench_parallel.py.
+DEFAULT_THRESHOLD = 2000
+
+# The number of partitions created for each worker. More partitions than
+# workers keeps workers busy when families differ in size.
+PARTITIONS_PER_WORKER = 4
+
+FamilyType = Union[MetricFamily, Tuple]
+
+# Executors created by encode_parallel, keyed by the number of workers. They
+# are kept for the life of the process because starting workers costs far
+# more than encoding a registry of DEFAULT_THRESHOLD families.
+_executors: Dict[int, "concurrent.futures.Executor"] = {}
+
+
+def encode_parallel(
+    families: Sequence[FamilyType],
+    executor: "concurrent.futures.Executor" = None,
+    max_workers: int = None,
+    threshold: int = DEFAULT_THRESHOLD,
+) -> bytes:
+    """ Encode families into a bytes object using a pool of workers.
+
+    :param families: a sequence of MetricFamily objects and/or tuples of
+      arguments accepted by ``wire.encode_frame``.
+
+    :param executor: an optional executor to submit work to. When not
+      provided a shared executor is created on first use and reused by later
+      calls with the same number of workers: a thread pool on free-threaded
+      Python builds and a process pool otherwise.
+
+    :param max_workers: the number of workers used to partition the families
+      and, when no executor is provided, the size of the pool created.
+      Defaults to the number of CPUs.
+
+    :param threshold: the number of families below which encoding is
+      performed serially in the calling thread. Encoding is also performed
+      serially when no executor is provided and only one worker is
+      available.
+
+    :returns: encoded MetricsFamily objects, identical to ``api.encode``.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if len(families) < threshold or (executor is None and workers == 1):
+        return _encode_partition(families)
+
+    import concurrent.futures
+
+    if executor is None:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = _create_executor(workers)
+
+    if not isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+        # Workers may run in other processes, send picklable families.
+        families = [
+            f.SerializeToString() if isinstance(f, MetricFamily) else f
+            for f in families
+        ]
+
+    partitions = _partition(families, workers * PARTITIONS_PER_WORKER)
+    return b"".join(executor.map(_encode_partition, partitions))
+
+
+def gil_enabled() -> bool:
+    """ Return True if the interpreter is running with the GIL enabled. """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def _create_executor(workers: int) -> "concurrent.futures.Executor":
+    """ Return an executor suited to the running interpreter """
+    import concurrent.futures
+
+    if gil_enabled():
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+
+def _partition(
+    families: Sequence[FamilyType], count: int
+) -> List[Sequence[FamilyType]]:
+    """ Split families into at most count contiguous partitions """
+    size = max(1, -(-len(families) // count))
+    return [families[i : i + size] for i in range(0, len(families), size)]
+
+
+def _encode_partition(families: Sequence[FamilyType]) -> bytes:
+    """ Encode a partition of families into a bytes object.
+
+    This function is run by workers so it must be importable at module
+    level to support process pools. MetricFamily objects sent to a process
+    pool arrive as their serialized bytes.
+    """
+    parts = []
+    for family in families:
+        if isinstance(family, (MetricFamily, bytes)):
+            if isinstance(family, MetricFamily):
+                family = family.SerializeToString()
+            parts.append(wire.encode_varint(len(family)))
+            parts.append(family)
+        elif isinstance(family, tuple):
+            parts.append(wire.encode_frame(*family))
+        else:
+            raise Exception(
+                "Expected families to be instances of MetricFamily or tuple, "
+                "got {}".format(type(family))
+            )
+    return b"".join(parts)
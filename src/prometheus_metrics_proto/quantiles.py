@@ -0,0 +1,445 @@
+"""
+This module provides a streaming quantile estimator whose snapshots can be
+passed directly to ``utils.create_summary_metric`` and ``create_summary``.
+
+The estimator is a merging t-digest. Observations are buffered and
+periodically merged into a bounded number of centroids, with small
+centroids near the tails so that extreme quantiles are estimated more
+accurately than the median. Memory use is bounded by the compression
+parameter regardless of the number of observations.
+"""
+
+import math
+import threading
+import time
+
+from . import utils
+from .prometheus_metrics_pb2 import Metric
+from typing import Callable, Iterable, List, Sequence
+
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class TDigest(object):
+    """ A mergeable, bounded memory estimator of quantiles.
+
+    The compression parameter controls the trade off between accuracy and
+    size. The digest holds at most about ``compression`` centroids and the
+    error of a quantile estimate is roughly proportional to
+    ``q * (1 - q) / compression``, so the default of 100 typically estimates
+    the median within 1% of rank and the 0.99 quantile within 0.1% of rank.
+
+    Digests can be merged, so observations can be recorded by independent
+    digests in different threads or processes and combined when a snapshot
+    is required. Digests can be pickled. NaN observations are ignored.
+
+    :param compression: the compression parameter. Larger values are more
+      accurate and use more memory.
+
+    :param quantiles: the quantiles reported by ``snapshot`` by default.
+    """
+
+    def __init__(
+        self,
+        compression: float = 100,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    ) -> None:
+        if compression < 10:
+            raise Exception(
+                "Invalid compression: {}, expected a value of at least 10".format(
+                    compression
+                )
+            )
+        for q in quantiles:
+            _check_quantile(q)
+        self.compression = compression
+        self.quantiles = tuple(quantiles)
+        self._buffer_size = int(5 * compression)
+        self._means = []
+        self._weights = []
+        self._buffer = []
+        self._count = 0
+        self._sum = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        with self._lock:
+            self._merge()
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """ Return the number of centroids held by the digest """
+        with self._lock:
+            self._merge()
+            return len(self._means)
+
+    @property
+    def count(self) -> int:
+        """ Return the number of observations """
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """ Return the sum of observations """
+        return self._sum
+
+    def observe(self, value: float) -> None:
+        """ Add an observation.
+
+        :param value: the observed value.
+        """
+        if value != value:
+            return
+        with self._lock:
+            self._buffer.append(value)
+            self._count += 1
+            self._sum += value
+            if value < self._min:
+                self._min = value
+            if value > self._max:
+                self._max = value
+            if len(self._buffer) >= self._buffer_size:
+                self._merge()
+
+    def observe_many(self, values: Iterable[float]) -> None:
+        """ Add a batch of observations.
+
+        :param values: a sequence or NumPy array of observed values.
+        """
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        values = [v for v in values if v == v]
+        if not values:
+            return
+        with self._lock:
+            self._count += len(values)
+            self._sum += math.fsum(values)
+            self._min = min(self._min, min(values))
+            self._max = max(self._max, max(values))
+            # Merge in chunks so the buffer never grows beyond its size.
+            step = self._buffer_size
+            for start in range(0, len(values), step):
+                self._buffer.extend(values[start : start + step])
+                if len(self._buffer) >= step:
+                    self._merge()
+
+    def merge(self, *others: "TDigest") -> None:
+        """ Merge the observations of other digests into this digest.
+
+        :param others: the digests to merge. They are not modified.
+        """
+        for other in others:
+            with other._lock:
+                other._merge()
+                means = list(other._means)
+                weights = list(other._weights)
+                count = other._count
+                sum_ = other._sum
+                min_ = other._min
+                max_ = other._max
+            with self._lock:
+                self._merge(means, weights)
+                self._count += count
+                self._sum += sum_
+                self._min = min(self._min, min_)
+                self._max = max(self._max, max_)
+
+    def quantile(self, q: float) -> float:
+        """ Return an estimate of a quantile.
+
+        :param q: the quantile, a value from 0 to 1.
+        :returns: the estimated value, or NaN if there are no observations.
+        """
+        _check_quantile(q)
+        with self._lock:
+            self._merge()
+            return self._quantile(q)
+
+    def snapshot(self, quantiles: Sequence[float] = None) -> utils.SummaryDictType:
+        """ Return the current quantile estimates, count and sum.
+
+        :param quantiles: the quantiles to estimate. Defaults to the
+          quantiles the digest was created with.
+
+        :returns: a dict mapping each quantile to its estimated value, along
+          with the ``count`` and ``sum`` of the observations. This can be
+          passed as the values of ``utils.create_summary_metric`` and as a
+          metric value of ``create_summary``. Quantiles are NaN when there are
+          no observations, as in the Prometheus client libraries.
+        """
+        quantiles = self.quantiles if quantiles is None else quantiles
+        for q in quantiles:
+            _check_quantile(q)
+        with self._lock:
+            self._merge()
+            values = {q: self._quantile(q) for q in quantiles}
+            values["count"] = self._count
+            values["sum"] = self._sum
+        return values
+
+    def reset(self) -> None:
+        """ Discard all observations """
+        with self._lock:
+            self._means = []
+            self._weights = []
+            self._buffer = []
+            self._count = 0
+            self._sum = 0.0
+            self._min = math.inf
+            self._max = -math.inf
+
+    def _merge(self, means: List[float] = None, weights: List[float] = None) -> None:
+        """ Merge buffered observations, and optionally extra centroids, into
+        the centroids. The lock must be held.
+        """
+        if not self._buffer and not means:
+            return
+        points = list(zip(self._means, self._weights))
+        points.extend((v, 1) for v in self._buffer)
+        if means:
+            points.extend(zip(means, weights))
+        points.sort(key=lambda p: p[0])
+        self._buffer = []
+
+        total = sum(w for _, w in points)
+        compression = self.compression
+        new_means = []
+        new_weights = []
+        mean, weight = points[0]
+        # The weight of all the centroids before the current one
+        before = 0
+        limit = total * _k_inverse(_k(0.0, compression) + 1, compression)
+        for point_mean, point_weight in points[1:]:
+            if before + weight + point_weight <= limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                new_means.append(mean)
+                new_weights.append(weight)
+                before += weight
+                limit = total * _k_inverse(
+                    _k(before / total, compression) + 1, compression
+                )
+                mean, weight = point_mean, point_weight
+        new_means.append(mean)
+        new_weights.append(weight)
+        self._means = new_means
+        self._weights = new_weights
+
+    def _quantile(self, q: float) -> float:
+        """ Return an estimate of a quantile. The lock must be held and there
+        must be no buffered observations.
+        """
+        means = self._means
+        weights = self._weights
+        if not means:
+            return math.nan
+        if q <= 0.0:
+            return self._min
+        if q >= 1.0:
+            return self._max
+        if len(means) == 1:
+            return means[0]
+
+        index = q * self._count
+        # Each centroid is treated as being centred on its mean, and values
+        # between centroid centres are interpolated. The tails are
+        # interpolated towards the exact minimum and maximum.
+        first_half = weights[0] / 2
+        if index < first_half:
+            return self._min + (means[0] - self._min) * index / first_half
+        centre = first_half
+        for i in range(len(means) - 1):
+            next_centre = centre + (weights[i] + weights[i + 1]) / 2
+            if index < next_centre:
+                fraction = (index - centre) / (next_centre - centre)
+                return means[i] + (means[i + 1] - means[i]) * fraction
+            centre = next_centre
+        last_half = weights[-1] / 2
+        fraction = min(1.0, (index - centre) / last_half)
+        return means[-1] + (self._max - means[-1]) * fraction
+
+
+class WindowedSummary(object):
+    """ A summary whose quantiles cover a sliding window of recent time.
+
+    Observations are recorded in a ring of t-digests, each covering an equal
+    slice of the window. When a slice ends the oldest digest is cleared and
+    reused, so the quantiles reported cover between ``max_age`` minus one
+    slice and ``max_age`` seconds of observations. A snapshot merges the
+    digests in the ring, so its cost depends on the number of slices rather
+    than on the number of observations.
+
+    The ring is rotated when an observation or snapshot finds that the
+    clock has moved into a new slice, which costs a division and a
+    comparison. As in the Prometheus client libraries, the count and sum
+    cover all observations rather than the window.
+
+    :param max_age: the duration of the window, in seconds.
+    :param age_buckets: the number of slices the window is divided into.
+    :param compression: the compression parameter of each digest.
+    :param quantiles: the quantiles reported by ``snapshot`` by default.
+
+    :param clock: a function returning the current time in seconds. Any
+      monotonic clock can be used, including a coarse clock that is updated
+      periodically. Defaults to ``time.monotonic``.
+    """
+
+    def __init__(
+        self,
+        max_age: float = 600.0,
+        age_buckets: int = 5,
+        compression: float = 100,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_age <= 0 or age_buckets < 1:
+            raise Exception(
+                "Invalid window: max_age {} and age_buckets {}, expected positive "
+                "values".format(max_age, age_buckets)
+            )
+        self.max_age = max_age
+        self.age_buckets = age_buckets
+        self.quantiles = tuple(quantiles)
+        self._clock = clock
+        self._interval = max_age / age_buckets
+        self._digests = [
+            TDigest(compression=compression, quantiles=quantiles)
+            for _ in range(age_buckets)
+        ]
+        self._head = 0
+        self._tick = int(clock() // self._interval)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """ Return the number of observations since the summary was created """
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """ Return the sum of observations since the summary was created """
+        return self._sum
+
+    def observe(self, value: float) -> None:
+        """ Add an observation.
+
+        :param value: the observed value.
+        """
+        with self._lock:
+            self._rotate()
+            self._digests[self._head].observe(value)
+            self._count += 1
+            self._sum += value
+
+    def observe_many(self, values: Iterable[float]) -> None:
+        """ Add a batch of observations.
+
+        :param values: a sequence or NumPy array of observed values.
+        """
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        else:
+            values = list(values)
+        with self._lock:
+            self._rotate()
+            self._digests[self._head].observe_many(values)
+            self._count += len(values)
+            self._sum += math.fsum(values)
+
+    def snapshot(self, quantiles: Sequence[float] = None) -> utils.SummaryDictType:
+        """ Return the quantile estimates over the window, count and sum.
+
+        :param quantiles: the quantiles to estimate. Defaults to the
+          quantiles the summary was created with.
+
+        :returns: a dict mapping each quantile to its estimated value, along
+          with the ``count`` and ``sum`` of all observations, suitable for
+          ``create_summary``. Quantiles are NaN when there are no
+          observations in the window.
+        """
+        window = TDigest(compression=self._digests[0].compression)
+        with self._lock:
+            self._rotate()
+            window.merge(*self._digests)
+            count = self._count
+            sum_ = self._sum
+        values = window.snapshot(self.quantiles if quantiles is None else quantiles)
+        values["count"] = count
+        values["sum"] = sum_
+        return values
+
+    def create_metric(
+        self,
+        labels: utils.LabelsType = None,
+        timestamp: bool = False,
+        const_labels: utils.LabelsType = None,
+        ordered: bool = True,
+    ) -> Metric:
+        """ Create a Metric object containing a Summary of the window.
+
+        :param labels: a dict of labels that define this particular instance
+          of a metric.
+        :param timestamp: a boolean that determines if a timestamp is added to
+          the metric. By default this is False.
+        :param const_labels: a dict of constant labels to be associated with
+          the metric.
+        :param ordered: a boolean that determines if the labels are sorted by
+          key. By default this is True.
+        :returns: a Metric object containing a Summary object
+        """
+        values = self.snapshot()
+        return utils.create_summary_metric(
+            labels,
+            values,
+            values["count"],
+            values["sum"],
+            timestamp=timestamp,
+            const_labels=const_labels,
+            ordered=ordered,
+        )
+
+    def _rotate(self) -> None:
+        """ Clear the digests of slices that have left the window. The lock
+        must be held.
+        """
+        tick = int(self._clock() // self._interval)
+        elapsed = tick - self._tick
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, self.age_buckets)):
+            self._head = (self._head + 1) % self.age_buckets
+            self._digests[self._head].reset()
+        self._tick = tick
+
+
+def _check_quantile(q: float) -> None:
+    """ Raise an exception if a quantile is out of range """
+    if not 0.0 <= q <= 1.0:
+        raise Exception("Invalid quantile: {}, expected a value from 0 to 1".format(q))
+
+
+def _k(q: float, compression: float) -> float:
+    """ The t-digest scale function, which maps a quantile to a centroid index.
+
+    The arcsine scale keeps centroids small near the tails.
+    """
+    return compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+
+def _k_inverse(k: float, compression: float) -> float:
+    """ The inverse of the scale function, clamped to the range 0 to 1 """
+    if k >= compression / 4:
+        return 1.0
+    return (math.sin(k * 2 * math.pi / compression) + 1) / 2
@@ -0,0 +1,281 @@
+"""
+This module provides functions that convert MetricFamily objects into
+Prometheus remote write requests and push them to a remote write receiver.
+
+Each Metric is expanded into the time series Prometheus would store when
+scraping it. The family name is added as the ``__name__`` label, summaries
+produce a series per quantile plus ``_sum`` and ``_count`` series and
+histograms produce a ``_bucket`` series per bucket (including ``+Inf``)
+plus ``_sum`` and ``_count`` series. Native histogram buckets and
+exemplars are not sent.
+
+WriteRequest messages are encoded directly into the Protocol Buffer wire
+format and compressed with Snappy, as required by the remote write
+protocol. The package does not import this module, import it using
+``from prometheus_metrics_proto import remote_write``.
+"""
+
+import time
+
+from . import snappy
+from . import wire
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    UNTYPED,
+    HISTOGRAM,
+    MetricFamily,
+)
+from .remote_write_pb2 import WriteRequest
+from .text import POS_INF, _format_float
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+CONTENT_TYPE = "application/x-protobuf"
+CONTENT_ENCODING = "snappy"
+REMOTE_WRITE_VERSION = "0.1.0"
+
+HEADERS = {
+    "Content-Type": CONTENT_TYPE,
+    "Content-Encoding": CONTENT_ENCODING,
+    "X-Prometheus-Remote-Write-Version": REMOTE_WRITE_VERSION,
+    "User-Agent": "prometheus_metrics_proto",
+}
+
+# The default maximum number of samples in a WriteRequest, matching the
+# Prometheus server's default max_samples_per_send.
+MAX_SAMPLES_PER_REQUEST = 2000
+
+# Field tags used by the remote write messages.
+# WriteRequest
+_TIMESERIES = b"\x0a"
+# TimeSeries, the labels share the layout of Metric.label
+_SAMPLES = b"\x12"
+# Sample
+_SAMPLE_VALUE = b"\x09"
+_SAMPLE_TIMESTAMP = b"\x10"
+
+
+def iter_encode_write_requests(
+    metrics: Iterable[MetricFamily],
+    max_samples_per_request: int = MAX_SAMPLES_PER_REQUEST,
+    timestamp_ms: int = None,
+) -> Iterator[bytes]:
+    """ Convert MetricFamily objects into encoded WriteRequest messages,
+    lazily.
+
+    Series are batched into WriteRequest messages holding at most
+    ``max_samples_per_request`` samples. Each series holds one sample, so a
+    family may be split across requests.
+
+    :param metrics: an iterable (e.g. a generator) of MetricsFamily objects.
+
+    :param max_samples_per_request: the maximum number of samples in each
+      WriteRequest.
+
+    :param timestamp_ms: the timestamp, in milliseconds since the epoch, of
+      samples whose Metric has no ``timestamp_ms``. Defaults to the current
+      time.
+
+    :returns: an iterator of uncompressed, encoded WriteRequest messages.
+    """
+    if max_samples_per_request < 1:
+        raise Exception(
+            "Invalid max_samples_per_request: {}".format(max_samples_per_request)
+        )
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+
+    batch = []
+    for series in _iter_time_series(metrics, timestamp_ms):
+        batch.append(_TIMESERIES + wire.encode_varint(len(series)) + series)
+        if len(batch) == max_samples_per_request:
+            yield b"".join(batch)
+            batch = []
+    if batch:
+        yield b"".join(batch)
+
+
+def encode_write_requests(
+    *metrics: MetricFamily,
+    max_samples_per_request: int = MAX_SAMPLES_PER_REQUEST,
+    timestamp_ms: int = None,
+) -> List[bytes]:
+    """ Convert MetricFamily objects into encoded WriteRequest messages.
+
+    :param metrics: MetricsFamily objects to convert.
+
+    :param max_samples_per_request: the maximum number of samples in each
+      WriteRequest.
+
+    :param timestamp_ms: the timestamp of samples without one. See
+      ``iter_encode_write_requests`` for details.
+
+    :returns: a list of uncompressed, encoded WriteRequest messages.
+    """
+    return list(
+        iter_encode_write_requests(metrics, max_samples_per_request, timestamp_ms)
+    )
+
+
+def create_write_request(
+    *metrics: MetricFamily, timestamp_ms: int = None
+) -> WriteRequest:
+    """ Convert MetricFamily objects into a single WriteRequest object.
+
+    :param metrics: MetricsFamily objects to convert.
+
+    :param timestamp_ms: the timestamp of samples without one. See
+      ``iter_encode_write_requests`` for details.
+
+    :returns: a WriteRequest object.
+    """
+    request = WriteRequest()
+    for encoded in iter_encode_write_requests(metrics, timestamp_ms=timestamp_ms):
+        request.MergeFromString(encoded)
+    return request
+
+
+def push(
+    url: str,
+    *metrics: MetricFamily,
+    max_samples_per_request: int = MAX_SAMPLES_PER_REQUEST,
+    timestamp_ms: int = None,
+    headers: Dict[str, str] = None,
+    timeout: float = 30.0,
+) -> int:
+    """ Push MetricFamily objects to a remote write receiver.
+
+    Each WriteRequest is compressed with Snappy and sent in its own HTTP
+    POST request. Requests are sent one at a time and stop at the first
+    failure.
+
+    :param url: the URL of the remote write receiver.
+
+    :param metrics: MetricsFamily objects to push.
+
+    :param max_samples_per_request: the maximum number of samples in each
+      WriteRequest.
+
+    :param timestamp_ms: the timestamp of samples without one. See
+      ``iter_encode_write_requests`` for details.
+
+    :param headers: optional extra HTTP headers, e.g. ``Authorization``.
+
+    :param timeout: the timeout, in seconds, of each HTTP request.
+
+    :returns: the number of requests sent.
+
+    :raises urllib.error.HTTPError: if the receiver responds with an error
+      status. A 5xx status may be retried while a 4xx status indicates the
+      data will never be accepted.
+    """
+    # urllib.request is slow to import and only needed to push.
+    import urllib.request
+
+    request_headers = dict(HEADERS)
+    if headers:
+        request_headers.update(headers)
+
+    sent = 0
+    for encoded in iter_encode_write_requests(
+        metrics, max_samples_per_request, timestamp_ms
+    ):
+        request = urllib.request.Request(
+            url, data=snappy.compress(encoded), headers=request_headers, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        sent += 1
+    return sent
+
+
+def _iter_time_series(
+    metrics: Iterable[MetricFamily], default_timestamp_ms: int
+) -> Iterator[bytes]:
+    """ Return an iterator of encoded TimeSeries messages, one per sample.
+
+    :param metrics: an iterable of MetricsFamily objects.
+    :param default_timestamp_ms: the timestamp of samples without one.
+    """
+    for mf in metrics:
+        if not isinstance(mf, MetricFamily):
+            raise Exception(
+                "Expected metrics to be instances of MetricFamily, got {}".format(
+                    type(mf)
+                )
+            )
+        metric_type = mf.type
+        name = mf.name
+        for metric in mf.metric:
+            if metric.HasField("timestamp_ms"):
+                timestamp_ms = metric.timestamp_ms
+            else:
+                timestamp_ms = default_timestamp_ms
+            labels = [(label.name, label.value) for label in metric.label]
+            for series_name, extra, value in _samples(metric_type, name, metric):
+                pairs = labels + [("__name__", series_name)]
+                if extra is not None:
+                    pairs.append(extra)
+                pairs.sort()
+                yield wire.encode_labels(dict(pairs)) + _sample_field(
+                    value, timestamp_ms
+                )
+
+
+def _samples(metric_type: int, name: str, metric) -> List[Tuple[str, tuple, float]]:
+    """ Return the samples of a Metric as (series name, extra label, value)
+    tuples, where the extra label is the ``le`` or ``quantile`` label pair or
+    None.
+    """
+    if metric_type == COUNTER:
+        return [(name, None, metric.counter.value)]
+    if metric_type == GAUGE:
+        return [(name, None, metric.gauge.value)]
+    if metric_type == UNTYPED:
+        return [(name, None, metric.untyped.value)]
+    if metric_type == SUMMARY:
+        summary = metric.summary
+        samples = [
+            (name, ("quantile", _format_float(q.quantile)), q.value)
+            for q in summary.quantile
+        ]
+        samples.append((name + "_sum", None, summary.sample_sum))
+        samples.append((name + "_count", None, float(summary.sample_count)))
+        return samples
+    if metric_type == HISTOGRAM:
+        histogram = metric.histogram
+        bucket_name = name + "_bucket"
+        samples = []
+        has_inf = False
+        for bucket in histogram.bucket:
+            if bucket.upper_bound == POS_INF:
+                has_inf = True
+            samples.append(
+                (
+                    bucket_name,
+                    ("le", _format_float(bucket.upper_bound)),
+                    float(bucket.cumulative_count),
+                )
+            )
+        if not has_inf:
+            count = float(histogram.sample_count)
+            samples.append((bucket_name, ("le", "+Inf"), count))
+        samples.append((name + "_sum", None, histogram.sample_sum))
+        samples.append((name + "_count", None, float(histogram.sample_count)))
+        return samples
+    raise Exception("Invalid metric_type: {}".format(metric_type))
+
+
+def _sample_field(value: float, timestamp_ms: int) -> bytes:
+    """ Return the encoded samples field of a TimeSeries holding one sample """
+    sample = (
+        _SAMPLE_VALUE
+        + wire._pack_double(value)
+        + _SAMPLE_TIMESTAMP
+        # timestamp is an int64 so negative values are encoded as their
+        # two's complement uint64 representation.
+        + wire.encode_varint(timestamp_ms & wire._UINT64_MASK)
+    )
+    return _SAMPLES + wire.encode_varint(len(sample)) + sample
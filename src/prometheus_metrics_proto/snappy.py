@@ -0,0 +1,205 @@
+"""
+This module provides Snappy block compression, the compression used by the
+Prometheus remote write protocol.
+
+The block format is produced by the ``python-snappy`` or ``cramjam``
+packages when one of them is installed, which can be done using
+``pip install prometheus_metrics_proto[snappy]``. Otherwise a pure Python
+implementation is used. It produces valid, if less compact, Snappy blocks
+and is considerably slower than the native implementations.
+"""
+
+import struct
+
+from .wire import decode_varint, encode_varint
+
+try:
+    import snappy as _snappy
+except ImportError:  # pragma: no cover
+    _snappy = None
+
+try:
+    import cramjam
+except ImportError:  # pragma: no cover
+    cramjam = None
+
+
+# Input is compressed in blocks of this size, so copy offsets always fit in
+# two bytes.
+_BLOCK_SIZE = 1 << 16
+
+# Matches are found by hashing 4 byte sequences, the minimum copy length.
+_MIN_MATCH = 4
+
+_pack_uint16 = struct.Struct("<H").pack
+
+
+def compress(data: bytes) -> bytes:
+    """ Compress data into a Snappy block.
+
+    :param data: a bytes-like object.
+    :returns: the compressed block.
+    """
+    if _snappy is not None:
+        return _snappy.compress(bytes(data))
+    if cramjam is not None:
+        return bytes(cramjam.snappy.compress_raw(bytes(data)))
+    return _compress(bytes(data))
+
+
+def decompress(data: bytes) -> bytes:
+    """ Decompress a Snappy block.
+
+    :param data: a bytes-like object holding a Snappy block.
+    :returns: the uncompressed data.
+    """
+    if _snappy is not None:
+        return _snappy.uncompress(bytes(data))
+    if cramjam is not None:
+        return bytes(cramjam.snappy.decompress_raw(bytes(data)))
+    return _decompress(bytes(data))
+
+
+def _compress(data: bytes) -> bytes:
+    """ Compress data into a Snappy block using pure Python """
+    out = bytearray(encode_varint(len(data)))
+    for start in range(0, len(data), _BLOCK_SIZE):
+        _compress_block(data, start, min(start + _BLOCK_SIZE, len(data)), out)
+    return bytes(out)
+
+
+def _compress_block(data: bytes, start: int, end: int, out: bytearray) -> None:
+    """ Compress one block of data, appending the elements to out.
+
+    Matches are found with a table of the last position of each 4 byte
+    sequence. Like the reference implementation, the step between lookups
+    grows while no matches are found so incompressible data is skipped
+    quickly.
+    """
+    table = {}
+    literal_start = pos = start
+    limit = end - _MIN_MATCH
+    misses = 0
+    while pos <= limit:
+        key = data[pos : pos + _MIN_MATCH]
+        candidate = table.get(key)
+        table[key] = pos
+        if candidate is None:
+            misses += 1
+            pos += 1 + (misses >> 5)
+            continue
+
+        # Extend the match, eight bytes at a time while possible.
+        length = _MIN_MATCH
+        available = end - pos
+        while (
+            length + 8 <= available
+            and data[candidate + length : candidate + length + 8]
+            == data[pos + length : pos + length + 8]
+        ):
+            length += 8
+        while length < available and data[candidate + length] == data[pos + length]:
+            length += 1
+
+        if literal_start < pos:
+            _emit_literal(data, literal_start, pos, out)
+        _emit_copy(pos - candidate, length, out)
+        pos += length
+        literal_start = pos
+        misses = 0
+
+    if literal_start < end:
+        _emit_literal(data, literal_start, end, out)
+
+
+def _emit_literal(data: bytes, start: int, end: int, out: bytearray) -> None:
+    """ Append a literal element holding data[start:end] to out """
+    n = end - start - 1
+    if n < 60:
+        out.append(n << 2)
+    elif n < 0x100:
+        out.append(60 << 2)
+        out.append(n)
+    else:
+        out.append(61 << 2)
+        out += _pack_uint16(n)
+    out += data[start:end]
+
+
+def _emit_copy(offset: int, length: int, out: bytearray) -> None:
+    """ Append copy elements for a match to out """
+    # A copy with a two byte offset holds at most 64 bytes. Long matches are
+    # split so the final copy holds at least 4 bytes.
+    while length >= 68:
+        out.append((63 << 2) | 2)
+        out += _pack_uint16(offset)
+        length -= 64
+    if length > 64:
+        out.append((59 << 2) | 2)
+        out += _pack_uint16(offset)
+        length -= 60
+    if length < 12 and offset < 2048:
+        out.append(((offset >> 8) << 5) | ((length - 4) << 2) | 1)
+        out.append(offset & 0xFF)
+    else:
+        out.append(((length - 1) << 2) | 2)
+        out += _pack_uint16(offset)
+
+
+def _decompress(data: bytes) -> bytes:
+    """ Decompress a Snappy block using pure Python """
+    try:
+        size, pos = decode_varint(data, 0)
+    except IndexError:
+        raise Exception("Invalid Snappy block: missing length") from None
+
+    out = bytearray()
+    end = len(data)
+    try:
+        while pos < end:
+            tag = data[pos]
+            pos += 1
+            element_type = tag & 0x03
+            if element_type == 0:
+                length = tag >> 2
+                if length >= 60:
+                    extra = length - 59
+                    length = int.from_bytes(data[pos : pos + extra], "little")
+                    pos += extra
+                length += 1
+                if pos + length > end:
+                    raise Exception("Invalid Snappy block: truncated literal")
+                out += data[pos : pos + length]
+                pos += length
+                continue
+
+            if element_type == 1:
+                length = ((tag >> 2) & 0x07) + 4
+                offset = ((tag >> 5) << 8) | data[pos]
+                pos += 1
+            elif element_type == 2:
+                length = (tag >> 2) + 1
+                offset = data[pos] | (data[pos + 1] << 8)
+                pos += 2
+            else:
+                length = (tag >> 2) + 1
+                offset = int.from_bytes(data[pos : pos + 4], "little")
+                pos += 4
+
+            start = len(out) - offset
+            if offset == 0 or start < 0:
+                raise Exception("Invalid Snappy block: invalid copy offset")
+            if offset >= length:
+                out += out[start : start + length]
+            else:
+                # The copy overlaps its own output, repeating the pattern.
+                pattern = out[start:]
+                out += (pattern * (length // offset + 1))[:length]
+    except IndexError:
+        raise Exception("Invalid Snappy block: truncated element") from None
+
+    if len(out) != size:
+        raise Exception(
+            "Invalid Snappy block: expected {} bytes, got {}".format(size, len(out))
+        )
+    return bytes(out)
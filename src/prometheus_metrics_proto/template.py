@@ -0,0 +1,371 @@
+"""
+This module provides templates of encoded MetricFamily objects whose values
+can be updated in place.
+
+A template is useful for families whose labels, quantiles and buckets are
+fixed and where only the values change between scrapes. The encoded frame is
+held in a preallocated buffer along with the offset of every value field, so
+updating a value writes directly into the buffer and the frame is ready to
+send without any Protocol Buffer objects being created or serialized.
+"""
+
+import struct
+
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    UNTYPED,
+    HISTOGRAM,
+    Metric,
+    MetricFamily,
+)
+from .wire import encode_varint
+from typing import List, Sequence, Tuple
+
+
+# Slot kinds
+_DOUBLE = 0
+_UINT64 = 1
+_INT64 = 2
+
+# Template items
+_SLOT = 0
+_MESSAGE = 1
+
+_UINT64_MASK = (1 << 64) - 1
+
+# The maximum number of bytes in a varint encoded 64 bit integer
+_MAX_VARINT_SIZE = 10
+
+_pack_double_into = struct.Struct("<d").pack_into
+
+# The Metric field that holds the value for each metric type along with the
+# tag of that field.
+_VALUE_FIELDS = {
+    COUNTER: ("counter", b"\x1a"),
+    GAUGE: ("gauge", b"\x12"),
+    UNTYPED: ("untyped", b"\x2a"),
+    SUMMARY: ("summary", b"\x22"),
+    HISTOGRAM: ("histogram", b"\x3a"),
+}
+
+
+class MetricFamilyTemplate(object):
+    """ An encoded MetricFamily frame with values that can be updated in place.
+
+    The template is built from an existing MetricFamily object and records
+    the offset of every value field within the encoded frame. Doubles
+    (counter, gauge and untyped values, sample sums and quantile values)
+    are fixed size and are written directly. Varints (sample counts, bucket
+    cumulative counts and timestamps) are encoded using a fixed number of
+    bytes, padded with continuation bytes where necessary, so that updating
+    them never changes the size of the frame. If a new value does not fit in
+    the space reserved for it the frame is laid out again with more space.
+
+    Padded varints are valid Protocol Buffer encodings, so the frame decodes
+    to the same values as the MetricFamily would, although the bytes may
+    differ from those produced by ``api.encode``.
+
+    Only the fields that can be generated by this package are supported.
+    Labels, quantiles and bucket upper bounds are fixed when the template is
+    built.
+
+    :param family: the MetricFamily object to build the template from.
+
+    :param varint_size: the minimum number of bytes reserved for each varint
+      value. Counts up to 2**35 - 1 fit in the default of 5 bytes.
+    """
+
+    def __init__(self, family: MetricFamily, varint_size: int = 5) -> None:
+        if not 1 <= varint_size <= _MAX_VARINT_SIZE:
+            raise Exception(
+                "Invalid varint_size: {}, expected a value from 1 to {}".format(
+                    varint_size, _MAX_VARINT_SIZE
+                )
+            )
+        _check_fields(family, ("name", "help", "type", "metric"))
+        if family.type not in _VALUE_FIELDS:
+            raise Exception("Invalid metric_type: {}".format(family.type))
+
+        self.name = family.name
+        self.type = family.type
+        self._varint_size = varint_size
+        self._kinds = []
+        self._values = []
+        self._widths = []
+        self._offsets = []
+        # The value slots of each metric in the family
+        self._metric_slots = []
+        self._timestamp_slots = []
+
+        # Optional fields are only written when set, like api.encode.
+        self._items = []
+        if family.HasField("name"):
+            name = family.name.encode("utf-8")
+            self._items.append(b"\x0a" + encode_varint(len(name)) + name)
+        if family.HasField("help"):
+            help_ = family.help.encode("utf-8")
+            self._items.append(b"\x12" + encode_varint(len(help_)) + help_)
+        if family.HasField("type"):
+            self._items.append(b"\x18" + encode_varint(family.type))
+        for metric in family.metric:
+            self._items.append((_MESSAGE, b"\x22", self._metric_items(metric)))
+
+        self._buffer = bytearray()
+        self._layout()
+
+    def __len__(self) -> int:
+        """ Return the number of metrics in the template """
+        return len(self._metric_slots)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._buffer)
+
+    @property
+    def frame(self) -> memoryview:
+        """ Return a view of the encoded frame.
+
+        The frame is a MetricFamily encoded with a varint size header, ready
+        to be sent to the Prometheus server, and reflects any values updated
+        after the view was obtained unless the frame had to be laid out
+        again.
+        """
+        return memoryview(self._buffer)
+
+    def set_value(self, index: int, value: float) -> None:
+        """ Update the value of a counter, gauge or untyped metric.
+
+        :param index: the index of the metric within the family.
+        :param value: a float representing the value of the metric.
+        """
+        if self.type in (SUMMARY, HISTOGRAM):
+            raise Exception(
+                "set_value can not be used with metric_type: {}".format(self.type)
+            )
+        self._write(self._metric_slots[index][0], value)
+
+    def set_summary(
+        self,
+        index: int,
+        values: Sequence[float],
+        samples_count: int,
+        samples_sum: float,
+    ) -> None:
+        """ Update the values of a summary metric.
+
+        :param index: the index of the metric within the family.
+        :param values: a sequence of quantile values, in the same order as the
+          quantiles of the metric the template was built from.
+        :param samples_count: an integer representing the number of samples.
+        :param samples_sum: a float representing the sum of samples.
+        """
+        if self.type != SUMMARY:
+            raise Exception(
+                "set_summary can not be used with metric_type: {}".format(self.type)
+            )
+        self._write_aggregate(index, values, samples_count, samples_sum)
+
+    def set_histogram(
+        self,
+        index: int,
+        values: Sequence[int],
+        samples_count: int,
+        samples_sum: float,
+    ) -> None:
+        """ Update the values of a histogram metric.
+
+        :param index: the index of the metric within the family.
+        :param values: a sequence of bucket cumulative counts, in the same
+          order as the buckets of the metric the template was built from.
+        :param samples_count: an integer representing the number of
+          observations.
+        :param samples_sum: a float representing the sum of observations.
+        """
+        if self.type != HISTOGRAM:
+            raise Exception(
+                "set_histogram can not be used with metric_type: {}".format(self.type)
+            )
+        self._write_aggregate(index, values, samples_count, samples_sum)
+
+    def set_timestamp(self, index: int, timestamp_ms: int) -> None:
+        """ Update the timestamp of a metric.
+
+        Only metrics that had a timestamp when the template was built have a
+        timestamp that can be updated.
+
+        :param index: the index of the metric within the family.
+        :param timestamp_ms: a UTC timestamp, in milliseconds.
+        """
+        slot = self._timestamp_slots[index]
+        if slot is None:
+            raise Exception("Metric {} does not have a timestamp".format(index))
+        self._write(slot, timestamp_ms)
+
+    def _write_aggregate(
+        self, index: int, values: Sequence, samples_count: int, samples_sum: float
+    ) -> None:
+        """ Update the count, sum and quantile or bucket values of a metric """
+        slots = self._metric_slots[index]
+        if len(values) != len(slots) - 2:
+            raise Exception(
+                "Expected {} values for metric {}, got {}".format(
+                    len(slots) - 2, index, len(values)
+                )
+            )
+        write = self._write
+        write(slots[0], samples_count)
+        write(slots[1], samples_sum)
+        for slot, value in zip(slots[2:], values):
+            write(slot, value)
+
+    def _write(self, slot: int, value) -> None:
+        """ Write a value into its slot in the frame """
+        kind = self._kinds[slot]
+        if kind == _DOUBLE:
+            _pack_double_into(self._buffer, self._offsets[slot], value)
+            self._values[slot] = value
+            return
+
+        if kind == _INT64:
+            value &= _UINT64_MASK
+        elif value < 0:
+            raise ValueError("Value out of range for varint: {}".format(value))
+
+        self._values[slot] = value
+        width = self._widths[slot]
+        if value >> (7 * width):
+            # The value does not fit in the space reserved for it.
+            self._widths[slot] = len(encode_varint(value))
+            self._layout()
+            return
+
+        buffer = self._buffer
+        end = self._offsets[slot] + width - 1
+        for offset in range(self._offsets[slot], end):
+            buffer[offset] = (value & 0x7F) | 0x80
+            value >>= 7
+        buffer[end] = value
+
+    def _add_slot(self, kind: int, value) -> Tuple[int, int]:
+        """ Add a value slot and return the template item referencing it """
+        if kind == _INT64:
+            value &= _UINT64_MASK
+        slot = len(self._kinds)
+        self._kinds.append(kind)
+        self._values.append(value)
+        if kind == _DOUBLE:
+            self._widths.append(8)
+        else:
+            self._widths.append(max(self._varint_size, len(encode_varint(value))))
+        self._offsets.append(0)
+        return (_SLOT, slot)
+
+    def _metric_items(self, metric: Metric) -> list:
+        """ Return the template items for a Metric """
+        field_name, tag = _VALUE_FIELDS[self.type]
+        _check_fields(metric, ("label", "timestamp_ms", field_name))
+        value = getattr(metric, field_name)
+
+        slots = []
+        value_items = []
+        if self.type == SUMMARY or self.type == HISTOGRAM:
+            _check_fields(
+                value,
+                ("sample_count", "sample_sum")
+                + (("quantile",) if self.type == SUMMARY else ("bucket",)),
+            )
+            count = self._add_slot(_UINT64, value.sample_count)
+            sum_ = self._add_slot(_DOUBLE, value.sample_sum)
+            value_items.extend((b"\x08", count, b"\x11", sum_))
+            slots.extend((count[1], sum_[1]))
+            if self.type == SUMMARY:
+                for quantile in value.quantile:
+                    _check_fields(quantile, ("quantile", "value"))
+                    slot = self._add_slot(_DOUBLE, quantile.value)
+                    quantile_items = [
+                        b"\x09" + struct.pack("<d", quantile.quantile) + b"\x11",
+                        slot,
+                    ]
+                    value_items.append((_MESSAGE, b"\x1a", quantile_items))
+                    slots.append(slot[1])
+            else:
+                for bucket in value.bucket:
+                    _check_fields(bucket, ("cumulative_count", "upper_bound"))
+                    slot = self._add_slot(_UINT64, bucket.cumulative_count)
+                    bucket_items = [
+                        b"\x08",
+                        slot,
+                        b"\x11" + struct.pack("<d", bucket.upper_bound),
+                    ]
+                    value_items.append((_MESSAGE, b"\x1a", bucket_items))
+                    slots.append(slot[1])
+        else:
+            _check_fields(value, ("value",))
+            slot = self._add_slot(_DOUBLE, value.value)
+            value_items.extend((b"\x09", slot))
+            slots.append(slot[1])
+        self._metric_slots.append(slots)
+
+        items = [Metric(label=metric.label).SerializeToString()]
+        timestamp_items = []
+        if metric.HasField("timestamp_ms"):
+            slot = self._add_slot(_INT64, metric.timestamp_ms)
+            timestamp_items.extend((b"\x30", slot))
+            self._timestamp_slots.append(slot[1])
+        else:
+            self._timestamp_slots.append(None)
+
+        # Fields are encoded in field number order. The timestamp_ms field
+        # number lies between the summary and histogram field numbers.
+        if self.type == HISTOGRAM:
+            items.extend(timestamp_items)
+            items.append((_MESSAGE, tag, value_items))
+        else:
+            items.append((_MESSAGE, tag, value_items))
+            items.extend(timestamp_items)
+        return items
+
+    def _render(self, items: list) -> Tuple[bytearray, List[Tuple[int, int]]]:
+        """ Return the encoded items and the offsets of the slots within them.
+
+        Slots are filled with zero bytes and must be written afterwards.
+        """
+        buffer = bytearray()
+        offsets = []
+        for item in items:
+            if type(item) is bytes:
+                buffer += item
+            elif item[0] == _SLOT:
+                offsets.append((item[1], len(buffer)))
+                buffer += bytes(self._widths[item[1]])
+            else:
+                _, tag, sub_items = item
+                sub_buffer, sub_offsets = self._render(sub_items)
+                buffer += tag
+                buffer += encode_varint(len(sub_buffer))
+                base = len(buffer)
+                offsets.extend((slot, base + offset) for slot, offset in sub_offsets)
+                buffer += sub_buffer
+        return buffer, offsets
+
+    def _layout(self) -> None:
+        """ Encode the frame and write all values into it """
+        payload, offsets = self._render(self._items)
+        header = encode_varint(len(payload))
+        self._buffer = bytearray(header) + payload
+        for slot, offset in offsets:
+            self._offsets[slot] = len(header) + offset
+        for slot, value in enumerate(self._values):
+            self._write(slot, value)
+
+
+def _check_fields(message, supported: Sequence[str]) -> None:
+    """ Raise an exception if a message has a field that is not supported """
+    for field, _ in message.ListFields():
+        if field.name not in supported:
+            raise Exception(
+                "The {} field of {} is not supported by templates".format(
+                    field.name, message.DESCRIPTOR.name
+                )
+            )
@@ -0,0 +1,643 @@
+"""
+This module provides functions that encode MetricFamily objects into the
+Prometheus text exposition format, version 0.0.4, and parse the format back
+into MetricFamily objects.
+
+The output matches the text produced by the Prometheus Go client library.
+Floats are formatted like Go's ``strconv.FormatFloat(f, 'g', -1, 64)``,
+histograms and summaries are expanded into ``_bucket``, ``_sum`` and
+``_count`` series and a ``+Inf`` bucket is added to histograms that lack
+one. Families without any metrics are omitted.
+"""
+
+import codecs
+import functools
+import math
+import re
+
+from . import api
+from . import wire
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    UNTYPED,
+    HISTOGRAM,
+    MetricFamily,
+)
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POS_INF = float("inf")
+NEG_INF = float("-inf")
+
+_TYPE_NAMES = {
+    COUNTER: "counter",
+    GAUGE: "gauge",
+    SUMMARY: "summary",
+    UNTYPED: "untyped",
+    HISTOGRAM: "histogram",
+}
+
+_LABEL_VALUE_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", '"': '\\"'})
+_HELP_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n"})
+
+# The maximum number of formatted label pairs that are cached. The cache is
+# cleared when it is full.
+LABEL_PAIR_CACHE_SIZE = 16384
+_label_pair_cache: Dict[Tuple[str, str], str] = {}
+
+_TYPES = {type_name: metric_type for metric_type, type_name in _TYPE_NAMES.items()}
+
+_LABEL_PAIR_RE = re.compile(
+    r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"\s*(?:,|$)'
+)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+_LABEL_VALUE_UNESCAPES = {"\\": "\\", "n": "\n", '"': '"'}
+_HELP_UNESCAPES = {"\\": "\\", "n": "\n"}
+
+# The maximum number of parsed label blocks that are cached by the parser.
+# The cache is cleared when it is full.
+LABEL_TEXT_CACHE_SIZE = 65536
+_label_text_cache: Dict[Tuple[str, str], Tuple[bytes, Optional[str]]] = {}
+
+
+def encode_text(*metrics: MetricFamily) -> bytes:
+    """ Encode MetricFamily objects into the text exposition format.
+
+    :param metrics: MetricsFamily objects to encode.
+    :returns: the UTF-8 encoded text.
+    """
+    return b"".join(iter_encode_text(metrics))
+
+
+def iter_encode_text(metrics: Iterable[MetricFamily]) -> Iterator[bytes]:
+    """ Encode MetricFamily objects into the text exposition format, lazily.
+
+    Each yielded chunk holds the complete text of one MetricFamily, so
+    concatenating the chunks produces the same output as ``encode_text``.
+
+    :param metrics: an iterable (e.g. a generator) of MetricsFamily objects.
+    :returns: an iterator of UTF-8 encoded chunks.
+    """
+    for mf in metrics:
+        if not isinstance(mf, MetricFamily):
+            raise Exception(
+                "Expected metrics to be instances of MetricFamily, got {}".format(
+                    type(mf)
+                )
+            )
+        if mf.metric:
+            yield _family_text(mf).encode("utf-8")
+
+
+def encode_text_to(writable, *metrics: MetricFamily) -> int:
+    """ Encode MetricFamily objects into the text exposition format and write
+    them to a writable stream one family at a time.
+
+    :param writable: a binary file object, ``io.BufferedWriter`` or any
+      object with a ``write`` method, or a socket (any object with a
+      ``sendall`` method).
+
+    :param metrics: MetricsFamily objects to encode.
+
+    :returns: the number of bytes written.
+    """
+    write = getattr(writable, "write", None)
+    if write is None:
+        write = writable.sendall
+
+    written = 0
+    for chunk in iter_encode_text(metrics):
+        write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _family_text(mf: MetricFamily) -> str:
+    """ Return the text of a MetricFamily """
+    metric_type = mf.type
+    if metric_type == COUNTER:
+        field = "counter"
+    elif metric_type == GAUGE:
+        field = "gauge"
+    elif metric_type == UNTYPED:
+        field = "untyped"
+    elif metric_type != HISTOGRAM and metric_type != SUMMARY:
+        raise Exception("Invalid metric_type: {}".format(metric_type))
+
+    name = mf.name
+    lines = []
+    if mf.HasField("help"):
+        lines.append("# HELP {} {}\n".format(name, mf.help.translate(_HELP_ESCAPES)))
+    lines.append("# TYPE {} {}\n".format(name, _TYPE_NAMES[metric_type]))
+
+    append = lines.append
+    format_float = _format_float
+    for metric in mf.metric:
+        # The label block of a metric is shared by all of its series.
+        labels = _label_block(metric.label)
+        if metric.HasField("timestamp_ms"):
+            end = " " + str(metric.timestamp_ms) + "\n"
+        else:
+            end = "\n"
+
+        if metric_type == HISTOGRAM:
+            aggregate = metric.histogram
+            if labels:
+                prefix = name + "_bucket{" + labels + ',le="'
+            else:
+                prefix = name + '_bucket{le="'
+            has_inf = False
+            for bucket in aggregate.bucket:
+                upper_bound = bucket.upper_bound
+                if upper_bound == POS_INF:
+                    has_inf = True
+                append(
+                    prefix
+                    + format_float(upper_bound)
+                    + '"} '
+                    + _format_count(bucket.cumulative_count)
+                    + end
+                )
+            if not has_inf:
+                append(prefix + '+Inf"} ' + _format_count(aggregate.sample_count) + end)
+        elif metric_type == SUMMARY:
+            aggregate = metric.summary
+            if labels:
+                prefix = name + "{" + labels + ',quantile="'
+            else:
+                prefix = name + '{quantile="'
+            for quantile in aggregate.quantile:
+                append(
+                    prefix
+                    + format_float(quantile.quantile)
+                    + '"} '
+                    + format_float(quantile.value)
+                    + end
+                )
+        else:
+            value = getattr(metric, field).value
+            if labels:
+                append(name + "{" + labels + "} " + format_float(value) + end)
+            else:
+                append(name + " " + format_float(value) + end)
+            continue
+
+        block = "{" + labels + "} " if labels else " "
+        append(name + "_sum" + block + format_float(aggregate.sample_sum) + end)
+        append(name + "_count" + block + _format_count(aggregate.sample_count) + end)
+    return "".join(lines)
+
+
+def _label_block(label_pairs) -> str:
+    """ Return the labels of a metric formatted without the enclosing braces,
+    e.g. ``a="1",b="2"``.
+
+    The formatted and escaped text of each label pair is cached, as label
+    pairs are typically shared by many metrics and repeated on every scrape.
+    """
+    if not label_pairs:
+        return ""
+    cache = _label_pair_cache
+    parts = []
+    for pair in label_pairs:
+        key = (pair.name, pair.value)
+        text = cache.get(key)
+        if text is None:
+            if len(cache) >= LABEL_PAIR_CACHE_SIZE:
+                cache.clear()
+            text = key[0] + '="' + key[1].translate(_LABEL_VALUE_ESCAPES) + '"'
+            cache[key] = text
+        parts.append(text)
+    return ",".join(parts)
+
+
+def _format_count(count: int) -> str:
+    """ Return a count formatted as a float like the Go client library.
+
+    Counts below one million are formatted the same way as integers.
+    """
+    if count < 1000000:
+        return str(count)
+    return _format_float(float(count))
+
+
+def _format_float(value: float) -> str:
+    """ Return a float formatted like Go's ``strconv.FormatFloat(f, 'g', -1,
+    64)``, which is the format used by the Prometheus client libraries.
+
+    NaN, infinities and zeros are handled before the cache because they do
+    not behave as distinct dictionary keys.
+    """
+    if value != value:
+        return "NaN"
+    if value == POS_INF:
+        return "+Inf"
+    if value == NEG_INF:
+        return "-Inf"
+    if value == 0.0:
+        return "-0" if math.copysign(1.0, value) < 0 else "0"
+    return _format_finite(value)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_finite(value: float) -> str:
+    """ Return a finite non-zero float formatted using the shortest digits
+    that round trip, in exponent form when the decimal exponent is less
+    than -4 or at least 6.
+    """
+    text = repr(value)
+    sign = ""
+    if text[0] == "-":
+        sign = "-"
+        text = text[1:]
+
+    # Extract the significant digits and the decimal exponent of the first
+    # digit from the shortest round trip representation.
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        digits = mantissa.replace(".", "")
+        exponent = int(exponent)
+    else:
+        integer, fraction = text.split(".")
+        if integer != "0":
+            digits = (integer + fraction).rstrip("0")
+            exponent = len(integer) - 1
+        else:
+            stripped = fraction.lstrip("0")
+            digits = stripped.rstrip("0")
+            exponent = len(stripped) - len(fraction) - 1
+
+    if exponent < -4 or exponent >= 6:
+        mantissa = digits[0] + "." + digits[1:] if len(digits) > 1 else digits
+        return "{}{}e{}{:02d}".format(
+            sign, mantissa, "-" if exponent < 0 else "+", abs(exponent)
+        )
+    if exponent < 0:
+        return "{}0.{}{}".format(sign, "0" * (-exponent - 1), digits)
+    if len(digits) <= exponent + 1:
+        return "{}{}{}".format(sign, digits, "0" * (exponent + 1 - len(digits)))
+    return "{}{}.{}".format(sign, digits[: exponent + 1], digits[exponent + 1 :])
+
+
+def parse_text(data: Union[bytes, str]) -> List[MetricFamily]:
+    """ Parse the text exposition format into MetricFamily objects.
+
+    :param data: a bytes or str object containing metrics in the text
+      exposition format.
+
+    :returns: a list of MetricFamily objects.
+    """
+    return list(iter_parse_text(data))
+
+
+def iter_parse_text(source, chunk_size: int = 65536) -> Iterator[MetricFamily]:
+    """ Parse the text exposition format into MetricFamily objects, lazily.
+
+    The text is scanned once, line by line. Samples are grouped into the
+    family declared by the preceding TYPE line, and the ``_bucket``,
+    ``_sum`` and ``_count`` samples of histograms and summaries are
+    regrouped into a single Metric per label set. Samples that are not
+    preceded by a TYPE line form untyped families. A family is yielded as
+    soon as the line following it has been read.
+
+    :param source: a bytes or str object, a socket, a file object or an
+      iterable of bytes or str chunks.
+
+    :param chunk_size: the number of bytes to request on each read from a
+      socket or file object.
+
+    :returns: an iterator of MetricFamily objects.
+    """
+    if isinstance(source, str):
+        return _parse_lines([source.split("\n")])
+    return _parse_lines(_iter_lines(source, chunk_size))
+
+
+class _ParsedFamily(object):
+    """ The samples of a MetricFamily that is being parsed """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.help = None
+        # Encoded Metric objects for counters, gauges and untyped metrics.
+        self.metrics = []
+        # The values of each label set of a summary or histogram, along with
+        # the encoded timestamp_ms field of the label set.
+        self.groups = {}
+        self.timestamps = {}
+        self.set_type(UNTYPED)
+
+    def set_type(self, metric_type: int) -> None:
+        """ Set the type of the family and the sample names it accepts.
+
+        ``roles`` maps each sample name that belongs to the family to the
+        part of a Metric that the sample provides.
+        """
+        name = self.name
+        self.type = metric_type
+        self.field = wire._METRIC_UNTYPED
+        if metric_type == HISTOGRAM:
+            self.roles = {
+                name + "_bucket": "le",
+                name + "_sum": "sum",
+                name + "_count": "count",
+            }
+        elif metric_type == SUMMARY:
+            self.roles = {
+                name: "quantile",
+                name + "_sum": "sum",
+                name + "_count": "count",
+            }
+        else:
+            if metric_type == COUNTER:
+                self.field = wire._METRIC_COUNTER
+            elif metric_type == GAUGE:
+                self.field = wire._METRIC_GAUGE
+            self.roles = {name: "value"}
+
+    def to_metric_family(self) -> MetricFamily:
+        """ Return the MetricFamily holding the parsed samples """
+        name = self.name.encode("utf-8")
+        parts = [wire._FAMILY_NAME, wire.encode_varint(len(name)), name]
+        if self.help is not None:
+            help_ = self.help.encode("utf-8")
+            parts.append(wire._FAMILY_HELP)
+            parts.append(wire.encode_varint(len(help_)))
+            parts.append(help_)
+        parts.append(wire._FAMILY_TYPE)
+        parts.append(wire.encode_varint(self.type))
+
+        metrics = self.metrics
+        if self.groups:
+            encoder = (
+                wire._encode_summary_metric
+                if self.type == SUMMARY
+                else wire._encode_histogram_metric
+            )
+            timestamps = self.timestamps
+            metrics = [
+                encoder(
+                    label_block,
+                    values,
+                    values["count"],
+                    values["sum"],
+                    timestamps[label_block],
+                )
+                for label_block, values in self.groups.items()
+            ]
+        for encoded_metric in metrics:
+            parts.append(wire._FAMILY_METRIC)
+            parts.append(wire.encode_varint(len(encoded_metric)))
+            parts.append(encoded_metric)
+        return MetricFamily.FromString(b"".join(parts))
+
+
+def _parse_lines(batches: Iterable[List[str]]) -> Iterator[MetricFamily]:
+    """ Return an iterator of MetricFamily objects parsed from batches of
+    lines.
+    """
+    family = None
+    roles = {}
+    encode_value_metric = wire._encode_value_metric
+    lineno = 0
+    for lines in batches:
+        for line in lines:
+            lineno += 1
+            if not line:
+                continue
+
+            if line[0] == "#":
+                fields = line.split(None, 3)
+                if len(fields) < 3 or (fields[1] != "HELP" and fields[1] != "TYPE"):
+                    # Other comments are ignored
+                    continue
+                name = fields[2]
+                text = fields[3] if len(fields) == 4 else ""
+                if family is None or family.name != name:
+                    if family is not None:
+                        yield family.to_metric_family()
+                    family = _ParsedFamily(name)
+                if fields[1] == "HELP":
+                    family.help = _unescape(text, _HELP_UNESCAPES, lineno)
+                else:
+                    metric_type = _TYPES.get(text.strip())
+                    if metric_type is None:
+                        raise Exception(
+                            "Invalid text format, line {}: unknown metric type "
+                            "{!r}".format(lineno, text)
+                        )
+                    if family.metrics or family.groups:
+                        raise Exception(
+                            "Invalid text format, line {}: TYPE line for {} "
+                            "after its samples".format(lineno, name)
+                        )
+                    family.set_type(metric_type)
+                roles = family.roles
+                continue
+
+            brace = line.find("{")
+            if brace < 0:
+                fields = line.split()
+                if not fields:
+                    continue
+                name = fields[0]
+                label_text = ""
+                del fields[0]
+            else:
+                close = line.rfind("}")
+                if close < brace:
+                    raise Exception(
+                        "Invalid text format, line {}: unterminated labels".format(
+                            lineno
+                        )
+                    )
+                name = line[:brace].strip()
+                label_text = line[brace + 1 : close]
+                fields = line[close + 1 :].split()
+
+            if len(fields) == 1:
+                timestamp_field = b""
+            elif len(fields) == 2:
+                try:
+                    timestamp_ms = int(fields[1])
+                except ValueError:
+                    raise Exception(
+                        "Invalid text format, line {}: invalid timestamp "
+                        "{!r}".format(lineno, fields[1])
+                    )
+                timestamp_field = wire._METRIC_TIMESTAMP_MS + wire.encode_varint(
+                    timestamp_ms & wire._UINT64_MASK
+                )
+            else:
+                raise Exception(
+                    "Invalid text format, line {}: expected a value and an "
+                    "optional timestamp".format(lineno)
+                )
+            try:
+                value = float(fields[0])
+            except ValueError:
+                raise Exception(
+                    "Invalid text format, line {}: invalid value {!r}".format(
+                        lineno, fields[0]
+                    )
+                )
+
+            role = roles.get(name)
+            if role is None:
+                # A sample that does not belong to the current family starts
+                # an untyped family.
+                if family is not None:
+                    yield family.to_metric_family()
+                family = _ParsedFamily(name)
+                roles = family.roles
+                role = "value"
+
+            if role == "value":
+                label_block = _parse_labels(label_text, "", lineno)[0]
+                family.metrics.append(
+                    encode_value_metric(
+                        family.field, label_block, value, timestamp_field
+                    )
+                )
+                continue
+
+            if role == "sum":
+                label_block = _parse_labels(label_text, "", lineno)[0]
+                key = role
+            elif role == "count":
+                label_block = _parse_labels(label_text, "", lineno)[0]
+                key = role
+                value = _parse_count(value, lineno)
+            else:
+                label_block, key = _parse_labels(label_text, role, lineno)
+                if key is None:
+                    raise Exception(
+                        "Invalid text format, line {}: missing {} label".format(
+                            lineno, role
+                        )
+                    )
+                try:
+                    key = float(key)
+                except ValueError:
+                    raise Exception(
+                        "Invalid text format, line {}: invalid {} label value "
+                        "{!r}".format(lineno, role, key)
+                    )
+                if role == "le":
+                    value = _parse_count(value, lineno)
+            values = family.groups.get(label_block)
+            if values is None:
+                values = family.groups[label_block] = {"count": 0, "sum": 0.0}
+            values[key] = value
+            family.timestamps[label_block] = timestamp_field
+
+    if family is not None:
+        yield family.to_metric_family()
+
+
+def _parse_count(value: float, lineno: int) -> int:
+    """ Return a count parsed as a float as an integer """
+    if not 0 <= value < POS_INF:
+        raise Exception(
+            "Invalid text format, line {}: invalid count {}".format(lineno, value)
+        )
+    return int(value)
+
+
+def _parse_labels(
+    label_text: str, special: str, lineno: int
+) -> Tuple[bytes, Optional[str]]:
+    """ Return the encoded labels of a sample and the value of its special
+    label, e.g. ``le``, which is excluded from the encoded labels.
+
+    Results are cached by the text between the braces of the sample, so
+    each distinct label set is only parsed once. Exposers write the special
+    label last, so when it is found at the end of the text it is split off
+    before the lookup and all the series of a histogram or summary share a
+    cache entry.
+    """
+    if special and label_text[-1:] == '"':
+        start = label_text.rfind(special + '="')
+        if (
+            start >= 0
+            and (start == 0 or label_text[start - 1] == ",")
+            and label_text.find('"', start + len(special) + 2) == len(label_text) - 1
+        ):
+            value = label_text[start + len(special) + 2 : -1]
+            if "\\" not in value:
+                base = label_text[: max(start - 1, 0)]
+                return _parse_labels(base, "", lineno)[0], value
+
+    cache = _label_text_cache
+    key = (label_text, special)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    labels = {}
+    special_value = None
+    pos = 0
+    end = len(label_text)
+    while pos < end:
+        match = _LABEL_PAIR_RE.match(label_text, pos)
+        if match is None:
+            if label_text[pos:].isspace():
+                break
+            raise Exception(
+                "Invalid text format, line {}: invalid labels {{{}}}".format(
+                    lineno, label_text
+                )
+            )
+        name, value = match.groups()
+        if "\\" in value:
+            value = _unescape(value, _LABEL_VALUE_UNESCAPES, lineno)
+        if name in labels or (name == special and special_value is not None):
+            raise Exception(
+                "Invalid text format, line {}: duplicate label {}".format(lineno, name)
+            )
+        if name == special:
+            special_value = value
+        else:
+            labels[name] = value
+        pos = match.end()
+
+    if len(cache) >= LABEL_TEXT_CACHE_SIZE:
+        cache.clear()
+    entry = cache[key] = (wire.encode_labels(labels), special_value)
+    return entry
+
+
+def _unescape(text: str, escapes: Dict[str, str], lineno: int) -> str:
+    """ Return text with its escape sequences replaced """
+    if "\\" not in text:
+        return text
+
+    def replace(match):
+        try:
+            return escapes[match.group(1)]
+        except KeyError:
+            raise Exception(
+                "Invalid text format, line {}: invalid escape sequence "
+                "{!r}".format(lineno, match.group(0))
+            )
+
+    return _ESCAPE_RE.sub(replace, text)
+
+
+def _iter_lines(source, chunk_size: int) -> Iterator[List[str]]:
+    """ Return an iterator of lists of complete lines read from a source """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    for chunk in api._iter_chunks(source, chunk_size):
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        yield lines
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield [tail]
@@ -0,0 +1,111 @@
+"""
+This module provides functions to send the list of buffers produced by
+``api.encode_buffers`` without first joining them into a single bytes
+object.
+"""
+
+import os
+
+from typing import TYPE_CHECKING, Callable, List, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover
+    # asyncio is only needed for annotations, importing it is slow.
+    import asyncio
+
+
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+
+def send_buffers(sock, buffers: Sequence[bytes]) -> int:
+    """ Send a list of buffers over a blocking socket.
+
+    The buffers are sent using ``socket.sendmsg`` so the kernel gathers them
+    directly from each buffer. Partial sends are resumed until all the data
+    has been sent. On platforms without ``sendmsg`` each buffer is sent with
+    ``sendall``.
+
+    :param sock: a connected, blocking socket.
+    :param buffers: a sequence of bytes-like objects.
+    :returns: the number of bytes sent.
+    """
+    if not hasattr(sock, "sendmsg"):
+        total = 0
+        for buffer in buffers:
+            sock.sendall(buffer)
+            total += len(buffer)
+        return total
+    return _gather(sock.sendmsg, buffers)
+
+
+def write_buffers(fd: int, buffers: Sequence[bytes]) -> int:
+    """ Write a list of buffers to a blocking file descriptor.
+
+    The buffers are written using ``os.writev`` so the kernel gathers them
+    directly from each buffer. Partial writes are resumed until all the
+    data has been written. On platforms without ``writev`` each buffer is
+    written with ``os.write``.
+
+    :param fd: a file descriptor, e.g. from ``socket.fileno()`` or a pipe.
+    :param buffers: a sequence of bytes-like objects.
+    :returns: the number of bytes written.
+    """
+    if hasattr(os, "writev"):
+        return _gather(lambda views: os.writev(fd, views), buffers)
+    return _gather(lambda views: os.write(fd, views[0]), buffers)
+
+
+def write_transport(
+    transport: "asyncio.WriteTransport", buffers: Sequence[bytes]
+) -> None:
+    """ Write a list of buffers to an asyncio transport.
+
+    The buffers are passed to the transport's ``writelines`` method which
+    allows the event loop to send them without joining them (Python 3.12
+    and later use ``sendmsg`` for this).
+
+    :param transport: an asyncio write transport.
+    :param buffers: a sequence of bytes-like objects.
+    """
+    transport.writelines(buffers)
+
+
+async def write_stream(
+    writer: "asyncio.StreamWriter", buffers: Sequence[bytes]
+) -> None:
+    """ Write a list of buffers to an asyncio stream and wait for it to drain.
+
+    :param writer: an asyncio StreamWriter.
+    :param buffers: a sequence of bytes-like objects.
+    """
+    writer.writelines(buffers)
+    await writer.drain()
+
+
+def _gather(send: Callable[[List[memoryview]], int], buffers: Sequence[bytes]) -> int:
+    """ Send buffers using a scatter-gather send function.
+
+    The send function is called with at most IOV_MAX buffers at a time and
+    must return the number of bytes sent, which may be less than the total
+    size of the buffers passed to it.
+
+    :returns: the number of bytes sent.
+    """
+    views = [memoryview(b).cast("B") for b in buffers if len(b)]
+    total = 0
+    start = 0
+    while start < len(views):
+        sent = send(views[start : start + _IOV_MAX])
+        total += sent
+        while sent:
+            size = len(views[start])
+            if sent < size:
+                views[start] = views[start][sent:]
+                break
+            sent -= size
+            start += 1
+    return total
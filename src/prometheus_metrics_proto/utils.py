@@ -3,8 +3,12 @@ This module provides wrapper functions to help create the various data types
 used in Prometheus metrics.
 """
 
+import bisect
 import collections
 import datetime
+import math
+import sys
+import threading
 
 from .prometheus_metrics_pb2 import (
     COUNTER,
@@ -12,7 +16,9 @@ from .prometheus_metrics_pb2 import (
     SUMMARY,
     HISTOGRAM,
     Bucket,
+    BucketSpan,
     Counter,
+    Exemplar,
     Gauge,
     Histogram,
     LabelPair,
@@ -21,7 +27,7 @@ from .prometheus_metrics_pb2 import (
     Summary,
     Quantile,
 )
-from typing import Dict, List, Sequence, Tuple, Union
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
 
 
 # typing aliases
@@ -36,6 +42,23 @@ CollectorsType = Union[Counter, Gauge, Histogram, Summary]
 MetricValueType = Union[float, SummaryDictType, HistogramDictType]
 MetricTupleType = Tuple[LabelsType, MetricValueType]
 
+# Native histogram schemas and the default zero bucket threshold used by the
+# Prometheus client libraries.
+NATIVE_SCHEMA_MIN = -4
+NATIVE_SCHEMA_MAX = 8
+DEFAULT_ZERO_THRESHOLD = 2.0 ** -128
+
+# The maximum combined length, in characters, of the label names and values
+# of an exemplar as defined by OpenMetrics.
+EXEMPLAR_MAX_LABEL_LENGTH = 128
+
+# For each positive schema, the bucket boundaries within [0.5, 1), the range
+# of the fraction returned by math.frexp.
+_NATIVE_BOUNDS = {
+    schema: [2.0 ** (i / (1 << schema) - 1) for i in range(1 << schema)]
+    for schema in range(1, NATIVE_SCHEMA_MAX + 1)
+}
+
 
 def create_counter_metric(
     labels: LabelsType,
@@ -43,6 +66,7 @@ def create_counter_metric(
     timestamp: bool = False,
     const_labels: LabelsType = None,
     ordered: bool = True,
+    exemplar: Exemplar = None,
 ) -> Metric:
     """ Create a Metric object containing a Counter object.
 
@@ -56,11 +80,11 @@ def create_counter_metric(
       the metric. By default this is False.
     :param ordered: a boolean that determines if the labels are sorted by key.
       By default this is True.
+    :param exemplar: an optional Exemplar object, see ``create_exemplar``.
     :returns: a Metric object containing a Counter object
     """
-    unified_labels = _unify_labels(labels, const_labels, ordered=ordered)
-    labels = [LabelPair(name=k, value=str(v)) for k, v in unified_labels.items()]
-    counter = Counter(value=value)
+    labels = label_set_cache.label_pairs(labels, const_labels, ordered=ordered)
+    counter = Counter(value=value, exemplar=exemplar)
     metric = Metric(label=labels, counter=counter)
     if timestamp:
         metric.timestamp_ms = _timestamp_ms()
@@ -88,8 +112,7 @@ def create_gauge_metric(
       By default this is True.
     :returns: a Metric object containing a Gauge object
     """
-    unified_labels = _unify_labels(labels, const_labels, ordered=ordered)
-    labels = [LabelPair(name=k, value=str(v)) for k, v in unified_labels.items()]
+    labels = label_set_cache.label_pairs(labels, const_labels, ordered=ordered)
     gauge = Gauge(value=value)
     metric = Metric(label=labels, gauge=gauge)
     if timestamp:
@@ -123,8 +146,7 @@ def create_summary_metric(
       By default this is True.
     :returns: a Metric object containing a Summary object
     """
-    unified_labels = _unify_labels(labels, const_labels, ordered=ordered)
-    labels = [LabelPair(name=k, value=str(v)) for k, v in unified_labels.items()]
+    labels = label_set_cache.label_pairs(labels, const_labels, ordered=ordered)
     # The count and sum values may also be present in the values.
     # Only process non-string keys into quantile objects.
     quantiles = []
@@ -150,6 +172,7 @@ def create_histogram_metric(
     timestamp: bool = None,
     const_labels: LabelsType = None,
     ordered=True,
+    exemplars: Dict[float, Exemplar] = None,
 ) -> Metric:
     """ Create a Metric object containing a Histogram object.
 
@@ -166,16 +189,19 @@ def create_histogram_metric(
       the metric. By default this is False.
     :param ordered: a boolean that determines if the labels are sorted by key.
       By default this is True.
+    :param exemplars: an optional dict mapping bucket upper bounds to Exemplar
+      objects, see ``create_exemplar``. Buckets without an entry have no
+      exemplar.
     :returns: a Metric object containing a Summary object
     """
-    unified_labels = _unify_labels(labels, const_labels, ordered=ordered)
-    labels = [LabelPair(name=k, value=str(v)) for k, v in unified_labels.items()]
+    labels = label_set_cache.label_pairs(labels, const_labels, ordered=ordered)
     # The count and sum values may also be present in the values.
     # Only process non-string keys into bucket objects.
     buckets = []
     for k, v in values.items():
         if not isinstance(k, str):
-            buckets.append(Bucket(cumulative_count=v, upper_bound=k))
+            exemplar = exemplars.get(k) if exemplars else None
+            buckets.append(Bucket(cumulative_count=v, upper_bound=k, exemplar=exemplar))
     histogram = Histogram(
         sample_count=samples_count, sample_sum=samples_sum, bucket=buckets
     )
@@ -185,6 +211,90 @@ def create_histogram_metric(
     return metric
 
 
+def create_native_histogram_metric(
+    labels: LabelsType,
+    observations: Iterable[float],
+    schema: int = 3,
+    zero_threshold: float = DEFAULT_ZERO_THRESHOLD,
+    timestamp: bool = False,
+    const_labels: LabelsType = None,
+    ordered: bool = True,
+) -> Metric:
+    """ Create a Metric object containing a native Histogram object.
+
+    Native (sparse exponential) histograms have buckets with exponentially
+    growing boundaries determined by a schema, and only the buckets that hold
+    observations are encoded. Bucket ``i`` holds the observations greater
+    than ``2**((i - 1) * 2**-schema)`` and less than or equal to
+    ``2**(i * 2**-schema)``. Negative observations are held in mirrored
+    negative buckets and observations whose magnitude is within the zero
+    threshold are counted in the zero bucket.
+
+    NaN observations are counted in the sample count and sum but not in any
+    bucket. Infinite observations are counted in the bucket above the one
+    holding the largest finite value.
+
+    :param labels: a dict of labels that define this particular instance of a
+      metric.
+    :param observations: an iterable of observed values.
+    :param schema: an integer from -4 to 8 that sets the resolution of the
+      buckets. Each increment doubles the number of buckets. The default of 3
+      gives buckets whose boundaries grow by a factor of about 1.09.
+    :param zero_threshold: the largest magnitude counted in the zero bucket.
+    :param timestamp: a boolean that determines if a timestamp is added to
+      the metric. By default this is False.
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+    :returns: a Metric object containing a native Histogram object
+    """
+    if not NATIVE_SCHEMA_MIN <= schema <= NATIVE_SCHEMA_MAX:
+        raise Exception(
+            "Invalid schema: {}, expected a value from {} to {}".format(
+                schema, NATIVE_SCHEMA_MIN, NATIVE_SCHEMA_MAX
+            )
+        )
+    positive = {}
+    negative = {}
+    zero_count = 0
+    samples_count = 0
+    samples_sum = 0.0
+    for value in observations:
+        samples_count += 1
+        samples_sum += value
+        if value > zero_threshold:
+            key = _native_bucket_key(value, schema)
+            positive[key] = positive.get(key, 0) + 1
+        elif value < -zero_threshold:
+            key = _native_bucket_key(-value, schema)
+            negative[key] = negative.get(key, 0) + 1
+        elif value == value:
+            zero_count += 1
+
+    positive_spans, positive_deltas = _native_spans(positive)
+    negative_spans, negative_deltas = _native_spans(negative)
+    if not (positive_spans or negative_spans or zero_threshold or zero_count):
+        # A histogram without buckets or a zero bucket would be mistaken for
+        # a classic histogram, so an empty span marks it as native.
+        positive_spans = [BucketSpan(offset=0, length=0)]
+
+    labels = label_set_cache.label_pairs(labels, const_labels, ordered=ordered)
+    histogram = Histogram(
+        sample_count=samples_count,
+        sample_sum=samples_sum,
+        schema=schema,
+        zero_threshold=zero_threshold,
+        zero_count=zero_count,
+        negative_span=negative_spans,
+        negative_delta=negative_deltas,
+        positive_span=positive_spans,
+        positive_delta=positive_deltas,
+    )
+    metric = Metric(label=labels, histogram=histogram)
+    if timestamp:
+        metric.timestamp_ms = _timestamp_ms()
+    return metric
+
+
 def create_metric_family(
     metric_name: str,
     metric_help: str,
@@ -320,6 +430,238 @@ def create_bucket(cumulative_count: int, upper_bound: float) -> Bucket:
     return Bucket(cumulative_count=cumulative_count, upper_bound=upper_bound)
 
 
+def create_exemplar(
+    labels: LabelsType, value: float, timestamp: float = None
+) -> Exemplar:
+    """ Create an Exemplar object.
+
+    An exemplar links an observation to data outside of the metric, such as
+    the trace in which the observation was made.
+
+    :param labels: a dict of labels that identify the exemplar, e.g.
+      ``{"trace_id": "..."}``. The combined length of the label names and
+      values must not exceed EXEMPLAR_MAX_LABEL_LENGTH characters.
+    :param value: a float representing the observed value.
+    :param timestamp: an optional float representing the time of the
+      observation in seconds since the epoch.
+    :returns: an Exemplar object
+    """
+    _check_exemplar_labels(labels)
+    exemplar = Exemplar(label=create_labels(labels), value=value)
+    if timestamp is not None:
+        seconds = math.floor(timestamp)
+        exemplar.timestamp.seconds = seconds
+        exemplar.timestamp.nanos = int((timestamp - seconds) * 1e9)
+    return exemplar
+
+
+class LabelSetCache(object):
+    """ A bounded cache of the LabelPair objects generated for label sets.
+
+    Generating the labels for a metric involves combining the labels with
+    the const labels, optionally sorting them and then creating LabelPair
+    objects. Label sets are usually stable between scrapes so this cache
+    maps a label set, its const labels and the ordering flag to pre-built
+    LabelPair objects along with their encoded form (the encoded repeated
+    ``label`` field of a Metric).
+
+    When the cache holds ``maxsize`` entries the least recently used entry
+    is evicted to make room for a new one. A ``maxsize`` of 0 disables
+    caching.
+
+    :param maxsize: the maximum number of label sets held by the cache.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def label_pairs(
+        self,
+        labels: LabelsType = None,
+        const_labels: LabelsType = None,
+        ordered: bool = True,
+    ) -> Tuple[LabelPair, ...]:
+        """ Return the LabelPair objects for a label set.
+
+        The returned LabelPair objects are shared by all users of the cache
+        and must not be modified. They are copied when passed to a Metric.
+
+        :param labels: a dict of labels for a metric.
+
+        :param const_labels: a dict of constant labels to be associated with
+          the metric.
+
+        :param ordered: a boolean that determines if the labels are sorted by
+          key. By default this is True.
+
+        :returns: a tuple of LabelPair objects.
+        """
+        return self._lookup(labels, const_labels, ordered)[0]
+
+    def encoded_labels(
+        self,
+        labels: LabelsType = None,
+        const_labels: LabelsType = None,
+        ordered: bool = True,
+    ) -> bytes:
+        """ Return the encoded repeated ``label`` field of a Metric for a
+        label set.
+
+        :param labels: a dict of labels for a metric.
+
+        :param const_labels: a dict of constant labels to be associated with
+          the metric.
+
+        :param ordered: a boolean that determines if the labels are sorted by
+          key. By default this is True.
+
+        :returns: the encoded LabelPair fields.
+        """
+        return self._lookup(labels, const_labels, ordered)[1]
+
+    def stats(self) -> Dict[str, int]:
+        """ Return a dict of cache statistics.
+
+        The dict contains the number of cache hits, misses and evictions along
+        with the current size and maximum size of the cache.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+        )
+
+    def clear(self) -> None:
+        """ Remove all entries from the cache and reset the statistics. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _lookup(
+        self, labels: LabelsType, const_labels: LabelsType, ordered: bool
+    ) -> Tuple[Tuple[LabelPair, ...], bytes]:
+        """ Return the (LabelPair objects, encoded labels) entry for a label
+        set, creating it if it is not already in the cache.
+        """
+        # Label values are converted to strings when generating LabelPair
+        # objects. Convert them before building the key so that values that
+        # compare equal but have different string forms (e.g. 1 and 1.0) do
+        # not share an entry.
+        key = (_label_items(labels), _label_items(const_labels), ordered)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        unified_labels = _unify_labels(labels, const_labels, ordered=ordered)
+        label_pairs = tuple(
+            LabelPair(name=k, value=str(v)) for k, v in unified_labels.items()
+        )
+        entry = (label_pairs, Metric(label=label_pairs).SerializeToString())
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return entry
+
+
+def _native_bucket_key(value: float, schema: int) -> int:
+    """ Return the index of the native histogram bucket holding a positive
+    value.
+    """
+    if value == math.inf:
+        return _NATIVE_INF_KEYS[schema]
+    frac, exp = math.frexp(value)
+    if schema > 0:
+        # frac is in [0.5, 1) and the bounds divide that range into 2**schema
+        # buckets. Upper bounds are inclusive, hence the left sided search.
+        bounds = _NATIVE_BOUNDS[schema]
+        return bisect.bisect_left(bounds, frac) + (exp - 1) * len(bounds)
+    key = exp - 1 if frac == 0.5 else exp
+    if schema < 0:
+        # Merge groups of 2**-schema buckets, rounding up.
+        key = (key + (1 << -schema) - 1) >> -schema
+    return key
+
+
+def _native_spans(buckets: Dict[int, int]) -> Tuple[List[BucketSpan], List[int]]:
+    """ Return the spans and count deltas encoding a dict of bucket counts.
+
+    Gaps of up to two empty buckets are filled with zero counts rather than
+    starting a new span, as this encodes more compactly.
+    """
+    spans = []
+    deltas = []
+    previous_count = 0
+    next_key = 0
+    for key in sorted(buckets):
+        gap = key - next_key
+        if not spans or gap > 2:
+            spans.append(BucketSpan(offset=gap, length=0))
+        else:
+            for _ in range(gap):
+                deltas.append(-previous_count)
+                previous_count = 0
+            spans[-1].length += gap
+        count = buckets[key]
+        deltas.append(count - previous_count)
+        previous_count = count
+        spans[-1].length += 1
+        next_key = key + 1
+    return spans, deltas
+
+
+# Infinite observations are counted in the bucket above the one holding the
+# largest finite value.
+_NATIVE_INF_KEYS = {
+    schema: _native_bucket_key(sys.float_info.max, schema) + 1
+    for schema in range(NATIVE_SCHEMA_MIN, NATIVE_SCHEMA_MAX + 1)
+}
+
+
+# The label set cache used by the functions in this module and by the
+# encoders in the ``wire`` module.
+label_set_cache = LabelSetCache()
+
+
+def _check_exemplar_labels(labels: LabelsType) -> None:
+    """ Raise an exception if the labels of an exemplar are too long """
+    length = sum(len(k) + len(str(v)) for k, v in labels.items())
+    if length > EXEMPLAR_MAX_LABEL_LENGTH:
+        raise Exception(
+            "Invalid exemplar labels, combined length {} exceeds {}".format(
+                length, EXEMPLAR_MAX_LABEL_LENGTH
+            )
+        )
+
+
+def _label_items(labels: LabelsType) -> Tuple[Tuple[str, str], ...]:
+    """ Return a hashable representation of a dict of labels. """
+    if not labels:
+        return ()
+    return tuple([(k, v if type(v) is str else str(v)) for k, v in labels.items()])
+
+
 def _timestamp_ms() -> int:
     """ Return a UTC timestamp, in milliseconds.
 
@@ -0,0 +1,584 @@
+"""
+This module provides functions that encode Prometheus metrics directly into
+the ``io.prometheus.client.MetricFamily`` Protocol Buffer wire format.
+
+The functions accept the same arguments as the helpers in the ``utils``
+module but skip the construction of intermediate LabelPair, Counter, Gauge,
+Summary, Histogram, Metric and MetricFamily objects. The bytes produced are
+identical to those produced by serializing the equivalent objects.
+"""
+
+import struct
+
+from . import utils
+from .prometheus_metrics_pb2 import (
+    COUNTER,
+    GAUGE,
+    SUMMARY,
+    HISTOGRAM,
+    Exemplar,
+    Metric,
+)
+from typing import Dict, Sequence, Tuple, Union
+
+
+# Field tags (field number << 3 | wire type) used by the metrics messages.
+# LabelPair
+_LABEL_NAME = b"\x0a"
+_LABEL_VALUE = b"\x12"
+# Gauge, Counter and Untyped share the same layout
+_VALUE = b"\x09"
+# Summary and Histogram
+_SAMPLE_COUNT = b"\x08"
+_SAMPLE_SUM = b"\x11"
+_QUANTILE = b"\x1a"
+_BUCKET = b"\x1a"
+# Quantile
+_QUANTILE_QUANTILE = b"\x09"
+_QUANTILE_VALUE = b"\x11"
+# Bucket
+_BUCKET_CUMULATIVE_COUNT = b"\x08"
+_BUCKET_UPPER_BOUND = b"\x11"
+# Counter and Bucket
+_COUNTER_EXEMPLAR = b"\x12"
+_BUCKET_EXEMPLAR = b"\x1a"
+# Metric
+_METRIC_LABEL = b"\x0a"
+_METRIC_GAUGE = b"\x12"
+_METRIC_COUNTER = b"\x1a"
+_METRIC_SUMMARY = b"\x22"
+_METRIC_UNTYPED = b"\x2a"
+_METRIC_TIMESTAMP_MS = b"\x30"
+_METRIC_HISTOGRAM = b"\x3a"
+# MetricFamily
+_FAMILY_NAME = b"\x0a"
+_FAMILY_HELP = b"\x12"
+_FAMILY_TYPE = b"\x18"
+_FAMILY_METRIC = b"\x22"
+
+# A length delimited Quantile message always holds two doubles.
+_QUANTILE_PREFIX = _QUANTILE + b"\x12" + _QUANTILE_QUANTILE
+
+_UINT64_MASK = (1 << 64) - 1
+
+_pack_double = struct.Struct("<d").pack
+
+_SMALL_VARINTS = [bytes((i,)) for i in range(0x80)]
+
+
+def encode_varint(value: int) -> bytes:
+    """ Return the varint encoding of a non-negative integer.
+
+    :param value: an integer in the uint64 range.
+    :returns: the encoded varint.
+    """
+    if value < 0x80:
+        if value < 0:
+            raise ValueError("Value out of range for varint: {}".format(value))
+        return _SMALL_VARINTS[value]
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(buffer, pos: int = 0) -> Tuple[int, int]:
+    """ Decode a varint from a buffer.
+
+    :param buffer: a bytes-like object whose items are integers, e.g. bytes,
+      bytearray or a memoryview with the ``B`` format.
+    :param pos: the offset of the varint within the buffer.
+    :returns: a tuple of the decoded value and the offset of the first byte
+      after the varint.
+    :raises IndexError: if the buffer ends before the varint is complete.
+    """
+    byte = buffer[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value = byte & 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        byte = buffer[pos]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos + 1
+        shift += 7
+        if shift >= 70:
+            raise Exception("Too many bytes when decoding varint")
+
+
+def skip_field(buffer, pos: int, wire_type: int) -> int:
+    """ Skip over the value of a field.
+
+    :param buffer: a bytes-like object whose items are integers.
+    :param pos: the offset of the field value, immediately after its tag.
+    :param wire_type: the wire type from the field tag.
+    :returns: the offset of the first byte after the field value.
+    """
+    if wire_type == 0:
+        return decode_varint(buffer, pos)[1]
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        size, pos = decode_varint(buffer, pos)
+        return pos + size
+    if wire_type == 5:
+        return pos + 4
+    raise Exception("Unsupported wire type: {}".format(wire_type))
+
+
+def decode_family_name(buffer, pos: int, end: int) -> str:
+    """ Return the name of an encoded MetricFamily without parsing it.
+
+    Fields are scanned until the name (field 1) is found. Serializers write
+    fields in field number order so the name is normally the first field.
+
+    :param buffer: a bytes-like object whose items are integers.
+    :param pos: the offset of the encoded MetricFamily, after its size header.
+    :param end: the offset of the end of the encoded MetricFamily.
+    :returns: the name, or an empty string if the family has no name.
+    """
+    while pos < end:
+        tag, pos = decode_varint(buffer, pos)
+        if tag == 0x0A:
+            size, pos = decode_varint(buffer, pos)
+            return str(buffer[pos : pos + size], "utf-8")
+        pos = skip_field(buffer, pos, tag & 0x07)
+    return ""
+
+
+def encode_labels(labels: utils.LabelsType) -> bytes:
+    """ Return the encoded LabelPair fields of a Metric for a dict of labels.
+
+    The labels are encoded in the order they are provided. The encoders in
+    this module obtain their encoded labels from ``utils.label_set_cache``
+    which also applies const labels and ordering.
+
+    :param labels: a dict of labels.
+    :returns: the encoded repeated ``label`` field of a Metric.
+    """
+    parts = []
+    for name, value in labels.items():
+        name = name.encode("utf-8")
+        value = str(value).encode("utf-8")
+        pair = b"".join(
+            (
+                _LABEL_NAME,
+                encode_varint(len(name)),
+                name,
+                _LABEL_VALUE,
+                encode_varint(len(value)),
+                value,
+            )
+        )
+        parts.append(_METRIC_LABEL + encode_varint(len(pair)) + pair)
+    return b"".join(parts)
+
+
+def encode_counter_metric(
+    labels: utils.LabelsType,
+    value: float,
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+    exemplar: Exemplar = None,
+) -> bytes:
+    """ Return an encoded Metric containing a Counter.
+
+    The result is identical to serializing the Metric object returned by
+    ``utils.create_counter_metric`` with the same arguments.
+
+    :param labels: a dict of labels that define this particular instance of a
+      metric.
+    :param value: a float representing the value of the metric.
+    :param timestamp: a boolean that determines if a timestamp is added to
+      the metric. By default this is False.
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+    :param exemplar: an optional Exemplar object.
+    :returns: an encoded Metric containing a Counter
+    """
+    label_block = utils.label_set_cache.encoded_labels(
+        labels, const_labels, ordered=ordered
+    )
+    if exemplar is None:
+        return _encode_value_metric(
+            _METRIC_COUNTER, label_block, value, _timestamp_field(timestamp)
+        )
+    counter = b"".join(
+        (_VALUE, _pack_double(value), _exemplar_field(_COUNTER_EXEMPLAR, exemplar))
+    )
+    return b"".join(
+        (
+            label_block,
+            _METRIC_COUNTER,
+            encode_varint(len(counter)),
+            counter,
+            _timestamp_field(timestamp),
+        )
+    )
+
+
+def encode_gauge_metric(
+    labels: utils.LabelsType,
+    value: float,
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+) -> bytes:
+    """ Return an encoded Metric containing a Gauge.
+
+    The result is identical to serializing the Metric object returned by
+    ``utils.create_gauge_metric`` with the same arguments.
+
+    :param labels: a dict of labels that define this particular instance of a
+      metric.
+    :param value: a float representing the value of the metric.
+    :param timestamp: a boolean that determines if a timestamp is added to
+      the metric. By default this is False.
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+    :returns: an encoded Metric containing a Gauge
+    """
+    label_block = utils.label_set_cache.encoded_labels(
+        labels, const_labels, ordered=ordered
+    )
+    return _encode_value_metric(
+        _METRIC_GAUGE, label_block, value, _timestamp_field(timestamp)
+    )
+
+
+def encode_summary_metric(
+    labels: utils.LabelsType,
+    values: utils.SummaryDictType,
+    samples_count: int,
+    samples_sum: float,
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+) -> bytes:
+    """ Return an encoded Metric containing a Summary.
+
+    The result is identical to serializing the Metric object returned by
+    ``utils.create_summary_metric`` with the same arguments.
+
+    :param labels: a dict of labels that define this particular instance of a
+      metric.
+    :param values: a dict representing the various quantile values of the
+      metric. The count and sum may be present in this dict.
+    :param samples_count: an integer representing the number of samples.
+    :param samples_sum: a float representing the sum of samples.
+    :param timestamp: a boolean that determines if a timestamp is added to
+      the metric. By default this is False.
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+    :returns: an encoded Metric containing a Summary
+    """
+    label_block = utils.label_set_cache.encoded_labels(
+        labels, const_labels, ordered=ordered
+    )
+    return _encode_summary_metric(
+        label_block, values, samples_count, samples_sum, _timestamp_field(timestamp)
+    )
+
+
+def encode_histogram_metric(
+    labels: utils.LabelsType,
+    values: utils.HistogramDictType,
+    samples_count: int,
+    samples_sum: float,
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+    exemplars: Dict[float, Exemplar] = None,
+) -> bytes:
+    """ Return an encoded Metric containing a Histogram.
+
+    The result is identical to serializing the Metric object returned by
+    ``utils.create_histogram_metric`` with the same arguments.
+
+    :param labels: a dict of labels that define this particular instance of a
+      metric.
+    :param values: a dict representing the various bucket values of the
+      metric. The cumulative count and sum values may be present in this dict.
+    :param samples_count: an integer representing the number of observations.
+    :param samples_sum: a float representing the sum of observations.
+    :param timestamp: a boolean that determines if a timestamp is added to
+      the metric. By default this is False.
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True.
+    :param exemplars: an optional dict mapping bucket upper bounds to
+      Exemplar objects.
+    :returns: an encoded Metric containing a Histogram
+    """
+    label_block = utils.label_set_cache.encoded_labels(
+        labels, const_labels, ordered=ordered
+    )
+    return _encode_histogram_metric(
+        label_block,
+        values,
+        samples_count,
+        samples_sum,
+        _timestamp_field(timestamp),
+        exemplars,
+    )
+
+
+def encode_metric_family(
+    metric_name: str,
+    metric_help: str,
+    metric_type: utils.MetricType,
+    metrics: Union[Sequence[Metric], Sequence[utils.MetricTupleType]],
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+) -> bytes:
+    """ Return an encoded MetricFamily.
+
+    The result is identical to serializing the MetricFamily object returned
+    by ``utils.create_metric_family`` with the same arguments.
+
+    :param metric_name: a string representing the metric name.
+
+    :param metric_help: a string representing the metric help.
+
+    :param metric_type: an enumeration from the set of COUNTER, GAUGE,
+      HISTOGRAM, SUMMARY.
+
+    :param metrics: This argument can take two forms. The first is a sequence
+      of pre-generated Metric objects. The second is a sequence of 2-Tuple's
+      containing the raw labels and values for each multi-dimensional metric
+      instance that will be encoded into the MetricsFamily.
+
+    :param timestamp: a boolean that determines if a timestamp is added to
+      encoded metric instances. By default this is False. This parameter
+      is only used if the ``metrics`` argument is not a pre-generated list of
+      Metrics objects.
+
+    :param const_labels: an extra dict of labels that should be added to
+      labels of any encoded metric instances. This parameter is only used if
+      the ``metrics`` argument is not a pre-generated list of Metrics
+      objects.
+
+    :param ordered: a boolean that determines if the labels are sorted by key.
+      By default this is True. This parameter is only used if the ``metrics``
+      argument is not a pre-generated list of Metrics objects.
+
+    :returns: an encoded MetricFamily
+    """
+    name = metric_name.encode("utf-8")
+    help_ = metric_help.encode("utf-8")
+    parts = [
+        _FAMILY_NAME,
+        encode_varint(len(name)),
+        name,
+        _FAMILY_HELP,
+        encode_varint(len(help_)),
+        help_,
+        _FAMILY_TYPE,
+        encode_varint(metric_type),
+    ]
+
+    if metrics:
+        if all([isinstance(m, Metric) for m in metrics]):
+            encoded_metrics = [m.SerializeToString() for m in metrics]
+        else:
+            encoded_metrics = _encode_metrics(
+                metric_type, metrics, timestamp, const_labels, ordered
+            )
+        for encoded_metric in encoded_metrics:
+            parts.append(_FAMILY_METRIC)
+            parts.append(encode_varint(len(encoded_metric)))
+            parts.append(encoded_metric)
+
+    return b"".join(parts)
+
+
+def encode_frame(
+    metric_name: str,
+    metric_help: str,
+    metric_type: utils.MetricType,
+    metrics: Union[Sequence[Metric], Sequence[utils.MetricTupleType]],
+    timestamp: bool = False,
+    const_labels: utils.LabelsType = None,
+    ordered: bool = True,
+) -> bytes:
+    """ Return an encoded MetricFamily prefixed with a varint size header.
+
+    This takes the same arguments as ``encode_metric_family``. The result is
+    identical to the output of ``api.encode`` for the MetricFamily object
+    returned by ``utils.create_metric_family`` with the same arguments, so
+    frames can be concatenated to build a payload for the Prometheus server.
+
+    :returns: an encoded MetricFamily frame
+    """
+    encoded_metric = encode_metric_family(
+        metric_name,
+        metric_help,
+        metric_type,
+        metrics,
+        timestamp=timestamp,
+        const_labels=const_labels,
+        ordered=ordered,
+    )
+    return encode_varint(len(encoded_metric)) + encoded_metric
+
+
+def _encode_metrics(
+    metric_type: utils.MetricType,
+    metrics: Sequence[utils.MetricTupleType],
+    timestamp: bool,
+    const_labels: utils.LabelsType,
+    ordered: bool,
+) -> Sequence[bytes]:
+    """ Return a list of encoded Metric objects for a sequence of 2-tuples
+    containing labels and values.
+    """
+    timestamp_field = _timestamp_field(timestamp)
+    encoded_labels = utils.label_set_cache.encoded_labels
+    encoded_metrics = []
+
+    if metric_type == COUNTER or metric_type == GAUGE:
+        field = _METRIC_COUNTER if metric_type == COUNTER else _METRIC_GAUGE
+        for metric_labels, metric_value in metrics:
+            label_block = encoded_labels(metric_labels, const_labels, ordered)
+            encoded_metrics.append(
+                _encode_value_metric(field, label_block, metric_value, timestamp_field)
+            )
+
+    elif metric_type == SUMMARY or metric_type == HISTOGRAM:
+        encoder = (
+            _encode_summary_metric
+            if metric_type == SUMMARY
+            else _encode_histogram_metric
+        )
+        for metric_labels, metric_values in metrics:
+            # The count and sum values are expected to be present in the
+            # values dict.
+            label_block = encoded_labels(metric_labels, const_labels, ordered)
+            encoded_metrics.append(
+                encoder(
+                    label_block,
+                    metric_values,
+                    metric_values["count"],
+                    metric_values["sum"],
+                    timestamp_field,
+                )
+            )
+
+    else:
+        raise Exception("Invalid metric_type: {}".format(metric_type))
+
+    return encoded_metrics
+
+
+def _encode_value_metric(
+    field: bytes, label_block: bytes, value: float, timestamp_field: bytes
+) -> bytes:
+    """ Return an encoded Metric holding a Counter or Gauge value. """
+    return b"".join(
+        (label_block, field, b"\x09", _VALUE, _pack_double(value), timestamp_field)
+    )
+
+
+def _encode_summary_metric(
+    label_block: bytes,
+    values: utils.SummaryDictType,
+    samples_count: int,
+    samples_sum: float,
+    timestamp_field: bytes,
+) -> bytes:
+    """ Return an encoded Metric holding a Summary. """
+    parts = [
+        _SAMPLE_COUNT,
+        encode_varint(samples_count),
+        _SAMPLE_SUM,
+        _pack_double(samples_sum),
+    ]
+    # The count and sum values may also be present in the values.
+    # Only process non-string keys into quantile messages.
+    for k, v in values.items():
+        if not isinstance(k, str):
+            parts.append(_QUANTILE_PREFIX)
+            parts.append(_pack_double(k))
+            parts.append(_QUANTILE_VALUE)
+            parts.append(_pack_double(v))
+    summary = b"".join(parts)
+    return b"".join(
+        (
+            label_block,
+            _METRIC_SUMMARY,
+            encode_varint(len(summary)),
+            summary,
+            timestamp_field,
+        )
+    )
+
+
+def _encode_histogram_metric(
+    label_block: bytes,
+    values: utils.HistogramDictType,
+    samples_count: int,
+    samples_sum: float,
+    timestamp_field: bytes,
+    exemplars: Dict[float, Exemplar] = None,
+) -> bytes:
+    """ Return an encoded Metric holding a Histogram. """
+    parts = [
+        _SAMPLE_COUNT,
+        encode_varint(samples_count),
+        _SAMPLE_SUM,
+        _pack_double(samples_sum),
+    ]
+    # The count and sum values may also be present in the values.
+    # Only process non-string keys into bucket messages.
+    for k, v in values.items():
+        if not isinstance(k, str):
+            cumulative_count = encode_varint(v)
+            exemplar = exemplars.get(k) if exemplars else None
+            exemplar_field = (
+                b"" if exemplar is None else _exemplar_field(_BUCKET_EXEMPLAR, exemplar)
+            )
+            parts.append(_BUCKET)
+            # A Bucket holds a tagged varint, a tagged double and an optional
+            # exemplar.
+            parts.append(
+                encode_varint(len(cumulative_count) + 10 + len(exemplar_field))
+            )
+            parts.append(_BUCKET_CUMULATIVE_COUNT)
+            parts.append(cumulative_count)
+            parts.append(_BUCKET_UPPER_BOUND)
+            parts.append(_pack_double(k))
+            parts.append(exemplar_field)
+    histogram = b"".join(parts)
+    # The timestamp_ms field number is lower than the histogram field number
+    # so it is encoded first.
+    return b"".join(
+        (
+            label_block,
+            timestamp_field,
+            _METRIC_HISTOGRAM,
+            encode_varint(len(histogram)),
+            histogram,
+        )
+    )
+
+
+def _exemplar_field(tag: bytes, exemplar: Exemplar) -> bytes:
+    """ Return the encoded exemplar field of a Counter or Bucket """
+    encoded = exemplar.SerializeToString()
+    return tag + encode_varint(len(encoded)) + encoded
+
+
+def _timestamp_field(timestamp: bool) -> bytes:
+    """ Return the encoded timestamp_ms field of a Metric, or an empty bytes
+    object if no timestamp is requested.
+    """
+    if not timestamp:
+        return b""
+    # timestamp_ms is an int64 so negative values are encoded as their
+    # two's complement uint64 representation.
+    return _METRIC_TIMESTAMP_MS + encode_varint(utils._timestamp_ms() & _UINT64_MASK)
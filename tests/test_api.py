@@ -1,4 +1,8 @@
+import io
+import re
+import socket
 import unittest
+import unittest.mock
 
 import prometheus_metrics_proto as pmp
 
@@ -498,3 +502,211 @@ class ApiTestCase(unittest.TestCase):
         # Check Histogram can be round-tripped through encode and decode
         _mf = pmp.decode(payload)[0]
         self.assertEqual(mf, _mf)
+
+    def test_decode_buffer_types(self):
+        """ check decode accepts bytes-like objects and rejects truncated data """
+        cm = pmp.create_counter(
+            self.counter_metric_name, self.counter_metric_help, self.counter_metric_data
+        )
+        gm = pmp.create_gauge(
+            self.gauge_metric_name, self.gauge_metric_help, self.gauge_metric_data
+        )
+        payload = pmp.encode(cm, gm)
+
+        for data in (payload, bytearray(payload), memoryview(payload)):
+            metrics = pmp.decode(data)
+            self.assertEqual(len(metrics), 2)
+            self.assertEqual(metrics[0], cm)
+            self.assertEqual(metrics[1], gm)
+
+        # check a frame that extends beyond the end of the data is rejected
+        with self.assertRaises(Exception) as ctx:
+            pmp.decode(payload[:-1])
+        self.assertIn("Truncated MetricFamily", str(ctx.exception))
+
+    def test_iter_decode(self):
+        """ check streaming decode from chunks, files and sockets """
+        cm = pmp.create_counter(
+            self.counter_metric_name, self.counter_metric_help, self.counter_metric_data
+        )
+        hm = pmp.create_histogram(
+            self.histogram_metric_name,
+            self.histogram_metric_help,
+            self.histogram_metric_data,
+        )
+        input_metrics = (cm, hm, cm)
+        payload = pmp.encode(*input_metrics)
+
+        # check a bytes object
+        metrics = list(pmp.iter_decode(payload))
+        self.assertEqual(metrics, list(input_metrics))
+
+        # check frames are reassembled when split at every possible boundary
+        for size in (1, 2, 3, 7, 64):
+            chunks = [payload[i : i + size] for i in range(0, len(payload), size)]
+            metrics = list(pmp.iter_decode(iter(chunks)))
+            self.assertEqual(metrics, list(input_metrics))
+
+        # check a binary file object
+        metrics = list(pmp.iter_decode(io.BytesIO(payload), chunk_size=5))
+        self.assertEqual(metrics, list(input_metrics))
+
+        # check a socket
+        rsock, wsock = socket.socketpair()
+        try:
+            wsock.sendall(payload)
+            wsock.close()
+            metrics = list(pmp.iter_decode(rsock, chunk_size=11))
+            self.assertEqual(metrics, list(input_metrics))
+        finally:
+            rsock.close()
+
+        # check decoding an empty stream yields nothing
+        self.assertEqual(list(pmp.iter_decode([])), [])
+
+        # check a stream ending part way through a frame is rejected
+        with self.assertRaises(Exception) as ctx:
+            list(pmp.iter_decode([payload[:-1]]))
+        self.assertIn("Truncated MetricFamily", str(ctx.exception))
+
+    def test_decode_filters(self):
+        """ check families and metrics can be filtered while decoding """
+        families = [
+            pmp.create_counter(
+                "http_requests_total",
+                "Requests.",
+                [({"code": "200"}, 3), ({"code": "500"}, 1)],
+            ),
+            pmp.create_gauge("http_in_flight", "In flight.", [({"code": "200"}, 1)]),
+            pmp.create_gauge("process_fds", "Open fds.", [({}, 10)]),
+        ]
+        payload = pmp.encode(*families)
+
+        def names(include=None, exclude=None):
+            decoded = pmp.decode(payload, include=include, exclude=exclude)
+            streamed = pmp.iter_decode(
+                [payload[:5], payload[5:]], include=include, exclude=exclude
+            )
+            self.assertEqual(decoded, list(streamed))
+            return [mf.name for mf in decoded]
+
+        http = ["http_requests_total", "http_in_flight"]
+        self.assertEqual(names(include="http_*"), http)
+        self.assertEqual(names(include=re.compile("http_.*")), http)
+        self.assertEqual(
+            names(include=["process_*", "*_total"]),
+            ["http_requests_total", "process_fds"],
+        )
+        # check regular expressions must match the whole name
+        self.assertEqual(names(include=re.compile("http")), [])
+        self.assertEqual(names(exclude="http_*"), ["process_fds"])
+        self.assertEqual(names(include="http_*", exclude="*_total"), http[1:])
+
+        # check label matchers filter metrics and drop empty families
+        decoded = pmp.decode(payload, match_labels={"code": "500"})
+        self.assertEqual([mf.name for mf in decoded], ["http_requests_total"])
+        self.assertEqual(list(decoded[0].metric), [families[0].metric[1]])
+
+        decoded = list(
+            pmp.iter_decode(payload, match_labels={"code": re.compile("2..")})
+        )
+        self.assertEqual([mf.name for mf in decoded], http)
+        self.assertEqual(list(decoded[0].metric), [families[0].metric[0]])
+
+        # check a missing label matches an empty value
+        decoded = pmp.decode(payload, match_labels={"code": ""})
+        self.assertEqual(decoded, [families[2]])
+
+    def test_streaming_encode(self):
+        """ check iter_encode and encode_to produce the same payload as encode """
+        cm = pmp.create_counter(
+            self.counter_metric_name, self.counter_metric_help, self.counter_metric_data
+        )
+        sm = pmp.create_summary(
+            self.summary_metric_name, self.summary_metric_help, self.summary_metric_data
+        )
+        input_metrics = (cm, sm)
+        payload = pmp.encode(*input_metrics)
+
+        # check frames are produced lazily from a generator
+        frames = pmp.iter_encode(m for m in input_metrics)
+        first = next(frames)
+        self.assertEqual(pmp.decode(first), [cm])
+        self.assertEqual(first + b"".join(frames), payload)
+
+        # check writing to a binary file object
+        stream = io.BytesIO()
+        written = pmp.encode_to(stream, *input_metrics)
+        self.assertEqual(written, len(payload))
+        self.assertEqual(stream.getvalue(), payload)
+
+        # check each frame is written in a single call
+        writable = unittest.mock.Mock(spec=["write"])
+        pmp.encode_to(writable, *input_metrics)
+        self.assertEqual(writable.write.call_count, len(input_metrics))
+        self.assertEqual(
+            b"".join([c.args[0] for c in writable.write.call_args_list]), payload
+        )
+
+        # check writing to a buffered writer
+        raw = io.BytesIO()
+        writer = io.BufferedWriter(raw)
+        pmp.encode_to(writer, *input_metrics)
+        writer.flush()
+        self.assertEqual(raw.getvalue(), payload)
+
+        # check writing to a socket
+        rsock, wsock = socket.socketpair()
+        try:
+            pmp.encode_to(wsock, *input_metrics)
+            wsock.close()
+            self.assertEqual(list(pmp.iter_decode(rsock)), list(input_metrics))
+        finally:
+            rsock.close()
+
+        # check passing invalid type raises an exception
+        with self.assertRaises(Exception) as ctx:
+            list(pmp.iter_encode([cm, "a"]))
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily, got ", str(ctx.exception)
+        )
+
+    def test_encode_into(self):
+        """ check encoding into a caller provided buffer """
+        cm = pmp.create_counter(
+            self.counter_metric_name, self.counter_metric_help, self.counter_metric_data
+        )
+        hm = pmp.create_histogram(
+            self.histogram_metric_name,
+            self.histogram_metric_help,
+            self.histogram_metric_data,
+        )
+        payload = pmp.encode(cm, hm)
+
+        # check an empty bytearray is grown to fit exactly
+        buffer = bytearray()
+        size = pmp.encode_into(buffer, cm, hm)
+        self.assertEqual(size, len(payload))
+        self.assertEqual(len(buffer), len(payload))
+        self.assertEqual(bytes(buffer), payload)
+
+        # check a large enough buffer is reused without being resized
+        size = pmp.encode_into(buffer, cm)
+        self.assertEqual(len(buffer), len(payload))
+        self.assertEqual(bytes(buffer[:size]), pmp.encode(cm))
+        self.assertEqual(pmp.decode(memoryview(buffer)[:size]), [cm])
+
+        # check a memoryview can be written to but not grown
+        target = bytearray(len(payload))
+        size = pmp.encode_into(memoryview(target), cm, hm)
+        self.assertEqual(bytes(target), payload)
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_into(memoryview(target)[:10], cm)
+        self.assertIn("Buffer too small", str(ctx.exception))
+
+        # check passing invalid type raises an exception
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_into(bytearray(), "a")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily, got ", str(ctx.exception)
+        )
@@ -0,0 +1,83 @@
+import unittest
+
+import prometheus_metrics_proto as pmp
+
+
+class EncodeCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.families = [
+            pmp.create_gauge(
+                "gauge_{}".format(i),
+                "A gauge.",
+                [({"shard": str(s)}, s * i) for s in range(3)],
+            )
+            for i in range(20)
+        ]
+
+    def test_encode(self):
+        """ check cached encode matches encode and reuses frames """
+        cache = pmp.EncodeCache()
+        payload = cache.encode(*self.families)
+        self.assertEqual(payload, pmp.encode(*self.families))
+        self.assertEqual(cache.stats()["misses"], 20)
+        self.assertEqual(len(cache), 20)
+        self.assertIn("gauge_0", cache)
+
+        # check unchanged families are not encoded again
+        self.assertEqual(cache.encode(*self.families), payload)
+        self.assertEqual(cache.stats()["misses"], 20)
+        self.assertEqual(cache.stats()["hits"], 20)
+
+    def test_mark_dirty(self):
+        """ check only families marked dirty are encoded again """
+        cache = pmp.EncodeCache()
+        cache.encode(*self.families)
+
+        # modify a family in place
+        self.families[3].metric[0].gauge.value = 1000
+        self.assertNotEqual(cache.encode(*self.families), pmp.encode(*self.families))
+
+        cache.mark_dirty("gauge_3")
+        self.assertEqual(cache.stats()["dirty"], 1)
+        self.assertEqual(cache.encode(*self.families), pmp.encode(*self.families))
+        self.assertEqual(cache.stats()["misses"], 21)
+        self.assertEqual(cache.stats()["dirty"], 0)
+
+        # check a new family object replaces the cached frame
+        self.families[5] = pmp.create_gauge("gauge_5", "Replaced.", [])
+        self.assertEqual(cache.encode(*self.families), pmp.encode(*self.families))
+        self.assertEqual(cache.stats()["misses"], 22)
+
+        cache.discard("gauge_5")
+        self.assertNotIn("gauge_5", cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_versions(self):
+        """ check content versions control reuse of cached frames """
+        cache = pmp.EncodeCache()
+        versions = {mf.name: 1 for mf in self.families}
+        cache.encode(*self.families, versions=versions)
+
+        # check new objects with an unchanged version reuse cached frames
+        rebuilt = [
+            pmp.MetricFamily.FromString(mf.SerializeToString())
+            for mf in self.families
+        ]
+        rebuilt[0].help = "Changed."
+        cache.encode(*rebuilt, versions=versions)
+        self.assertEqual(cache.stats()["misses"], 20)
+
+        # check a changed version is encoded again
+        versions["gauge_0"] = 2
+        payload = cache.encode(*rebuilt, versions=versions)
+        self.assertEqual(cache.stats()["misses"], 21)
+        self.assertEqual(payload, pmp.encode(*rebuilt))
+
+        # check invalid types are rejected
+        with self.assertRaises(Exception) as ctx:
+            cache.encode("a")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily, got ", str(ctx.exception)
+        )
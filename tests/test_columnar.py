@@ -0,0 +1,289 @@
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import columnar
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+POS_INF = float("inf")
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.labels = ({"route": "/"}, {"route": "/data"}, {"route": "/"})
+        self.const_labels = {"app": "my_app"}
+
+    def test_decode_values(self):
+        """ check counters, gauges and untyped metrics are decoded into columns """
+        cm = pmp.create_counter(
+            "c", "A counter.", [(l, i) for i, l in enumerate(self.labels)]
+        )
+        gm = pmp.create_gauge(
+            "g",
+            "A gauge.",
+            [(l, -i * 1.5) for i, l in enumerate(self.labels[:2])],
+            const_labels=self.const_labels,
+            timestamp=True,
+        )
+        gm.metric[1].timestamp_ms = -5
+        um = pmp.MetricFamily(name="u", help="Untyped.", type=3)
+        um.metric.add().untyped.value = 2.5
+        families = columnar.decode_columnar(pmp.encode(cm, gm, um))
+        self.assertEqual([f.name for f in families], ["c", "g", "u"])
+
+        c, g, u = families
+        self.assertEqual(c.type, pmp.COUNTER)
+        self.assertEqual(c.help, "A counter.")
+        self.assertEqual(len(c), 3)
+        self.assertEqual(c.values.dtype, np.float64)
+        self.assertEqual(c.values.tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(c.timestamps.tolist(), [0, 0, 0])
+        self.assertIsNone(c.counts)
+        self.assertIsNone(c.buckets)
+
+        # check label sets are interned across metrics and families
+        self.assertEqual(c.label_ids[0], c.label_ids[2])
+        self.assertEqual(c.labels(1), {"route": "/data"})
+        self.assertIs(c.label_sets, g.label_sets)
+        self.assertEqual(g.labels(0), {"app": "my_app", "route": "/"})
+        self.assertNotIn(g.label_ids[0], c.label_ids)
+
+        self.assertEqual(g.values.tolist(), [-0.0, -1.5])
+        self.assertEqual(g.timestamps.dtype, np.int64)
+        self.assertEqual(g.timestamps[1], -5)
+        self.assertEqual(g.timestamps[0], gm.metric[0].timestamp_ms)
+        self.assertEqual(u.values.tolist(), [2.5])
+        self.assertEqual(u.labels(0), {})
+
+    def test_decode_aggregates(self):
+        """ check summaries and histograms are decoded into matrices """
+        summary_values = [
+            {0.5: 4.0, 0.9: 5.2, "count": 4, "sum": 25.2},
+            {0.5: 1.0, 0.9: 2.0, "count": 2, "sum": 3.0},
+        ]
+        histogram_values = [
+            {5.0: 3, 10.0: 5, POS_INF: 6, "count": 6, "sum": 46.0},
+            {5.0: 0, 10.0: 2 ** 40, POS_INF: 2 ** 64 - 1, "count": 7, "sum": 1.5},
+        ]
+        sm = pmp.create_summary(
+            "s", "A summary.", list(zip(self.labels, summary_values))
+        )
+        hm = pmp.create_histogram(
+            "h", "A histogram.", list(zip(self.labels, histogram_values))
+        )
+        s, h = columnar.decode_columnar(pmp.encode(sm, hm))
+
+        self.assertEqual(s.quantiles.tolist(), [0.5, 0.9])
+        self.assertEqual(s.quantile_values.shape, (2, 2))
+        self.assertEqual(s.quantile_values.tolist(), [[4.0, 5.2], [1.0, 2.0]])
+        self.assertEqual(s.counts.tolist(), [4, 2])
+        self.assertEqual(s.values.tolist(), [25.2, 3.0])
+        self.assertIsNone(s.upper_bounds)
+
+        self.assertEqual(h.upper_bounds.tolist(), [5.0, 10.0, POS_INF])
+        self.assertEqual(h.buckets.dtype, np.uint64)
+        self.assertEqual(h.buckets.tolist(), [[3, 5, 6], [0, 2 ** 40, 2 ** 64 - 1]])
+        self.assertEqual(h.counts.tolist(), [6, 7])
+        self.assertEqual(h.values.tolist(), [46.0, 1.5])
+
+        # check families without metrics produce empty columns
+        empty = pmp.create_histogram("e", "Empty.", [])
+        (e,) = columnar.decode_columnar(pmp.encode(empty))
+        self.assertEqual(len(e), 0)
+        self.assertEqual(e.buckets.shape, (0, 0))
+
+        # check metrics must share buckets
+        hm.metric[1].histogram.bucket[0].upper_bound = 4.0
+        with self.assertRaises(Exception) as ctx:
+            columnar.decode_columnar(pmp.encode(hm))
+        self.assertIn("do not share the same buckets", str(ctx.exception))
+
+    def test_decode_filters(self):
+        """ check families can be filtered by name """
+        payload = pmp.encode(
+            pmp.create_counter("a_total", "A.", [({}, 1)]),
+            pmp.create_gauge("b", "B.", [({}, 2)]),
+        )
+        families = columnar.decode_columnar(payload, include="*_total")
+        self.assertEqual([f.name for f in families], ["a_total"])
+        families = columnar.decode_columnar(payload, exclude="*_total")
+        self.assertEqual([f.name for f in families], ["b"])
+
+        with self.assertRaises(Exception) as ctx:
+            columnar.decode_columnar(payload[:-1])
+        self.assertIn("Truncated MetricFamily", str(ctx.exception))
+
+    def test_create_values(self):
+        """ check value families built from columns match create_metric_family """
+        names = ("shard", "host")
+        rows = [(0, "a"), (1, "b"), (2, "a")]
+        values = np.array([1.0, 2.5, -3.0])
+        const_labels = {"app": "my_app", "host": "ignored"}
+        for metric_type in (pmp.COUNTER, pmp.GAUGE):
+            for ordered in (True, False):
+                expected = pmp.utils.create_metric_family(
+                    "m",
+                    "Help.",
+                    metric_type,
+                    [
+                        (dict(zip(names, row)), value)
+                        for row, value in zip(rows, values.tolist())
+                    ],
+                    const_labels=const_labels,
+                    ordered=ordered,
+                )
+                mf = columnar.create_family_from_columns(
+                    "m",
+                    "Help.",
+                    metric_type,
+                    names,
+                    rows,
+                    values,
+                    const_labels=const_labels,
+                    ordered=ordered,
+                )
+                self.assertEqual(mf, expected)
+                frame = columnar.create_family_from_columns(
+                    "m",
+                    "Help.",
+                    metric_type,
+                    names,
+                    np.array(rows, dtype=object),
+                    values,
+                    const_labels=const_labels,
+                    ordered=ordered,
+                    encoded=True,
+                )
+                self.assertEqual(frame, pmp.encode(expected))
+
+        # check explicit and current timestamps
+        mf = columnar.create_family_from_columns(
+            "m", "Help.", pmp.GAUGE, names, rows, values, timestamps=[5, -1, 0]
+        )
+        self.assertEqual([m.timestamp_ms for m in mf.metric], [5, -1, 0])
+        with unittest.mock.patch.object(
+            pmp.utils, "_timestamp_ms", return_value=1528000000000
+        ):
+            mf = columnar.create_family_from_columns(
+                "m", "Help.", pmp.GAUGE, names, rows, values, timestamps=True
+            )
+        self.assertEqual([m.timestamp_ms for m in mf.metric], [1528000000000] * 3)
+
+        with self.assertRaises(Exception) as ctx:
+            columnar.create_family_from_columns(
+                "m", "Help.", pmp.GAUGE, names, rows, values[:2]
+            )
+        self.assertIn("Expected 3 rows of values", str(ctx.exception))
+
+        with self.assertRaises(Exception) as ctx:
+            columnar.create_family_from_columns(
+                "m", "Help.", pmp.GAUGE, names, [(0,), (1,), (2,)], values
+            )
+        self.assertIn("Expected 2 label values, got 1", str(ctx.exception))
+
+    def test_create_aggregates(self):
+        """ check summary and histogram families built from columns """
+        rows = [("/",), ("/data",)]
+        counts = np.array([6, 2 ** 40])
+        sums = np.array([46.0, 1.5])
+
+        quantiles = [0.5, 0.9]
+        quantile_values = np.array([[4.0, 5.2], [1.0, 2.0]])
+        expected = pmp.create_summary(
+            "s",
+            "A summary.",
+            [
+                ({"route": row[0]}, {0.5: q[0], 0.9: q[1], "count": c, "sum": s})
+                for row, q, c, s in zip(
+                    rows, quantile_values.tolist(), counts.tolist(), sums.tolist()
+                )
+            ],
+        )
+        frame = columnar.create_family_from_columns(
+            "s",
+            "A summary.",
+            pmp.SUMMARY,
+            ["route"],
+            rows,
+            quantile_values,
+            quantiles=quantiles,
+            counts=counts,
+            sums=sums,
+            encoded=True,
+        )
+        self.assertEqual(frame, pmp.encode(expected))
+
+        upper_bounds = [5.0, 10.0, POS_INF]
+        buckets = np.array([[3, 5, 6], [0, 2 ** 40, 2 ** 40]])
+        expected = pmp.create_histogram(
+            "h",
+            "A histogram.",
+            [
+                (
+                    {"route": row[0]},
+                    dict(zip(upper_bounds, b), count=c, sum=s),
+                )
+                for row, b, c, s in zip(
+                    rows, buckets.tolist(), counts.tolist(), sums.tolist()
+                )
+            ],
+        )
+        mf = columnar.create_family_from_columns(
+            "h",
+            "A histogram.",
+            pmp.HISTOGRAM,
+            ["route"],
+            rows,
+            buckets,
+            upper_bounds=upper_bounds,
+            counts=counts,
+            sums=sums,
+            timestamps=[1, 2],
+        )
+        for metric, timestamp_ms in zip(expected.metric, (1, 2)):
+            metric.timestamp_ms = timestamp_ms
+        self.assertEqual(mf, expected)
+        self.assertEqual(pmp.encode(mf), pmp.encode(expected))
+
+        with self.assertRaises(Exception) as ctx:
+            columnar.create_family_from_columns(
+                "h", "A histogram.", pmp.HISTOGRAM, ["route"], rows, buckets
+            )
+        self.assertIn("upper_bounds are required", str(ctx.exception))
+
+        # check negative counts are rejected rather than wrapped
+        for bad_buckets, bad_counts in (
+            (np.array([[3, 5, 6], [0, -2, 2]]), counts),
+            (buckets, [6, -1]),
+        ):
+            with self.assertRaises(ValueError) as ctx:
+                columnar.create_family_from_columns(
+                    "h",
+                    "A histogram.",
+                    pmp.HISTOGRAM,
+                    ["route"],
+                    rows,
+                    bad_buckets,
+                    upper_bounds=upper_bounds,
+                    counts=bad_counts,
+                    sums=sums,
+                )
+            self.assertIn("Value out of range: -", str(ctx.exception))
+        with self.assertRaises(ValueError):
+            columnar.create_family_from_columns(
+                "s",
+                "A summary.",
+                pmp.SUMMARY,
+                ["route"],
+                rows,
+                quantile_values,
+                quantiles=quantiles,
+                counts=[-6, 2],
+                sums=sums,
+            )
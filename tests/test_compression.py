@@ -0,0 +1,141 @@
+import gzip
+import os
+import unittest
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import compression
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.families = [
+            pmp.create_counter(
+                "requests_total",
+                "Requests.",
+                [({"shard": str(i), "host": "examplehost"}, i) for i in range(100)],
+            ),
+            pmp.create_gauge("queue_depth", "Queue depth.", [({}, 2)]),
+        ]
+        self.payload = pmp.encode(*self.families)
+
+    def test_compression_level(self):
+        """ check the compression level depends on the payload size """
+        for size, expected in ((None, 4), (0, 6), (65536, 6), (65537, 4), (10 ** 7, 1)):
+            self.assertEqual(compression.compression_level("gzip", size), expected)
+        self.assertEqual(compression.compression_level("zstd", 10 ** 7), 1)
+
+        with self.assertRaises(Exception) as ctx:
+            compression.compression_level("br", 1)
+        self.assertIn("Invalid encoding", str(ctx.exception))
+
+    def test_encode_compressed(self):
+        """ check families are encoded and compressed """
+        data = pmp.encode_compressed(*self.families)
+        self.assertEqual(gzip.decompress(data), self.payload)
+        self.assertLess(len(data), len(self.payload))
+
+        data = pmp.encode_compressed(*self.families, level=9)
+        self.assertEqual(gzip.decompress(data), self.payload)
+
+        data = pmp.encode_compressed(*self.families, encoding="identity")
+        self.assertEqual(data, self.payload)
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_compressed(*self.families, encoding="br")
+        self.assertIn("Invalid encoding", str(ctx.exception))
+
+    @unittest.skipIf("zstd" not in compression.ENCODINGS, "zstd is not available")
+    def test_encode_compressed_zstd(self):
+        """ check families are compressed with zstd """
+        data = pmp.encode_compressed(*self.families, encoding="zstd")
+        if compression._zstd is not None:
+            decompressed = compression._zstd.decompress(data)
+        else:
+            decompressed = compression.zstandard.ZstdDecompressor().decompress(
+                data, max_output_size=len(self.payload)
+            )
+        self.assertEqual(decompressed, self.payload)
+
+    def test_iter_compress(self):
+        """ check chunks are compressed as they are consumed """
+        data = os.urandom(256 * 1024)
+        consumed = []
+
+        def iter_chunks():
+            for i in range(0, len(data), 4096):
+                consumed.append(i)
+                yield data[i : i + 4096]
+
+        chunks = compression.iter_compress(iter_chunks(), "gzip", 1)
+        first = next(chunks)
+        self.assertTrue(first)
+        self.assertLess(len(consumed), len(data) // 4096)
+        self.assertEqual(gzip.decompress(first + b"".join(chunks)), data)
+
+        chunks = list(pmp.iter_encode_compressed(iter(self.families)))
+        self.assertEqual(gzip.decompress(b"".join(chunks)), self.payload)
+
+    def test_select_encoding(self):
+        """ check the best content coding is chosen """
+        zstd = "zstd" if "zstd" in compression.ENCODINGS else "gzip"
+        for accept_encoding, expected in (
+            (None, "identity"),
+            ("", "identity"),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "gzip"),
+            ("gzip;q=0.5, zstd", zstd),
+            ("gzip, zstd", zstd),
+            ("GZIP;q=1, zstd;q=0.5", "gzip"),
+            ("br", "identity"),
+            ("gzip;q=0", "identity"),
+            ("gzip;q=x", "identity"),
+            ("*", zstd),
+            ("*, zstd;q=0", "gzip"),
+        ):
+            self.assertEqual(
+                compression.select_encoding(accept_encoding), expected, accept_encoding
+            )
+
+    def test_compressed_cache(self):
+        """ check compressed and uncompressed bodies are cached per version """
+        cache = pmp.CompressedCache()
+
+        # check the uncompressed body is cached alongside the compressed one
+        data = cache.body(self.families, 1)
+        self.assertEqual(gzip.decompress(data), self.payload)
+        self.assertEqual(cache.stats(), dict(hits=0, misses=1, size=2))
+        self.assertEqual(cache.body(self.families, 1), data)
+        self.assertEqual(cache.body(self.families, 1, "identity"), self.payload)
+        self.assertEqual(cache.stats(), dict(hits=2, misses=1, size=2))
+
+        # check a new version discards the cached bodies
+        families = self.families[1:]
+        chunks = cache.iter_body(families, 2, "identity")
+        self.assertEqual(b"".join(chunks), pmp.encode(*families))
+        self.assertEqual(cache.stats(), dict(hits=2, misses=2, size=1))
+
+        # check a cached uncompressed body is compressed without encoding
+        data = cache.body(iter(()), 2)
+        self.assertEqual(gzip.decompress(data), pmp.encode(*families))
+        self.assertEqual(cache.stats(), dict(hits=2, misses=3, size=2))
+
+        # check a body is not cached when the iterator is not exhausted
+        chunks = cache.iter_body(self.families, 3)
+        next(chunks)
+        chunks.close()
+        self.assertEqual(cache.stats()["size"], 0)
+
+        # check other encoders are supported
+        cache = pmp.CompressedCache(pmp.iter_encode_text)
+        data = cache.body(self.families, 1)
+        self.assertEqual(gzip.decompress(data), pmp.encode_text(*self.families))
+
+        cache.clear()
+        self.assertEqual(cache.stats(), dict(hits=0, misses=0, size=0))
+        with self.assertRaises(Exception) as ctx:
+            cache.body(self.families, 1, "br")
+        self.assertIn("Invalid encoding", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import random
+import unittest
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import histograms
+
+
+POS_INF = float("inf")
+
+
+class ExemplarsTestCase(unittest.TestCase):
+    def test_reservoir(self):
+        """ check a reservoir retains observations and creates exemplars """
+        reservoir = pmp.ExemplarReservoir(
+            size=2, clock=lambda: 1528000000.5, rng=random.Random(0)
+        )
+        self.assertEqual(reservoir.seen, 0)
+        self.assertIsNone(reservoir.exemplar())
+        self.assertEqual(reservoir.exemplars(), [])
+
+        # the first observations fill the reservoir
+        self.assertTrue(reservoir.offer(0.5, {"trace_id": "a"}))
+        self.assertEqual(reservoir.exemplar().value, 0.5)
+        self.assertTrue(reservoir.offer(1.5, {"trace_id": "b"}))
+        self.assertEqual(reservoir.seen, 2)
+        first, second = reservoir.exemplars()
+        self.assertEqual(first.label[0].value, "a")
+        self.assertEqual(second.label[0].value, "b")
+        self.assertEqual(second.value, 1.5)
+        self.assertEqual(second.timestamp.seconds, 1528000000)
+        self.assertEqual(second.timestamp.nanos, 500000000)
+
+        # the exemplar is the most recently retained observation
+        for i in range(1000):
+            if reservoir.offer(float(i), {"trace_id": str(i)}):
+                retained = i
+        self.assertEqual(reservoir.seen, 1002)
+        self.assertEqual(reservoir.exemplar().value, retained)
+        self.assertEqual(len(reservoir.exemplars()), 2)
+
+        # check the exemplar can be attached to a counter
+        metric = pmp.utils.create_counter_metric(
+            {}, 1002, exemplar=reservoir.exemplar()
+        )
+        self.assertEqual(metric.counter.exemplar.value, retained)
+
+        reservoir.reset()
+        self.assertEqual(reservoir.seen, 0)
+        self.assertIsNone(reservoir.exemplar())
+        self.assertTrue(reservoir.offer(2.5, {}))
+        self.assertEqual([e.value for e in reservoir.exemplars()], [2.5])
+
+        with self.assertRaises(Exception) as cm:
+            pmp.ExemplarReservoir(size=0)
+        self.assertIn("Invalid size", str(cm.exception))
+
+    def test_reservoir_is_uniform(self):
+        """ check each observation is equally likely to be retained """
+        rng = random.Random(1)
+        counts = [0] * 20
+        trials = 3000
+        for _ in range(trials):
+            reservoir = pmp.ExemplarReservoir(size=3, rng=rng)
+            for i in range(20):
+                reservoir.offer(i, {})
+            for exemplar in reservoir.exemplars():
+                counts[int(exemplar.value)] += 1
+        expected = trials * 3 / 20
+        for count in counts:
+            self.assertLess(abs(count - expected), expected * 0.2)
+
+    def test_reservoir_skips_observations(self):
+        """ check the number of replacements grows logarithmically """
+        reservoir = pmp.ExemplarReservoir(size=1, rng=random.Random(2))
+        retained = sum(reservoir.offer(i, {}) for i in range(100000))
+        self.assertEqual(reservoir.seen, 100000)
+        # the expected number of replacements is about ln(100000) ~= 11.5
+        self.assertLess(retained, 50)
+
+    def test_reservoir_checks_labels(self):
+        """ check exemplar labels exceeding the OpenMetrics limit are rejected """
+        reservoir = pmp.ExemplarReservoir()
+        with self.assertRaises(Exception) as cm:
+            reservoir.offer(1.0, {"trace_id": "x" * 121})
+        self.assertIn("Invalid exemplar labels", str(cm.exception))
+        self.assertIsNone(reservoir.exemplar())
+
+    def test_histogram_sampler(self):
+        """ check exemplars are sampled for each histogram bucket """
+        bounds = [0.1, 0.5, 1.0]
+        sampler = pmp.HistogramExemplarSampler(bounds, rng=random.Random(3))
+        accumulator = histograms.HistogramAccumulator(bounds)
+        self.assertEqual(sampler.upper_bounds, [0.1, 0.5, 1.0, POS_INF])
+        self.assertEqual(sampler.exemplars(), {})
+
+        observations = [0.05, 0.1, 0.7, 3.0, 7.0] + [0.3] * 100
+        for i, value in enumerate(observations):
+            accumulator.observe(value)
+            sampler.observe(value, {"trace_id": str(i)})
+
+        exemplars = sampler.exemplars()
+        self.assertEqual(list(exemplars), [0.1, 0.5, 1.0, POS_INF])
+        self.assertIn(exemplars[0.1].value, (0.05, 0.1))
+        self.assertEqual(exemplars[0.5].value, 0.3)
+        self.assertEqual(exemplars[1.0].label[0].value, "2")
+        self.assertIn(exemplars[POS_INF].label[0].value, ("3", "4"))
+
+        values = accumulator.values()
+        metric = pmp.utils.create_histogram_metric(
+            {}, values, values["count"], values["sum"], exemplars=exemplars
+        )
+        for bucket in metric.histogram.bucket:
+            self.assertEqual(bucket.exemplar, exemplars[bucket.upper_bound])
+
+        sampler.reset()
+        self.assertEqual(sampler.exemplars(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
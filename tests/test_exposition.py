@@ -0,0 +1,133 @@
+import unittest
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import exposition
+
+
+PROMETHEUS_ACCEPT = (
+    "application/openmetrics-text;version=1.0.0,"
+    "application/openmetrics-text;version=0.0.1;q=0.75,"
+    "text/plain;version=0.0.4;q=0.5,*/*;q=0.1"
+)
+PROTOBUF_ACCEPT = (
+    "application/vnd.google.protobuf;proto=io.prometheus.client.MetricFamily;"
+    "encoding=delimited;q=0.6,"
+    "application/openmetrics-text;version=1.0.0;q=0.5,"
+    "text/plain;version=0.0.4;q=0.3,*/*;q=0.1"
+)
+
+
+class ExpositionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.families = [
+            pmp.create_counter("requests_total", "Requests.", [({"a": "1"}, 3)]),
+            pmp.create_gauge("queue_depth", "Queue depth.", [({}, 2)]),
+        ]
+
+    def test_select_content_type(self):
+        """ check the best format is chosen for an Accept header """
+        for accept, expected in (
+            (None, exposition.TEXT_CONTENT_TYPE),
+            ("", exposition.TEXT_CONTENT_TYPE),
+            (PROMETHEUS_ACCEPT, exposition.OPENMETRICS_CONTENT_TYPE),
+            (PROTOBUF_ACCEPT, exposition.PROTOBUF_CONTENT_TYPE),
+            ("*/*", exposition.TEXT_CONTENT_TYPE),
+            ("text/*;q=0.2, application/json", exposition.TEXT_CONTENT_TYPE),
+            ("application/json", exposition.TEXT_CONTENT_TYPE),
+            # check missing protobuf parameters are not acceptable
+            ("application/vnd.google.protobuf", exposition.TEXT_CONTENT_TYPE),
+            # check unsupported versions are not acceptable
+            (
+                "application/openmetrics-text;version=2.0.0",
+                exposition.TEXT_CONTENT_TYPE,
+            ),
+            ("application/openmetrics-text", exposition.OPENMETRICS_CONTENT_TYPE),
+            # check the most specific media range sets the quality
+            (
+                "text/plain;q=0, application/openmetrics-text;q=0.1, */*",
+                exposition.OPENMETRICS_CONTENT_TYPE,
+            ),
+            # check ties go to the cheapest format and bad qualities are skipped
+            (
+                'Application/OpenMetrics-Text, text/plain;version="0.0.4";q=1',
+                exposition.TEXT_CONTENT_TYPE,
+            ),
+            ("application/openmetrics-text;q=x", exposition.TEXT_CONTENT_TYPE),
+        ):
+            self.assertEqual(exposition.select_content_type(accept), expected, accept)
+
+        # check an acceptable cached format is preferred
+        cached = [exposition.TEXT_CONTENT_TYPE]
+        self.assertEqual(
+            exposition.select_content_type(PROMETHEUS_ACCEPT, cached),
+            exposition.TEXT_CONTENT_TYPE,
+        )
+        self.assertEqual(
+            exposition.select_content_type(
+                "application/openmetrics-text, text/plain;q=0", cached
+            ),
+            exposition.OPENMETRICS_CONTENT_TYPE,
+        )
+
+    def test_negotiate(self):
+        """ check families are encoded in the negotiated format """
+        content_type, body = pmp.negotiate(PROTOBUF_ACCEPT, self.families)
+        self.assertEqual(content_type, exposition.PROTOBUF_CONTENT_TYPE)
+        self.assertEqual(body, pmp.encode(*self.families))
+
+        content_type, body = pmp.negotiate(PROMETHEUS_ACCEPT, iter(self.families))
+        self.assertEqual(content_type, exposition.OPENMETRICS_CONTENT_TYPE)
+        self.assertEqual(body, pmp.encode_openmetrics(*self.families))
+
+        content_type, body = pmp.negotiate(None, self.families)
+        self.assertEqual(content_type, exposition.TEXT_CONTENT_TYPE)
+        self.assertEqual(body, pmp.encode_text(*self.families))
+
+    def test_negotiate_cache(self):
+        """ check a cached scrape is reused for clients that accept it """
+        cache = pmp.ExpositionCache()
+        content_type, body = pmp.negotiate(PROMETHEUS_ACCEPT, self.families, cache)
+        self.assertEqual(content_type, exposition.OPENMETRICS_CONTENT_TYPE)
+        self.assertEqual(cache.stats(), dict(hits=0, misses=1, size=1))
+
+        # check a client accepting the cached format is served from the cache
+        result = pmp.negotiate(PROTOBUF_ACCEPT, self.families, cache)
+        self.assertEqual(result, (content_type, body))
+        self.assertEqual(cache.stats(), dict(hits=1, misses=1, size=1))
+
+        # check other formats are encoded and cached alongside
+        content_type, body = pmp.negotiate("text/plain", list(self.families), cache)
+        self.assertEqual(content_type, exposition.TEXT_CONTENT_TYPE)
+        self.assertEqual(body, pmp.encode_text(*self.families))
+        self.assertEqual(
+            cache.cached(self.families),
+            [exposition.TEXT_CONTENT_TYPE, exposition.OPENMETRICS_CONTENT_TYPE],
+        )
+
+        # check new families replace the cached bodies
+        families = [pmp.create_gauge("other", "Other.", [({}, 1)])]
+        self.assertEqual(cache.cached(families), [])
+        content_type, body = pmp.negotiate(PROTOBUF_ACCEPT, families, cache)
+        self.assertEqual(content_type, exposition.PROTOBUF_CONTENT_TYPE)
+        self.assertEqual(body, pmp.encode(*families))
+        self.assertEqual(cache.stats(), dict(hits=1, misses=3, size=1))
+
+        # check a version allows new objects to reuse the cached bodies
+        cache.clear()
+        pmp.negotiate(PROTOBUF_ACCEPT, self.families, cache, version=1)
+        copies = [
+            pmp.MetricFamily.FromString(mf.SerializeToString()) for mf in self.families
+        ]
+        result = pmp.negotiate(PROTOBUF_ACCEPT, copies, cache, version=1)
+        self.assertEqual(result[1], pmp.encode(*self.families))
+        self.assertEqual(cache.cached(self.families), [])
+        self.assertEqual(cache.cached(copies, version=2), [])
+        self.assertEqual(cache.stats(), dict(hits=1, misses=1, size=1))
+
+        with self.assertRaises(Exception) as ctx:
+            cache.body("application/json", self.families)
+        self.assertIn("Invalid content type", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import random
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import histograms
+
+
+POS_INF = float("inf")
+
+
+class HistogramsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bounds = [0.1, 0.5, 1.0]
+        self.observations = [0.05, 0.1, 0.2, 0.5, 0.7, 1.0, 3.0, -1.0]
+        self.expected = {
+            0.1: 3,
+            0.5: 5,
+            1.0: 7,
+            POS_INF: 8,
+            "count": 8,
+            "sum": sum(self.observations),
+        }
+
+    def test_bucket_observations(self):
+        """ check observations are bucketed using inclusive upper bounds """
+        values = histograms.bucket_observations(self.observations, self.bounds)
+        self.assertEqual(values, self.expected)
+        self.assertEqual(list(values)[:4], [0.1, 0.5, 1.0, POS_INF])
+
+        # check the result can be used to create a histogram
+        mf = pmp.create_histogram("h", "A histogram.", [({"a": "b"}, values)])
+        self.assertEqual(mf.metric[0].histogram.sample_count, 8)
+        self.assertEqual(len(mf.metric[0].histogram.bucket), 4)
+
+        # check the bisect fallback used without NumPy gives the same result
+        with unittest.mock.patch.object(histograms, "np", None):
+            observations = iter(self.observations)
+            values = histograms.bucket_observations(observations, self.bounds)
+        self.assertEqual(values, self.expected)
+
+        values = histograms.bucket_observations([], self.bounds + [POS_INF])
+        self.assertEqual(
+            values, {0.1: 0, 0.5: 0, 1.0: 0, POS_INF: 0, "count": 0, "sum": 0.0}
+        )
+
+        for bounds in ([1.0, 0.5], [0.5, 0.5], [float("nan")]):
+            with self.assertRaises(Exception) as ctx:
+                histograms.bucket_observations([], bounds)
+            self.assertIn("Invalid upper bounds", str(ctx.exception))
+
+    @unittest.skipIf(histograms._numpy() is None, "NumPy is not installed")
+    def test_bucket_iterables(self):
+        """ check iterables that are not sequences are bucketed with NumPy """
+        observations = (value for value in self.observations)
+        values = histograms.bucket_observations(observations, self.bounds)
+        self.assertEqual(values, self.expected)
+
+        observations = dict.fromkeys(self.observations).keys()
+        values = histograms.bucket_observations(observations, self.bounds)
+        self.assertEqual(values, self.expected)
+
+        accumulator = histograms.HistogramAccumulator(self.bounds)
+        accumulator.observe_many(iter(self.observations))
+        self.assertEqual(accumulator.values(), self.expected)
+
+    def test_accumulator(self):
+        """ check observations accumulate across single values and batches """
+        for np in (histograms._numpy(), None):
+            with unittest.mock.patch.object(histograms, "np", np):
+                accumulator = histograms.HistogramAccumulator(self.bounds)
+                accumulator.observe(self.observations[0])
+                accumulator.observe_many(self.observations[1:5])
+                accumulator.observe_many(self.observations[5:])
+                self.assertEqual(accumulator.values(), self.expected)
+                self.assertEqual(accumulator.count, 8)
+
+                # check NaN is counted in the +Inf bucket
+                accumulator.observe(float("nan"))
+                values = accumulator.values()
+                self.assertEqual(values[POS_INF], 9)
+                self.assertEqual(values[1.0], 7)
+
+                accumulator.reset()
+                self.assertEqual(accumulator.count, 0)
+                self.assertEqual(accumulator.sum, 0.0)
+
+    def test_random(self):
+        """ check bucketing matches a direct count """
+        rng = random.Random(7)
+        bounds = sorted(rng.uniform(0, 10) for _ in range(12))
+        observations = [round(rng.uniform(-1, 11), 1) for _ in range(1000)]
+        observations.extend(bounds)
+        values = histograms.bucket_observations(observations, bounds)
+        for bound in bounds:
+            self.assertEqual(values[bound], sum(1 for o in observations if o <= bound))
+        self.assertEqual(values[POS_INF], len(observations))
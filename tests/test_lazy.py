@@ -0,0 +1,77 @@
+import unittest
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import wire
+
+
+class LazyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.families = [
+            pmp.create_counter("c", "A counter.", [({"a": "1"}, 1)]),
+            pmp.create_gauge("g", "A gauge.", [({"b": "2"}, 2)]),
+            pmp.create_summary(
+                "s", "A summary.", [({"c": "3"}, {0.5: 1.0, "count": 1, "sum": 1.0})]
+            ),
+        ]
+        self.payload = pmp.encode(*self.families)
+
+    def test_index(self):
+        """ check families are indexed without being parsed """
+        metric_set = pmp.LazyMetricSet(self.payload)
+        self.assertEqual(len(metric_set), 3)
+        self.assertEqual(metric_set.names(), ["c", "g", "s"])
+        self.assertIn("g", metric_set)
+        self.assertNotIn("x", metric_set)
+        self.assertEqual(metric_set._families, [None, None, None])
+
+        self.assertEqual(metric_set["g"], self.families[1])
+        self.assertEqual(metric_set._families[0], None)
+        self.assertIs(metric_set["g"], metric_set[1])
+        self.assertEqual(metric_set[-1], self.families[2])
+        self.assertEqual(metric_set.get("c"), self.families[0])
+        self.assertIsNone(metric_set.get("x"))
+        self.assertEqual(list(metric_set), self.families)
+        self.assertEqual(
+            bytes(metric_set.frame("s")), self.families[2].SerializeToString()
+        )
+
+        with self.assertRaises(KeyError):
+            metric_set["x"]
+        with self.assertRaises(IndexError):
+            metric_set[3]
+
+        self.assertEqual(len(pmp.LazyMetricSet(b"")), 0)
+        self.assertEqual(
+            list(pmp.LazyMetricSet(bytearray(self.payload))), self.families
+        )
+
+    def test_name_not_first(self):
+        """ check the name is found when it is not the first field """
+        encoded = b"\x12\x05Help.\x18\x01" + b"\x0a\x04name"
+        payload = wire.encode_varint(len(encoded)) + encoded
+        metric_set = pmp.LazyMetricSet(payload)
+        self.assertIn("name", metric_set)
+        self.assertEqual(metric_set["name"].help, "Help.")
+
+    def test_truncated(self):
+        """ check truncated payloads are rejected """
+        with self.assertRaises(Exception) as ctx:
+            pmp.LazyMetricSet(self.payload[:-1])
+        self.assertIn("Truncated MetricFamily, expected", str(ctx.exception))
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.LazyMetricSet(self.payload + b"\x80")
+        self.assertIn("incomplete size header", str(ctx.exception))
+
+    def test_decode_varint(self):
+        """ check varints round trip """
+        for value in (0, 1, 127, 128, 300, 2 ** 32, 2 ** 64 - 1):
+            encoded = wire.encode_varint(value)
+            self.assertEqual(
+                wire.decode_varint(b"x" + encoded, 1), (value, len(encoded) + 1)
+            )
+        with self.assertRaises(IndexError):
+            wire.decode_varint(b"\x80\x80")
+        with self.assertRaises(Exception) as ctx:
+            wire.decode_varint(b"\xff" * 11)
+        self.assertIn("Too many bytes", str(ctx.exception))
@@ -0,0 +1,139 @@
+import io
+import unittest
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import openmetrics
+
+
+POS_INF = float("inf")
+
+
+class OpenMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        exemplar = pmp.utils.create_exemplar(
+            {"trace_id": "abc"}, 0.25, timestamp=1528000000.5
+        )
+        self.counter = pmp.create_counter(
+            "http_requests_total",
+            'Total "requests".',
+            [
+                pmp.utils.create_counter_metric(
+                    {"code": "200"}, 1027, exemplar=exemplar
+                ),
+                pmp.utils.create_counter_metric({"code": "500"}, 3),
+            ],
+        )
+        self.counter.metric[0].counter.created_timestamp.seconds = 1527000000
+        self.counter.metric[0].counter.created_timestamp.nanos = 500000000
+
+        self.histogram = pmp.create_histogram(
+            "request_latency_seconds",
+            "Request latency.",
+            [
+                pmp.utils.create_histogram_metric(
+                    {"route": "/"},
+                    {0.1: 3, 1.0: 7},
+                    9,
+                    2.5,
+                    exemplars={1.0: exemplar},
+                )
+            ],
+        )
+        self.histogram.unit = "seconds"
+        self.histogram.metric[0].timestamp_ms = 1528000000250
+
+    def test_encode_openmetrics(self):
+        """ check families are encoded into the OpenMetrics format """
+        self.assertEqual(
+            pmp.encode_openmetrics(self.counter, self.histogram).decode("utf-8"),
+            '# HELP http_requests Total \\"requests\\".\n'
+            "# TYPE http_requests counter\n"
+            'http_requests_total{code="200"} 1027.0'
+            ' # {trace_id="abc"} 0.25 1.5280000005e+09\n'
+            'http_requests_created{code="200"} 1.5270000005e+09\n'
+            'http_requests_total{code="500"} 3.0\n'
+            "# HELP request_latency_seconds Request latency.\n"
+            "# TYPE request_latency_seconds histogram\n"
+            "# UNIT request_latency_seconds seconds\n"
+            'request_latency_seconds_bucket{route="/",le="0.1"} 3 1.52800000025e+09\n'
+            'request_latency_seconds_bucket{route="/",le="1.0"} 7 1.52800000025e+09'
+            ' # {trace_id="abc"} 0.25 1.5280000005e+09\n'
+            'request_latency_seconds_bucket{route="/",le="+Inf"} 9 1.52800000025e+09\n'
+            'request_latency_seconds_sum{route="/"} 2.5 1.52800000025e+09\n'
+            'request_latency_seconds_count{route="/"} 9 1.52800000025e+09\n'
+            "# EOF\n",
+        )
+
+        summary = pmp.create_summary(
+            "rpc_duration_seconds",
+            "RPC duration.",
+            [({}, {0.5: 0.05, "count": 2, "sum": 17})],
+        )
+        summary.metric[0].summary.created_timestamp.seconds = 1527000000
+        untyped = pmp.MetricFamily(
+            name="u",
+            type=pmp.UNTYPED,
+            metric=[pmp.Metric(untyped=pmp.Untyped(value=-2))],
+        )
+        empty = pmp.create_gauge("empty", "No metrics.", [])
+        self.assertEqual(
+            pmp.encode_openmetrics(summary, empty, untyped).decode("utf-8"),
+            "# HELP rpc_duration_seconds RPC duration.\n"
+            "# TYPE rpc_duration_seconds summary\n"
+            'rpc_duration_seconds{quantile="0.5"} 0.05\n'
+            "rpc_duration_seconds_sum 17.0\n"
+            "rpc_duration_seconds_count 2\n"
+            "rpc_duration_seconds_created 1.527e+09\n"
+            "# TYPE u unknown\n"
+            "u -2.0\n"
+            "# EOF\n",
+        )
+        self.assertEqual(pmp.encode_openmetrics(), b"# EOF\n")
+
+        # check a unit must be a suffix of the family name
+        gauge = pmp.create_gauge("temperature", "", [({}, 1)])
+        gauge.unit = "celsius"
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_openmetrics(gauge)
+        self.assertIn("Invalid unit", str(ctx.exception))
+
+        # check passing invalid type raises an exception
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_openmetrics(self.counter, "test")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily", str(ctx.exception)
+        )
+
+    def test_format_float(self):
+        """ check floats always include a decimal point or an exponent """
+        for value, expected in (
+            (0.0, "0.0"),
+            (-0.0, "-0.0"),
+            (1.0, "1.0"),
+            (-3.0, "-3.0"),
+            (0.5, "0.5"),
+            (1e6, "1e+06"),
+            (POS_INF, "+Inf"),
+            (-POS_INF, "-Inf"),
+            (float("nan"), "NaN"),
+        ):
+            self.assertEqual(openmetrics._format_om_float(value), expected)
+
+    def test_encode_openmetrics_streaming(self):
+        """ check output can be produced lazily and written to a stream """
+        families = [self.counter, self.histogram]
+        payload = pmp.encode_openmetrics(*families)
+
+        chunks = list(pmp.iter_encode_openmetrics(iter(families)))
+        self.assertEqual(len(chunks), len(families) + 1)
+        self.assertEqual(chunks[-1], openmetrics.EOF)
+        self.assertEqual(b"".join(chunks), payload)
+
+        stream = io.BytesIO()
+        written = pmp.encode_openmetrics_to(stream, *families)
+        self.assertEqual(written, len(payload))
+        self.assertEqual(stream.getvalue(), payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import concurrent.futures
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import parallel
+
+
+class ParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.specs = [
+            (
+                "counter_{}".format(i),
+                "A counter.",
+                pmp.COUNTER,
+                [({"shard": str(s)}, s * i) for s in range(3)],
+            )
+            for i in range(20)
+        ]
+        self.families = [pmp.utils.create_metric_family(*spec) for spec in self.specs]
+        self.payload = pmp.encode(*self.families)
+
+    def test_serial(self):
+        """ check small registries are encoded without an executor """
+        executor = unittest.mock.Mock()
+        data = pmp.encode_parallel(self.families, executor=executor)
+        self.assertEqual(data, self.payload)
+        executor.map.assert_not_called()
+
+        with unittest.mock.patch.object(parallel, "_create_executor") as create:
+            data = pmp.encode_parallel(self.specs, max_workers=1, threshold=0)
+        self.assertEqual(data, self.payload)
+        create.assert_not_called()
+
+    def test_thread_pool(self):
+        """ check parallel encoding preserves the order of families """
+        mixed = [
+            spec if i % 2 else family
+            for i, (spec, family) in enumerate(zip(self.specs, self.families))
+        ]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            for families in (self.families, self.specs, mixed):
+                data = pmp.encode_parallel(
+                    families, executor=executor, max_workers=3, threshold=0
+                )
+                self.assertEqual(data, self.payload)
+
+            with self.assertRaises(Exception) as ctx:
+                pmp.encode_parallel(["a"], executor=executor, threshold=0)
+            self.assertIn(
+                "Expected families to be instances of MetricFamily or tuple, got ",
+                str(ctx.exception),
+            )
+
+    def test_process_pool(self):
+        """ check families can be encoded by a process pool """
+        mixed = [
+            spec if i % 2 else family
+            for i, (spec, family) in enumerate(zip(self.specs, self.families))
+        ]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+            for families in (self.families, self.specs, mixed):
+                data = pmp.encode_parallel(
+                    families, executor=executor, max_workers=2, threshold=0
+                )
+                self.assertEqual(data, self.payload)
+
+    def test_default_executor(self):
+        """ check the executor created for a call is reused """
+        self.addCleanup(parallel._executors.clear)
+        with unittest.mock.patch.object(parallel, "gil_enabled", return_value=True):
+            data = pmp.encode_parallel(self.families, max_workers=2, threshold=0)
+            self.assertEqual(data, self.payload)
+            executor = parallel._executors[2]
+            self.addCleanup(executor.shutdown)
+            self.assertIsInstance(executor, concurrent.futures.ProcessPoolExecutor)
+
+            data = pmp.encode_parallel(self.specs, max_workers=2, threshold=0)
+            self.assertEqual(data, self.payload)
+            self.assertIs(parallel._executors[2], executor)
+
+    def test_partition(self):
+        """ check partitions are contiguous and cover every family """
+        items = list(range(10))
+        for count in (1, 3, 4, 10, 20):
+            partitions = parallel._partition(items, count)
+            self.assertLessEqual(len(partitions), count)
+            self.assertEqual([i for p in partitions for i in p], items)
+        self.assertEqual(parallel._partition([], 4), [])
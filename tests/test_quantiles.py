@@ -0,0 +1,131 @@
+import bisect
+import math
+import pickle
+import random
+import unittest
+
+import prometheus_metrics_proto as pmp
+
+
+class QuantilesTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.data = [rng.lognormvariate(0, 1) for _ in range(20000)]
+        self.sorted_data = sorted(self.data)
+
+    def assertRankError(self, digest, quantiles, tolerance):
+        """ check the rank of each estimate is close to its quantile """
+        for q in quantiles:
+            estimate = digest.quantile(q)
+            rank = bisect.bisect_left(self.sorted_data, estimate) / len(self.data)
+            self.assertAlmostEqual(rank, q, delta=tolerance, msg="q={}".format(q))
+
+    def test_accuracy(self):
+        """ check estimates are accurate and memory is bounded """
+        digest = pmp.TDigest(compression=100)
+        for value in self.data[:1000]:
+            digest.observe(value)
+        digest.observe_many(self.data[1000:])
+        self.assertEqual(digest.count, len(self.data))
+        self.assertAlmostEqual(digest.sum, math.fsum(self.data), places=6)
+        self.assertLessEqual(len(digest), 100)
+        self.assertRankError(digest, (0.01, 0.1, 0.5, 0.9, 0.99), 0.005)
+        self.assertEqual(digest.quantile(0.0), self.sorted_data[0])
+        self.assertEqual(digest.quantile(1.0), self.sorted_data[-1])
+
+        # check NaN observations are ignored
+        digest.observe(float("nan"))
+        digest.observe_many([float("nan")])
+        self.assertEqual(digest.count, len(self.data))
+
+    def test_merge(self):
+        """ check digests built separately can be merged """
+        digests = [pmp.TDigest() for _ in range(4)]
+        for i, value in enumerate(self.data):
+            digests[i % 4].observe(value)
+        merged = pmp.TDigest()
+        merged.merge(*digests)
+        self.assertEqual(merged.count, len(self.data))
+        self.assertRankError(merged, (0.1, 0.5, 0.9, 0.99), 0.005)
+        self.assertEqual(digests[0].count, len(self.data) // 4)
+
+        # check digests survive a round trip through pickle
+        clone = pickle.loads(pickle.dumps(merged))
+        self.assertEqual(clone.snapshot(), merged.snapshot())
+        clone.observe(1.0)
+        self.assertEqual(clone.count, merged.count + 1)
+
+    def test_snapshot(self):
+        """ check snapshots can be used to create summaries """
+        digest = pmp.TDigest(quantiles=(0.5, 0.99))
+        values = digest.snapshot()
+        self.assertEqual(set(values), {0.5, 0.99, "count", "sum"})
+        self.assertTrue(math.isnan(values[0.5]))
+        self.assertEqual(values["count"], 0)
+
+        digest.observe_many(self.data)
+        values = digest.snapshot()
+        mf = pmp.create_summary("s", "A summary.", [({"a": "b"}, values)])
+        summary = mf.metric[0].summary
+        self.assertEqual(summary.sample_count, len(self.data))
+        self.assertEqual([q.quantile for q in summary.quantile], [0.5, 0.99])
+        self.assertEqual(summary.quantile[1].value, values[0.99])
+
+        values = digest.snapshot(quantiles=[0.25])
+        self.assertEqual(set(values), {0.25, "count", "sum"})
+
+        digest.reset()
+        self.assertEqual(digest.count, 0)
+        self.assertTrue(math.isnan(digest.quantile(0.5)))
+
+        with self.assertRaises(Exception) as ctx:
+            digest.quantile(1.5)
+        self.assertIn("Invalid quantile", str(ctx.exception))
+        with self.assertRaises(Exception) as ctx:
+            pmp.TDigest(compression=1)
+        self.assertIn("Invalid compression", str(ctx.exception))
+
+    def test_windowed_summary(self):
+        """ check windowed summaries only report recent observations """
+        now = [1000.0]
+        summary = pmp.WindowedSummary(
+            max_age=60, age_buckets=3, quantiles=(0.5,), clock=lambda: now[0]
+        )
+        self.assertTrue(math.isnan(summary.snapshot()[0.5]))
+
+        summary.observe_many([1.0] * 100)
+        now[0] += 20
+        summary.observe_many([2.0] * 100)
+        now[0] += 20
+        summary.observe(3.0)
+        values = summary.snapshot()
+        self.assertEqual(values["count"], 201)
+        self.assertEqual(values["sum"], 303.0)
+        self.assertAlmostEqual(values[0.5], 1.5, delta=0.5)
+
+        # check the oldest slice leaves the window but count and sum remain
+        now[0] += 20
+        values = summary.snapshot(quantiles=(0.0, 1.0))
+        self.assertEqual(values[0.0], 2.0)
+        self.assertEqual(values[1.0], 3.0)
+        self.assertEqual(values["count"], 201)
+
+        now[0] += 20
+        self.assertEqual(summary.snapshot()[0.5], 3.0)
+
+        # check a long gap clears every slice
+        now[0] += 1000
+        self.assertTrue(math.isnan(summary.snapshot()[0.5]))
+        self.assertEqual(summary.count, 201)
+
+        summary.observe(4.0)
+        metric = summary.create_metric({"route": "/"}, const_labels={"app": "a"})
+        self.assertEqual([l.name for l in metric.label], ["app", "route"])
+        self.assertEqual(metric.summary.sample_count, 202)
+        self.assertEqual(metric.summary.sample_sum, 307.0)
+        self.assertEqual(metric.summary.quantile[0].quantile, 0.5)
+        self.assertEqual(metric.summary.quantile[0].value, 4.0)
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.WindowedSummary(max_age=0)
+        self.assertIn("Invalid window", str(ctx.exception))
@@ -0,0 +1,198 @@
+import http.server
+import threading
+import unittest
+import urllib.error
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import remote_write, snappy
+
+
+TIMESTAMP_MS = 1528000000000
+
+
+class Receiver(http.server.BaseHTTPRequestHandler):
+    """ A stand-in remote write receiver that records the requests """
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def series(request):
+    """ Return the series of a WriteRequest as (labels, value, timestamp) """
+    return [
+        (
+            [(label.name, label.value) for label in ts.labels],
+            ts.samples[0].value,
+            ts.samples[0].timestamp,
+        )
+        for ts in request.timeseries
+    ]
+
+
+class RemoteWriteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.counter = pmp.create_counter(
+            "requests_total", "Requests.", [({"path": "/", "code": "200"}, 3)]
+        )
+        self.gauge = pmp.create_gauge(
+            "queue_depth", "Queue depth.", [({}, -1.5)], timestamp=True
+        )
+        self.gauge.metric[0].timestamp_ms = 1527000000000
+        self.summary = pmp.create_summary(
+            "rpc_seconds", "RPC.", [({"a": "1"}, {0.5: 0.05, "count": 2, "sum": 7})]
+        )
+        self.histogram = pmp.create_histogram(
+            "latency_seconds",
+            "Latency.",
+            [({"Z": "z"}, {0.1: 3, 2.5: 7, "count": 9, "sum": 4.5})],
+        )
+
+    def test_create_write_request(self):
+        """ check metrics are expanded into sorted, labelled time series """
+        request = remote_write.create_write_request(
+            self.counter,
+            self.gauge,
+            self.summary,
+            self.histogram,
+            timestamp_ms=TIMESTAMP_MS,
+        )
+        self.assertEqual(
+            series(request),
+            [
+                (
+                    [("__name__", "requests_total"), ("code", "200"), ("path", "/")],
+                    3.0,
+                    TIMESTAMP_MS,
+                ),
+                ([("__name__", "queue_depth")], -1.5, 1527000000000),
+                (
+                    [("__name__", "rpc_seconds"), ("a", "1"), ("quantile", "0.5")],
+                    0.05,
+                    TIMESTAMP_MS,
+                ),
+                ([("__name__", "rpc_seconds_sum"), ("a", "1")], 7.0, TIMESTAMP_MS),
+                ([("__name__", "rpc_seconds_count"), ("a", "1")], 2.0, TIMESTAMP_MS),
+                (
+                    [("Z", "z"), ("__name__", "latency_seconds_bucket"), ("le", "0.1")],
+                    3.0,
+                    TIMESTAMP_MS,
+                ),
+                (
+                    [("Z", "z"), ("__name__", "latency_seconds_bucket"), ("le", "2.5")],
+                    7.0,
+                    TIMESTAMP_MS,
+                ),
+                (
+                    [
+                        ("Z", "z"),
+                        ("__name__", "latency_seconds_bucket"),
+                        ("le", "+Inf"),
+                    ],
+                    9.0,
+                    TIMESTAMP_MS,
+                ),
+                ([("Z", "z"), ("__name__", "latency_seconds_sum")], 4.5, TIMESTAMP_MS),
+                (
+                    [("Z", "z"), ("__name__", "latency_seconds_count")],
+                    9.0,
+                    TIMESTAMP_MS,
+                ),
+            ],
+        )
+
+        # check the current time is used by default
+        request = remote_write.create_write_request(self.counter)
+        self.assertGreater(request.timeseries[0].samples[0].timestamp, TIMESTAMP_MS)
+
+        # check passing invalid type raises an exception
+        with self.assertRaises(Exception) as ctx:
+            remote_write.create_write_request(self.counter, "test")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily", str(ctx.exception)
+        )
+
+    def test_encode_write_requests(self):
+        """ check series are batched by the maximum samples per request """
+        families = [self.counter, self.gauge, self.summary, self.histogram]
+        expected = series(
+            remote_write.create_write_request(*families, timestamp_ms=TIMESTAMP_MS)
+        )
+        for max_samples, sizes in ((1, [1] * 10), (4, [4, 4, 2]), (10, [10])):
+            encoded = remote_write.encode_write_requests(
+                *families, max_samples_per_request=max_samples, timestamp_ms=-1
+            )
+            requests = [remote_write.WriteRequest.FromString(e) for e in encoded]
+            self.assertEqual([len(r.timeseries) for r in requests], sizes)
+            received = [s for r in requests for s in series(r)]
+            self.assertEqual([s[:2] for s in received], [s[:2] for s in expected])
+            self.assertEqual(received[0][2], -1)
+
+        chunks = remote_write.iter_encode_write_requests(
+            iter(families), 100, TIMESTAMP_MS
+        )
+        self.assertEqual(
+            series(remote_write.WriteRequest.FromString(next(chunks))), expected
+        )
+        self.assertEqual(remote_write.encode_write_requests(), [])
+
+        with self.assertRaises(Exception) as ctx:
+            remote_write.encode_write_requests(self.counter, max_samples_per_request=0)
+        self.assertIn("Invalid max_samples_per_request", str(ctx.exception))
+
+    def test_push(self):
+        """ check write requests are pushed to a receiver """
+        server = http.server.HTTPServer(("127.0.0.1", 0), Receiver)
+        server.received = []
+        server.status = 204
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:{}/api/v1/write".format(server.server_address[1])
+
+        families = [self.counter, self.gauge, self.summary, self.histogram]
+        sent = remote_write.push(
+            url,
+            *families,
+            max_samples_per_request=4,
+            timestamp_ms=TIMESTAMP_MS,
+            headers={"Authorization": "Bearer token"},
+        )
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(server.received), 3)
+
+        received = []
+        for headers, body in server.received:
+            self.assertEqual(headers["Content-Type"], "application/x-protobuf")
+            self.assertEqual(headers["Content-Encoding"], "snappy")
+            self.assertEqual(headers["X-Prometheus-Remote-Write-Version"], "0.1.0")
+            self.assertEqual(headers["Authorization"], "Bearer token")
+            received.extend(
+                series(remote_write.WriteRequest.FromString(snappy.decompress(body)))
+            )
+        self.assertEqual(
+            received,
+            series(
+                remote_write.create_write_request(*families, timestamp_ms=TIMESTAMP_MS)
+            ),
+        )
+
+        # check an error response stops the push
+        server.received.clear()
+        server.status = 400
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            remote_write.push(url, *families, max_samples_per_request=4)
+        self.assertEqual(ctx.exception.code, 400)
+        self.assertEqual(len(server.received), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
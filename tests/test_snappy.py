@@ -0,0 +1,59 @@
+import os
+import random
+import unittest
+
+from prometheus_metrics_proto import snappy
+
+
+class SnappyTestCase(unittest.TestCase):
+    def test_compress(self):
+        """ check data survives a round trip through Snappy compression """
+        rng = random.Random(0)
+        for data in (
+            b"",
+            b"a",
+            b"abcdabcdabcd",
+            b"a" * 1000,
+            os.urandom(70000),
+            bytes(rng.randrange(4) for _ in range(150000)),
+            b"".join(
+                'up{{instance="host-{}:9100",job="node"}} 1\n'.format(i).encode()
+                for i in range(5000)
+            ),
+        ):
+            for compress, decompress in (
+                (snappy.compress, snappy.decompress),
+                (snappy._compress, snappy._decompress),
+            ):
+                compressed = compress(data)
+                self.assertEqual(decompress(compressed), data)
+
+        # check repetitive data is compressed
+        data = b"abcdefgh" * 10000
+        self.assertLess(len(snappy._compress(data)), len(data) // 10)
+
+    def test_decompress(self):
+        """ check blocks produced by other implementations are decompressed """
+        # a literal followed by 1 and 2 byte offset copies, including a copy
+        # that overlaps its own output.
+        self.assertEqual(snappy._decompress(b"\x0a\x00a\x15\x01"), b"a" * 10)
+        self.assertEqual(
+            snappy._decompress(b"\x0e\x0cabcd\x26\x04\x00"), b"abcdabcdabcdab"
+        )
+        # a literal with a one byte length
+        self.assertEqual(snappy._decompress(b"\x40\xf0\x3f" + b"x" * 64), b"x" * 64)
+
+        for data, message in (
+            (b"", "missing length"),
+            (b"\x05\x10ab", "truncated literal"),
+            (b"\x04\x00a\x05\x02", "invalid copy offset"),
+            (b"\x04\x00a\x06", "truncated element"),
+            (b"\x02\x00a", "expected 2 bytes, got 1"),
+        ):
+            with self.assertRaises(Exception) as ctx:
+                snappy._decompress(data)
+            self.assertIn(message, str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
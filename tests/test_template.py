@@ -0,0 +1,135 @@
+import unittest
+
+import prometheus_metrics_proto as pmp
+
+
+POS_INF = float("inf")
+
+
+class TemplateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.labels = ({"route": "/"}, {"route": "/data"})
+        self.const_labels = {"app": "my_app"}
+
+    def assertFrameEqual(self, template, mf):
+        """ check a template frame decodes to the expected MetricFamily """
+        frame = template.frame
+        self.assertEqual(pmp.decode(frame), [mf])
+        self.assertEqual(pmp.decode(bytes(template)), [mf])
+
+    def test_counter(self):
+        """ check updating counter values """
+        mf = pmp.create_counter(
+            "c",
+            "A counter.",
+            [(l, 0) for l in self.labels],
+            const_labels=self.const_labels,
+        )
+        template = pmp.MetricFamilyTemplate(mf)
+        self.assertEqual(len(template), 2)
+        self.assertEqual(template.name, "c")
+        self.assertFrameEqual(template, mf)
+
+        template.set_value(0, 10.5)
+        template.set_value(1, 7)
+        expected = pmp.create_counter(
+            "c",
+            "A counter.",
+            [(self.labels[0], 10.5), (self.labels[1], 7)],
+            const_labels=self.const_labels,
+        )
+        self.assertFrameEqual(template, expected)
+        # Doubles are fixed size so the frame matches the protobuf encoding
+        self.assertEqual(bytes(template), pmp.encode(expected))
+
+        with self.assertRaises(Exception) as ctx:
+            template.set_histogram(0, [], 0, 0.0)
+        self.assertIn("can not be used", str(ctx.exception))
+
+    def test_optional_fields(self):
+        """ check unset family fields are omitted from the frame """
+        for mf in (
+            pmp.MetricFamily(name="c", type=pmp.COUNTER),
+            pmp.MetricFamily(name="c", help="Help.", type=pmp.COUNTER),
+            pmp.MetricFamily(name="c", help="", type=pmp.COUNTER),
+            pmp.MetricFamily(name="c"),
+        ):
+            mf.metric.add().counter.value = 1.5
+            template = pmp.MetricFamilyTemplate(mf)
+            self.assertEqual(bytes(template.frame), pmp.encode(mf))
+            (decoded,) = pmp.decode(template.frame)
+            self.assertEqual(decoded.HasField("help"), mf.HasField("help"))
+
+    def test_summary(self):
+        """ check updating summary values """
+        values = {0.5: 4.0, 0.9: 5.2, 0.99: 5.2, "count": 4, "sum": 25.2}
+        mf = pmp.create_summary("s", "A summary.", [(l, values) for l in self.labels])
+        template = pmp.MetricFamilyTemplate(mf)
+        self.assertFrameEqual(template, mf)
+
+        template.set_summary(1, [1.0, 2.0, 3.0], 300, 600.5)
+        new_values = {0.5: 1.0, 0.9: 2.0, 0.99: 3.0, "count": 300, "sum": 600.5}
+        expected = pmp.create_summary(
+            "s", "A summary.", [(self.labels[0], values), (self.labels[1], new_values)]
+        )
+        self.assertFrameEqual(template, expected)
+
+        with self.assertRaises(Exception) as ctx:
+            template.set_summary(0, [1.0], 1, 1.0)
+        self.assertIn("Expected 3 values", str(ctx.exception))
+
+    def test_histogram(self):
+        """ check updating histogram values, including varint growth """
+        values = {5.0: 3, 10.0: 5, POS_INF: 6, "count": 6, "sum": 46.0}
+        mf = pmp.create_histogram(
+            "h", "A histogram.", [(l, values) for l in self.labels], timestamp=True
+        )
+        template = pmp.MetricFamilyTemplate(mf, varint_size=2)
+        self.assertFrameEqual(template, mf)
+        size = len(template.frame)
+
+        # check values that fit in the reserved space do not change the size
+        template.set_histogram(0, [100, 200, 300], 300, 1.5)
+        self.assertEqual(len(template.frame), size)
+
+        # check values that do not fit cause the frame to grow
+        template.set_histogram(1, [2 ** 40, 2 ** 41, 2 ** 64 - 1], 2 ** 64 - 1, 2.5)
+        self.assertGreater(len(template.frame), size)
+
+        template.set_timestamp(0, 1528000000000)
+        template.set_timestamp(1, -1)
+
+        for metric, (counts, count, sum_, timestamp_ms) in zip(
+            mf.metric,
+            (
+                ([100, 200, 300], 300, 1.5, 1528000000000),
+                ([2 ** 40, 2 ** 41, 2 ** 64 - 1], 2 ** 64 - 1, 2.5, -1),
+            ),
+        ):
+            for bucket, cumulative_count in zip(metric.histogram.bucket, counts):
+                bucket.cumulative_count = cumulative_count
+            metric.histogram.sample_count = count
+            metric.histogram.sample_sum = sum_
+            metric.timestamp_ms = timestamp_ms
+        self.assertFrameEqual(template, mf)
+
+        with self.assertRaises(ValueError):
+            template.set_histogram(0, [1, 2, -3], 3, 1.0)
+
+    def test_unsupported(self):
+        """ check families that can not be templated are rejected """
+        mf = pmp.create_counter("c", "A counter.", [({"a": "b"}, 1)])
+        mf.metric[0].gauge.value = 1.0
+        with self.assertRaises(Exception) as ctx:
+            pmp.MetricFamilyTemplate(mf)
+        self.assertIn("gauge field of Metric is not supported", str(ctx.exception))
+
+        mf = pmp.create_gauge("g", "A gauge.", [({"a": "b"}, 1)])
+        template = pmp.MetricFamilyTemplate(mf)
+        with self.assertRaises(Exception) as ctx:
+            template.set_timestamp(0, 1)
+        self.assertIn("does not have a timestamp", str(ctx.exception))
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.MetricFamilyTemplate(mf, varint_size=11)
+        self.assertIn("Invalid varint_size", str(ctx.exception))
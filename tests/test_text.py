@@ -0,0 +1,279 @@
+import io
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import text
+
+
+POS_INF = float("inf")
+
+
+class TextTestCase(unittest.TestCase):
+    def setUp(self):
+        self.counter = pmp.create_counter(
+            "http_requests_total",
+            "Total requests.",
+            [({"code": "200", "method": "get"}, 1027), ({}, 3)],
+        )
+        self.gauge = pmp.create_gauge(
+            "queue_depth", "Queue depth.", [({"queue": "a"}, -1.5)]
+        )
+        self.summary = pmp.create_summary(
+            "rpc_duration_seconds",
+            "RPC duration.",
+            [({"service": "a"}, {0.5: 0.05, 0.99: 1e-05, "count": 2, "sum": 17.5})],
+        )
+        self.histogram = pmp.create_histogram(
+            "request_latency_seconds",
+            "Request latency.",
+            [
+                (
+                    {"route": "/"},
+                    {0.1: 3, 2.5e6: 7, POS_INF: 2 ** 40, "count": 2 ** 40, "sum": 9},
+                )
+            ],
+        )
+
+    def test_encode_text(self):
+        """ check families are encoded into the text format """
+        self.assertEqual(
+            pmp.encode_text(self.counter, self.gauge).decode("utf-8"),
+            "# HELP http_requests_total Total requests.\n"
+            "# TYPE http_requests_total counter\n"
+            'http_requests_total{code="200",method="get"} 1027\n'
+            "http_requests_total 3\n"
+            "# HELP queue_depth Queue depth.\n"
+            "# TYPE queue_depth gauge\n"
+            'queue_depth{queue="a"} -1.5\n',
+        )
+        self.assertEqual(
+            pmp.encode_text(self.summary).decode("utf-8"),
+            "# HELP rpc_duration_seconds RPC duration.\n"
+            "# TYPE rpc_duration_seconds summary\n"
+            'rpc_duration_seconds{service="a",quantile="0.5"} 0.05\n'
+            'rpc_duration_seconds{service="a",quantile="0.99"} 1e-05\n'
+            'rpc_duration_seconds_sum{service="a"} 17.5\n'
+            'rpc_duration_seconds_count{service="a"} 2\n',
+        )
+        self.assertEqual(
+            pmp.encode_text(self.histogram).decode("utf-8"),
+            "# HELP request_latency_seconds Request latency.\n"
+            "# TYPE request_latency_seconds histogram\n"
+            'request_latency_seconds_bucket{route="/",le="0.1"} 3\n'
+            'request_latency_seconds_bucket{route="/",le="2.5e+06"} 7\n'
+            'request_latency_seconds_bucket{route="/",le="+Inf"} 1.099511627776e+12\n'
+            'request_latency_seconds_sum{route="/"} 9\n'
+            'request_latency_seconds_count{route="/"} 1.099511627776e+12\n',
+        )
+
+        # check a missing +Inf bucket is added using the sample count
+        histogram = pmp.create_histogram(
+            "h", "", [({}, {1.0: 1, "count": 2, "sum": 3.5})], timestamp=True
+        )
+        histogram.metric[0].timestamp_ms = 1528000000000
+        self.assertEqual(
+            pmp.encode_text(histogram).decode("utf-8"),
+            "# HELP h \n"
+            "# TYPE h histogram\n"
+            'h_bucket{le="1"} 1 1528000000000\n'
+            'h_bucket{le="+Inf"} 2 1528000000000\n'
+            "h_sum 3.5 1528000000000\n"
+            "h_count 2 1528000000000\n",
+        )
+
+        # check untyped families, a missing help string and empty families
+        mf = pmp.MetricFamily(
+            name="u",
+            type=pmp.UNTYPED,
+            metric=[pmp.Metric(untyped=pmp.Untyped(value=float("nan")))],
+        )
+        empty = pmp.create_gauge("empty", "No metrics.", [])
+        self.assertEqual(
+            pmp.encode_text(empty, mf, empty), b"# TYPE u untyped\nu NaN\n"
+        )
+        self.assertEqual(pmp.encode_text(), b"")
+
+        # check passing invalid type raises an exception
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_text(self.counter, "test")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily", str(ctx.exception)
+        )
+
+        # check an unknown metric type raises an exception. The MetricFamily
+        # type enum rejects unknown values so a stand-in is used.
+        mf = unittest.mock.Mock(spec=pmp.MetricFamily, type=99)
+        mf.name = "unknown"
+        with self.assertRaises(Exception) as ctx:
+            text._family_text(mf)
+        self.assertIn("Invalid metric_type: 99", str(ctx.exception))
+
+    def test_escaping(self):
+        """ check help strings and label values are escaped """
+        mf = pmp.create_gauge(
+            "escaped",
+            'A "help" string\\with\nnewlines.',
+            [({"path": 'C:\\dir\n"quoted"', "unicode": "éè"}, 1)],
+        )
+        self.assertEqual(
+            pmp.encode_text(mf).decode("utf-8"),
+            '# HELP escaped A "help" string\\\\with\\nnewlines.\n'
+            "# TYPE escaped gauge\n"
+            'escaped{path="C:\\\\dir\\n\\"quoted\\"",unicode="éè"} 1\n',
+        )
+
+    def test_format_float(self):
+        """ check floats are formatted like the Go client library """
+        for value, expected in (
+            (0.0, "0"),
+            (-0.0, "-0"),
+            (1.0, "1"),
+            (100.0, "100"),
+            (-3.5, "-3.5"),
+            (0.1, "0.1"),
+            (0.0001, "0.0001"),
+            (0.00001, "1e-05"),
+            (0.00012345, "0.00012345"),
+            (123456.0, "123456"),
+            (1234567.0, "1.234567e+06"),
+            (1e6, "1e+06"),
+            (1e21, "1e+21"),
+            (2.0 ** 40, "1.099511627776e+12"),
+            (5e-324, "5e-324"),
+            (1.7976931348623157e308, "1.7976931348623157e+308"),
+            (POS_INF, "+Inf"),
+            (-POS_INF, "-Inf"),
+            (float("nan"), "NaN"),
+        ):
+            self.assertEqual(text._format_float(value), expected)
+
+    def test_encode_text_streaming(self):
+        """ check text can be produced lazily and written to a stream """
+        families = [self.counter, self.gauge, self.summary, self.histogram]
+        payload = pmp.encode_text(*families)
+
+        chunks = list(pmp.iter_encode_text(iter(families)))
+        self.assertEqual(len(chunks), len(families))
+        self.assertEqual(b"".join(chunks), payload)
+
+        stream = io.BytesIO()
+        written = pmp.encode_text_to(stream, *families)
+        self.assertEqual(written, len(payload))
+        self.assertEqual(stream.getvalue(), payload)
+
+        # check objects with only a sendall method are supported
+        sock = unittest.mock.Mock(spec=["sendall"])
+        pmp.encode_text_to(sock, *families)
+        self.assertEqual(sock.sendall.call_count, len(families))
+
+    def test_parse_text(self):
+        """ check the text format is parsed into MetricFamily objects """
+        families = [self.counter, self.gauge, self.summary, self.histogram]
+        payload = pmp.encode_text(*families)
+        self.assertEqual(pmp.parse_text(payload), families)
+        self.assertEqual(pmp.parse_text(payload.decode("utf-8")), families)
+
+        # check timestamps, escaping, untyped samples and comments
+        data = (
+            "# A comment\n"
+            "# HELP escaped A \\\\help\\nstring.\n"
+            "# TYPE escaped gauge\n"
+            'escaped{path="C:\\\\dir\\n\\"quoted\\"",b="éè",} 1 1528000000000\n'
+            "\n"
+            "untyped_metric -Inf\n"
+            'untyped_metric{a="1"} NaN -5\n'
+            "# TYPE h histogram\n"
+            'h_bucket{le="1"} 1\n'
+            'h_bucket{le="+Inf"} 2\n'
+            "h_sum 3.5\n"
+            "h_count 2\n"
+            'h_bucket{a="x", le="5"} 4\n'
+            'h_count{a="x"} 4\n'
+        )
+        escaped, untyped, histogram = pmp.parse_text(data)
+
+        self.assertEqual(escaped.help, "A \\help\nstring.")
+        self.assertEqual(escaped.type, pmp.GAUGE)
+        metric = escaped.metric[0]
+        self.assertEqual(
+            [(l.name, l.value) for l in metric.label],
+            [("path", 'C:\\dir\n"quoted"'), ("b", "éè")],
+        )
+        self.assertEqual(metric.gauge.value, 1)
+        self.assertEqual(metric.timestamp_ms, 1528000000000)
+
+        self.assertEqual(untyped.name, "untyped_metric")
+        self.assertEqual(untyped.type, pmp.UNTYPED)
+        self.assertFalse(untyped.HasField("help"))
+        self.assertEqual(untyped.metric[0].untyped.value, -POS_INF)
+        self.assertNotEqual(
+            untyped.metric[1].untyped.value, untyped.metric[1].untyped.value
+        )
+        self.assertEqual(untyped.metric[1].timestamp_ms, -5)
+
+        self.assertEqual(len(histogram.metric), 2)
+        first, second = histogram.metric
+        self.assertEqual(len(first.label), 0)
+        self.assertEqual(
+            [(b.upper_bound, b.cumulative_count) for b in first.histogram.bucket],
+            [(1.0, 1), (POS_INF, 2)],
+        )
+        self.assertEqual(first.histogram.sample_count, 2)
+        self.assertEqual(first.histogram.sample_sum, 3.5)
+        self.assertEqual(second.label[0].value, "x")
+        self.assertEqual(second.histogram.bucket[0].upper_bound, 5.0)
+        self.assertEqual(second.histogram.sample_count, 4)
+
+        # check samples that are not contiguous start a new family
+        families = pmp.parse_text("a 1\nb 2\na 3\n")
+        self.assertEqual([mf.name for mf in families], ["a", "b", "a"])
+
+        self.assertEqual(pmp.parse_text(b""), [])
+
+    def test_parse_text_errors(self):
+        """ check invalid text is rejected """
+        for data, message in (
+            ("a", "expected a value"),
+            ("a 1 2 3", "expected a value"),
+            ("a x", "invalid value 'x'"),
+            ("a 1 x", "invalid timestamp 'x'"),
+            ('a{b="1" 1', "unterminated labels"),
+            ("a{b=1} 1", "invalid labels"),
+            ('a{b="1",b="2"} 1', "duplicate label b"),
+            ('a{b="\\t"} 1', "invalid escape sequence"),
+            ("# TYPE a gauge\na 1\n# TYPE a counter", "line 3: TYPE line for a"),
+            ("# TYPE a meter", "unknown metric type"),
+            ("# TYPE h histogram\nh_bucket 1", "missing le label"),
+            ('# TYPE h histogram\nh_bucket{le="x"} 1', "invalid le label value"),
+            ('# TYPE h histogram\nh_bucket{le="1"} -1', "invalid count -1"),
+        ):
+            with self.assertRaises(Exception) as ctx:
+                pmp.parse_text(data)
+            self.assertIn(message, str(ctx.exception))
+
+    def test_iter_parse_text(self):
+        """ check the text format can be parsed incrementally """
+        families = [self.counter, self.gauge, self.summary, self.histogram]
+        payload = pmp.encode_text(*families)
+
+        # check chunks that split lines and multi-byte characters
+        mf = pmp.create_gauge("g", "Ünïcode.", [({"a": "éè"}, 1)])
+        payload += pmp.encode_text(mf)
+        families.append(mf)
+        chunks = [payload[i : i + 7] for i in range(0, len(payload), 7)]
+        self.assertEqual(list(pmp.iter_parse_text(iter(chunks))), families)
+        self.assertEqual(
+            list(pmp.iter_parse_text(io.BytesIO(payload), chunk_size=5)), families
+        )
+
+        # check a final line without a newline is parsed
+        self.assertEqual(pmp.parse_text(payload.rstrip(b"\n")), families)
+
+        # check families are yielded before the end of the stream
+        parsed = pmp.iter_parse_text(iter([b"a 1\n", b"b 2\n"]))
+        self.assertEqual(next(parsed).name, "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
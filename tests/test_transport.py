@@ -0,0 +1,109 @@
+import asyncio
+import os
+import socket
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import transport
+
+
+class TransportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.families = [
+            pmp.create_gauge(
+                "gauge_{}".format(i),
+                "A gauge.",
+                [({"shard": str(s)}, s * i) for s in range(3)],
+            )
+            for i in range(5)
+        ]
+        self.payload = pmp.encode(*self.families)
+
+    def test_encode_buffers(self):
+        """ check encode_buffers produces the encode payload """
+        buffers = pmp.encode_buffers(*self.families)
+        self.assertEqual(len(buffers), 2 * len(self.families))
+        self.assertEqual(b"".join(buffers), self.payload)
+
+        # check cached frames are used when a cache is supplied
+        cache = pmp.EncodeCache()
+        buffers = pmp.encode_buffers(*self.families, cache=cache)
+        self.assertEqual(len(buffers), len(self.families))
+        self.assertEqual(b"".join(buffers), self.payload)
+        pmp.encode_buffers(*self.families, cache=cache)
+        self.assertEqual(cache.stats()["hits"], len(self.families))
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.encode_buffers("a")
+        self.assertIn(
+            "Expected metrics to be instances of MetricFamily, got ", str(ctx.exception)
+        )
+
+    def test_send_buffers(self):
+        """ check sending buffers over a socket """
+        rsock, wsock = socket.socketpair()
+        try:
+            buffers = pmp.encode_buffers(*self.families) + [b""]
+            sent = transport.send_buffers(wsock, buffers)
+            self.assertEqual(sent, len(self.payload))
+            wsock.close()
+            self.assertEqual(list(pmp.iter_decode(rsock)), self.families)
+        finally:
+            rsock.close()
+
+    def test_partial_sends(self):
+        """ check partial sends are resumed """
+        received = bytearray()
+        limits = []
+
+        def send(views):
+            limits.append(len(views))
+            # Only accept up to 7 bytes per call
+            data = b"".join(views)[:7]
+            received.extend(data)
+            return len(data)
+
+        with unittest.mock.patch.object(transport, "_IOV_MAX", 3):
+            sent = transport._gather(send, pmp.encode_buffers(*self.families))
+        self.assertEqual(sent, len(self.payload))
+        self.assertEqual(bytes(received), self.payload)
+        self.assertLessEqual(max(limits), 3)
+
+    def test_write_buffers(self):
+        """ check writing buffers to a file descriptor """
+        rfd, wfd = os.pipe()
+        try:
+            written = transport.write_buffers(wfd, pmp.encode_buffers(*self.families))
+            self.assertEqual(written, len(self.payload))
+            self.assertEqual(os.read(rfd, written), self.payload)
+        finally:
+            os.close(rfd)
+            os.close(wfd)
+
+    def test_asyncio(self):
+        """ check writing buffers to asyncio transports and streams """
+        buffers = pmp.encode_buffers(*self.families)
+
+        mock_transport = unittest.mock.Mock()
+        transport.write_transport(mock_transport, buffers)
+        mock_transport.writelines.assert_called_once_with(buffers)
+
+        async def exchange(rsock, wsock):
+            reader, reader_writer = await asyncio.open_connection(sock=rsock)
+            _, writer = await asyncio.open_connection(sock=wsock)
+            await transport.write_stream(writer, buffers)
+            writer.close()
+            data = await reader.read()
+            reader_writer.close()
+            return data
+
+        rsock, wsock = socket.socketpair()
+        loop = asyncio.new_event_loop()
+        try:
+            data = loop.run_until_complete(exchange(rsock, wsock))
+        finally:
+            loop.close()
+            rsock.close()
+            wsock.close()
+        self.assertEqual(data, self.payload)
@@ -387,6 +387,65 @@ class UtilsTestCase(unittest.TestCase):
         _mf = pmp.decode(payload)[0]
         self.assertEqual(mf, _mf)
 
+    def test_native_histogram(self):
+        """ check creating native histograms from observations """
+        observations = [1, 2, 3, 5, 100, 0, -1.5, -1.5, float("nan")]
+        metric = pmp.utils.create_native_histogram_metric(
+            {"route": "/"}, observations, schema=0, const_labels={"app": "my_app"}
+        )
+        self.assertEqual([l.name for l in metric.label], ["app", "route"])
+        histogram = metric.histogram
+        self.assertEqual(histogram.sample_count, 9)
+        self.assertEqual(histogram.schema, 0)
+        self.assertEqual(histogram.zero_threshold, pmp.utils.DEFAULT_ZERO_THRESHOLD)
+        self.assertEqual(histogram.zero_count, 1)
+        self.assertEqual(len(histogram.bucket), 0)
+        # Buckets 0 to 3 hold 1, 2, 3 and 5, and bucket 7 holds 100. The gap
+        # of three empty buckets starts a new span.
+        self.assertEqual(
+            [(s.offset, s.length) for s in histogram.positive_span], [(0, 4), (3, 1)]
+        )
+        self.assertEqual(list(histogram.positive_delta), [1, 0, 0, 0, 0])
+        # -1.5 is in bucket 1, (1, 2]
+        self.assertEqual(
+            [(s.offset, s.length) for s in histogram.negative_span], [(1, 1)]
+        )
+        self.assertEqual(list(histogram.negative_delta), [2])
+
+        # check small gaps are filled with empty buckets
+        metric = pmp.utils.create_native_histogram_metric({}, [1, 1, 8], schema=0)
+        histogram = metric.histogram
+        self.assertEqual(
+            [(s.offset, s.length) for s in histogram.positive_span], [(0, 4)]
+        )
+        self.assertEqual(list(histogram.positive_delta), [2, -2, 0, 1])
+
+        # check bucket boundaries are inclusive upper bounds for each schema
+        for schema in (-4, -1, 0, 1, 3, 8):
+            for index in (-20, -1, 0, 1, 7, 20):
+                bound = 2.0 ** (index * 2.0 ** -schema)
+                for value, expected in ((bound, index), (bound * 1.000001, index + 1)):
+                    metric = pmp.utils.create_native_histogram_metric(
+                        {}, [value], schema=schema, zero_threshold=0
+                    )
+                    span = metric.histogram.positive_span[0]
+                    self.assertEqual(span.offset, expected, (schema, value))
+
+        # check empty histograms are still recognisable as native histograms
+        metric = pmp.utils.create_native_histogram_metric({}, [], zero_threshold=0)
+        self.assertEqual(len(metric.histogram.positive_span), 1)
+        self.assertEqual(metric.histogram.positive_span[0].length, 0)
+        metric = pmp.utils.create_native_histogram_metric({}, [])
+        self.assertEqual(len(metric.histogram.positive_span), 0)
+
+        # check native histograms round trip through encoding
+        mf = pmp.create_histogram("h", "A native histogram.", [metric])
+        self.assertEqual(pmp.decode(pmp.encode(mf)), [mf])
+
+        with self.assertRaises(Exception) as ctx:
+            pmp.utils.create_native_histogram_metric({}, [], schema=9)
+        self.assertIn("Invalid schema", str(ctx.exception))
+
     def test_equality(self):
         """ simple confidence check of equality """
 
@@ -475,3 +534,111 @@ class UtilsTestCase(unittest.TestCase):
         POS_INF = float("inf")
         bucket = pmp.utils.create_bucket(0, POS_INF)
         self.assertIsInstance(bucket, pmp.Bucket)
+
+    def test_create_exemplar(self):
+        """ check creating exemplars using utils functions """
+        exemplar = pmp.utils.create_exemplar({"trace_id": "abc123"}, 0.25)
+        self.assertIsInstance(exemplar, pmp.Exemplar)
+        self.assertEqual(exemplar.label[0].name, "trace_id")
+        self.assertEqual(exemplar.value, 0.25)
+        self.assertFalse(exemplar.HasField("timestamp"))
+
+        exemplar = pmp.utils.create_exemplar({}, 1.0, timestamp=1528000000.125)
+        self.assertEqual(exemplar.timestamp.seconds, 1528000000)
+        self.assertEqual(exemplar.timestamp.nanos, 125000000)
+
+        # check the OpenMetrics limit on the length of exemplar labels
+        pmp.utils.create_exemplar({"trace_id": "x" * 120}, 1.0)
+        with self.assertRaises(Exception) as cm:
+            pmp.utils.create_exemplar({"trace_id": "x" * 121}, 1.0)
+        self.assertIn("combined length 129 exceeds 128", str(cm.exception))
+
+        # check exemplars are attached to counters and histogram buckets
+        metric = pmp.utils.create_counter_metric({}, 3.0, exemplar=exemplar)
+        self.assertEqual(metric.counter.exemplar, exemplar)
+        metric = pmp.utils.create_counter_metric({}, 3.0)
+        self.assertFalse(metric.counter.HasField("exemplar"))
+
+        values = {5.0: 3, 10.0: 4, "count": 4, "sum": 12.0}
+        metric = pmp.utils.create_histogram_metric(
+            {}, values, 4, 12.0, exemplars={10.0: exemplar}
+        )
+        first, second = metric.histogram.bucket
+        self.assertFalse(first.HasField("exemplar"))
+        self.assertEqual(second.exemplar, exemplar)
+
+    def test_label_set_cache(self):
+        """ check label set cache hits, misses and evictions """
+        cache = pmp.utils.LabelSetCache(maxsize=2)
+        labels = {"route": "/", "code": 200}
+
+        pairs = cache.label_pairs(labels, self.const_labels)
+        self.assertEqual(
+            [(lp.name, lp.value) for lp in pairs],
+            [
+                ("app", "my_app"),
+                ("code", "200"),
+                ("host", "examplehost"),
+                ("route", "/"),
+            ],
+        )
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        # check the same label set is served from the cache
+        self.assertIs(cache.label_pairs(dict(labels), self.const_labels), pairs)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # check the encoded labels match the LabelPair objects
+        self.assertEqual(
+            cache.encoded_labels(labels, self.const_labels),
+            pmp.Metric(label=pairs).SerializeToString(),
+        )
+        self.assertEqual(cache.stats()["hits"], 2)
+
+        # check values with different string forms do not share an entry
+        self.assertEqual(cache.label_pairs({"a": 1})[0].value, "1")
+        self.assertEqual(cache.label_pairs({"a": 1.0})[0].value, "1.0")
+        self.assertEqual(cache.label_pairs({"a": True})[0].value, "True")
+
+        # check the ordering flag is part of the key
+        unordered = cache.label_pairs({"b": "1", "a": "2"}, ordered=False)
+        self.assertEqual([lp.name for lp in unordered], ["b", "a"])
+        ordered = cache.label_pairs({"b": "1", "a": "2"}, ordered=True)
+        self.assertEqual([lp.name for lp in ordered], ["a", "b"])
+
+        # check least recently used entries were evicted
+        stats = cache.stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["evictions"], stats["misses"] - 2)
+        cache.label_pairs({"b": "1", "a": "2"}, ordered=False)
+        self.assertEqual(cache.stats()["hits"], stats["hits"] + 1)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+        # check a cache with no capacity still produces labels
+        cache = pmp.utils.LabelSetCache(maxsize=0)
+        cache.label_pairs(labels)
+        cache.label_pairs(labels)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_metrics_use_label_set_cache(self):
+        """ check generated metrics are unaffected by the label set cache """
+        pmp.utils.label_set_cache.clear()
+        m1 = pmp.utils.create_counter_metric(
+            {"route": "/"}, 1, const_labels=self.const_labels
+        )
+        m2 = pmp.utils.create_gauge_metric(
+            {"route": "/"}, 1, const_labels=self.const_labels
+        )
+        self.assertGreaterEqual(pmp.utils.label_set_cache.stats()["hits"], 1)
+        self.assertEqual(m1.label, m2.label)
+
+        # check modifying a generated metric does not modify cached labels
+        m1.label[0].value = "changed"
+        m3 = pmp.utils.create_counter_metric(
+            {"route": "/"}, 1, const_labels=self.const_labels
+        )
+        self.assertEqual(m3.label, m2.label)
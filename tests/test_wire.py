@@ -0,0 +1,164 @@
+import unittest
+import unittest.mock
+
+import prometheus_metrics_proto as pmp
+from prometheus_metrics_proto import wire
+
+
+POS_INF = float("inf")
+
+
+class WireTestCase(unittest.TestCase):
+    def setUp(self):
+
+        self.counter_metric_data = (
+            ({"country": "sp", "device": "desktop"}, 520),
+            ({"country": "us", "device": "mobile"}, 654.5),
+            ({"device": "desktop", "country": "uk"}, 0),
+            ({}, -1.25),
+        )
+
+        self.summary_metric_data = (
+            (
+                {"route": "/"},
+                {0.5: 4.0, 0.9: 5.2, 0.99: 5.2, "sum": 25.2, "count": 4},
+            ),
+            ({"route": "/data"}, {"sum": 0.0, "count": 0}),
+        )
+
+        self.histogram_metric_data = (
+            (
+                {"route": "/"},
+                {5.0: 3, 10.0: 200, 15.0: 7000, POS_INF: 2 ** 40, "count": 6, "sum": 4},
+            ),
+            ({"route": "/data"}, {"count": 0, "sum": 0.0}),
+        )
+
+        self.const_labels = {"app": "my_app", "host": "examplehost"}
+
+    def assertParity(self, metric_type, metric_data, **kwargs):
+        """ check the wire encoder matches the protobuf encoder """
+        mf = pmp.utils.create_metric_family(
+            "wire_test", "A wire test.", metric_type, metric_data, **kwargs
+        )
+        encoded = wire.encode_metric_family(
+            "wire_test", "A wire test.", metric_type, metric_data, **kwargs
+        )
+        self.assertEqual(encoded, mf.SerializeToString())
+        frame = wire.encode_frame(
+            "wire_test", "A wire test.", metric_type, metric_data, **kwargs
+        )
+        self.assertEqual(frame, pmp.encode(mf))
+
+    def test_encode_varint(self):
+        """ check varint encoding """
+        self.assertEqual(wire.encode_varint(0), b"\x00")
+        self.assertEqual(wire.encode_varint(127), b"\x7f")
+        self.assertEqual(wire.encode_varint(128), b"\x80\x01")
+        self.assertEqual(wire.encode_varint(300), b"\xac\x02")
+        self.assertEqual(
+            wire.encode_varint((1 << 64) - 1),
+            b"\xff\xff\xff\xff\xff\xff\xff\xff\xff\x01",
+        )
+        with self.assertRaises(ValueError):
+            wire.encode_varint(-1)
+
+    def test_encode_labels(self):
+        """ check labels encode the same as LabelPair objects """
+        labels = {"b": "1", "a": 2, "unicode": "éè", "empty": ""}
+        metric = pmp.Metric(label=pmp.utils.create_labels(labels))
+        self.assertEqual(wire.encode_labels(labels), metric.SerializeToString())
+
+    def test_metric_parity(self):
+        """ check single metric encoders match the utils functions """
+        labels = {"route": "/", "host": "examplehost"}
+        values = {5.0: 3, 10.0: 2, POS_INF: 0, "count": 6, "sum": 46.0}
+
+        for kwargs in ({}, {"const_labels": self.const_labels, "ordered": False}):
+            self.assertEqual(
+                wire.encode_counter_metric(labels, 3.5, **kwargs),
+                pmp.utils.create_counter_metric(
+                    labels, 3.5, **kwargs
+                ).SerializeToString(),
+            )
+            self.assertEqual(
+                wire.encode_gauge_metric(labels, -3.5, **kwargs),
+                pmp.utils.create_gauge_metric(
+                    labels, -3.5, **kwargs
+                ).SerializeToString(),
+            )
+            self.assertEqual(
+                wire.encode_summary_metric(labels, {0.5: 1.0}, 6, 46.0, **kwargs),
+                pmp.utils.create_summary_metric(
+                    labels, {0.5: 1.0}, 6, 46.0, **kwargs
+                ).SerializeToString(),
+            )
+            self.assertEqual(
+                wire.encode_histogram_metric(labels, values, 6, 46.0, **kwargs),
+                pmp.utils.create_histogram_metric(
+                    labels, values, 6, 46.0, **kwargs
+                ).SerializeToString(),
+            )
+
+    def test_exemplar_parity(self):
+        """ check exemplars encode identically to the protobuf path """
+        labels = {"route": "/"}
+        values = {5.0: 3, 10.0: 2, POS_INF: 0, "count": 6, "sum": 46.0}
+        exemplar = pmp.utils.create_exemplar(
+            {"trace_id": "x" * 120}, 7.5, timestamp=1528000000.5
+        )
+        self.assertEqual(
+            wire.encode_counter_metric(labels, 3.5, exemplar=exemplar),
+            pmp.utils.create_counter_metric(
+                labels, 3.5, exemplar=exemplar
+            ).SerializeToString(),
+        )
+        for exemplars in ({}, {10.0: exemplar}, {5.0: exemplar, POS_INF: exemplar}):
+            self.assertEqual(
+                wire.encode_histogram_metric(
+                    labels, values, 6, 46.0, exemplars=exemplars
+                ),
+                pmp.utils.create_histogram_metric(
+                    labels, values, 6, 46.0, exemplars=exemplars
+                ).SerializeToString(),
+            )
+
+    def test_metric_family_parity(self):
+        """ check metric families encode identically to the protobuf path """
+        for kwargs in (
+            {},
+            {"const_labels": self.const_labels},
+            {"const_labels": self.const_labels, "ordered": False},
+        ):
+            self.assertParity(pmp.COUNTER, self.counter_metric_data, **kwargs)
+            self.assertParity(pmp.GAUGE, self.counter_metric_data, **kwargs)
+            self.assertParity(pmp.SUMMARY, self.summary_metric_data, **kwargs)
+            self.assertParity(pmp.HISTOGRAM, self.histogram_metric_data, **kwargs)
+
+        # check a declared metric with no metric instances
+        self.assertParity(pmp.COUNTER, [])
+
+        # check pre-generated Metric objects
+        metrics = [
+            pmp.utils.create_gauge_metric(labels, value)
+            for labels, value in self.counter_metric_data
+        ]
+        self.assertParity(pmp.GAUGE, metrics)
+
+    def test_timestamp_parity(self):
+        """ check timestamps encode identically to the protobuf path """
+        for timestamp_ms in (1528000000000, -5):
+            with unittest.mock.patch.object(
+                pmp.utils, "_timestamp_ms", return_value=timestamp_ms
+            ):
+                self.assertParity(pmp.COUNTER, self.counter_metric_data, timestamp=True)
+                self.assertParity(pmp.SUMMARY, self.summary_metric_data, timestamp=True)
+                self.assertParity(
+                    pmp.HISTOGRAM, self.histogram_metric_data, timestamp=True
+                )
+
+    def test_invalid_metric_type(self):
+        """ check using invalid metric type """
+        with self.assertRaises(Exception) as context:
+            wire.encode_metric_family("a", "b", 100, self.counter_metric_data)
+        self.assertIn("Invalid metric_type", str(context.exception))